@@ -1,61 +1,60 @@
+import hashlib
 import logging
 import os
 import secrets
-from datetime import datetime, timedelta
+import threading
+import time
+from collections import OrderedDict
 from typing import Optional
 
 import jwt
 from fastapi import HTTPException, Security, Request
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
-from passlib.context import CryptContext
-# from passlib.hash import argon2
 from sqlalchemy.orm import Session
 
 from .models import User
 from .schemas import TokenData
 from .config import get_settings
+from .hashing import pwd_context, pwd_hasher  # noqa: F401  密码哈希
+from .metrics import AUTH_FAILURES
+from .revocation import revocations
 
 settings = get_settings()
 logger = logging.getLogger(__name__)
 
-# 密码哈希
-pwd_context = CryptContext(schemes=["argon2"], deprecated="auto")
-
 # Bearer token scheme
 bearer_scheme = HTTPBearer(auto_error=False)
 
-class PasswordHasher:
-    def hash(self, password: str) -> str:
-        return pwd_context.hash(password)
-    
-    def verify(self, hashed: str, plain: str) -> bool:
-        return pwd_context.verify(plain, hashed)
+def new_token_id() -> str:
+    return secrets.token_hex(16)
 
-pwd_hasher = PasswordHasher()
+def create_tokens(user: User, family: Optional[str] = None, jti: Optional[str] = None) -> tuple[str, str]:
+    """创建访问令牌和刷新令牌，二者携带同一会话 sid，刷新令牌另带 jti 用于轮换"""
+    now = time.time()  # 浮点 iat，与吊销时间点比较时不受秒级截断影响
+    family = family or new_token_id()
 
-def create_tokens(user: User) -> tuple[str, str]:
-    """创建访问令牌和刷新令牌"""
-    now = datetime.utcnow()
-    
     access_payload = {
         "sub": str(user.id),
         "role": user.role.value,
-        "exp": now + timedelta(minutes=settings.ACCESS_TOKEN_TTL_MIN),
+        "exp": int(now + settings.ACCESS_TOKEN_TTL_MIN * 60),
         "iat": now,
+        "sid": family,
         "type": "access"
     }
-    
+
     refresh_payload = {
         "sub": str(user.id),
         "role": user.role.value,
-        "exp": now + timedelta(days=settings.REFRESH_TOKEN_TTL_DAYS),
+        "exp": int(now + settings.REFRESH_TOKEN_TTL_DAYS * 86400),
         "iat": now,
+        "sid": family,
+        "jti": jti or new_token_id(),
         "type": "refresh"
     }
-    
+
     access_token = jwt.encode(access_payload, settings.JWT_SECRET, algorithm="HS256")
     refresh_token = jwt.encode(refresh_payload, settings.JWT_REFRESH_SECRET, algorithm="HS256")
-    
+
     return access_token, refresh_token
 
 def verify_token(token: str, secret: str) -> TokenData:
@@ -65,16 +64,60 @@ def verify_token(token: str, secret: str) -> TokenData:
         return TokenData(
             sub=int(payload["sub"]),
             role=payload["role"],
-            exp=payload["exp"]
+            exp=payload["exp"],
+            iat=payload.get("iat"),
+            sid=payload.get("sid"),
+            jti=payload.get("jti"),
         )
     except jwt.PyJWTError as e:
-        logger.error(f"JWT decode error: {type(e).__name__}: {str(e)}, token length: {len(token)}, token[:20]: {token[:20]}")
+        logger.debug("JWT decode error: %s: %s (token length %d)", type(e).__name__, e, len(token))
         raise HTTPException(status_code=401, detail="Invalid token")
     except (ValueError, KeyError) as e:
-        logger.error(f"Token payload parse error: {type(e).__name__}: {str(e)}")
+        logger.debug("Token payload parse error: %s: %s", type(e).__name__, e)
         raise HTTPException(status_code=401, detail="Invalid token")
 
-def require_user(
+class TokenCache:
+    """已验证访问令牌声明的 LRU 缓存，以令牌摘要为键，条目不会活过令牌的 exp"""
+
+    def __init__(self, maxsize: int, ttl: int):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._data: OrderedDict[bytes, tuple[float, TokenData]] = OrderedDict()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def key(token: str) -> bytes:
+        return hashlib.blake2b(token.encode(), digest_size=16).digest()
+
+    def get(self, key: bytes) -> Optional[TokenData]:
+        with self._lock:
+            item = self._data.get(key)
+            if item is None:
+                return None
+            expires, data = item
+            if expires <= time.time():
+                del self._data[key]
+                return None
+            self._data.move_to_end(key)
+            return data
+
+    def put(self, key: bytes, data: TokenData) -> None:
+        if self.maxsize <= 0:
+            return
+        expires = min(float(data.exp), time.time() + self.ttl)
+        with self._lock:
+            self._data[key] = (expires, data)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+
+token_cache = TokenCache(settings.TOKEN_CACHE_SIZE, settings.TOKEN_CACHE_TTL)
+
+async def require_user(
     request: Request,
     creds: Optional[HTTPAuthorizationCredentials] = Security(bearer_scheme),
 ) -> TokenData:
@@ -92,28 +135,31 @@ def require_user(
             token_source = "cookie"
 
     if not token:
-        logger.info(
-            "Authentication failed: no bearer token or access_token cookie. Cookies available: %s",
-            list(request.cookies.keys()),
-        )
+        logger.debug("Authentication failed: no bearer token or access_token cookie")
+        AUTH_FAILURES.labels("missing_token").inc()
         raise HTTPException(status_code=401, detail="Not authenticated")
 
-    logger.info(
-        "Authenticating via %s token: %.8s… (cookies=%s)",
-        token_source,
-        token,
-        list(request.cookies.keys()),
-    )
-
-    try:
-        return verify_token(token, settings.JWT_SECRET)
-    except HTTPException as exc:
-        logger.warning("Token verification failed via %s: %s", token_source, exc.detail)
-        raise
-
-def require_admin(user: TokenData = Security(require_user)) -> TokenData:
+    key = token_cache.key(token)
+    data = token_cache.get(key)
+    if data is None:
+        try:
+            data = verify_token(token, settings.JWT_SECRET)
+        except HTTPException as exc:
+            logger.debug("Token verification failed via %s: %s", token_source, exc.detail)
+            AUTH_FAILURES.labels("invalid_token").inc()
+            raise
+        token_cache.put(key, data)
+
+    # 缓存命中也要检查：停用、改权限、登出都不等令牌过期
+    if revocations.is_revoked(data):
+        AUTH_FAILURES.labels("revoked").inc()
+        raise HTTPException(status_code=401, detail="Token revoked")
+    return data
+
+async def require_admin(user: TokenData = Security(require_user)) -> TokenData:
     """要求管理员权限"""
     if user.role != "admin":
+        AUTH_FAILURES.labels("not_admin").inc()
         raise HTTPException(status_code=403, detail="Admin only")
     return user
 
@@ -0,0 +1,91 @@
+"""子域名占用索引：内存中保存所有已存在的 (domain_id, subdomain, type)
+
+uq_record 约束覆盖所有状态的行，因此只要行存在名称即被占用。索引在启动时
+加载，本进程写入后立即更新，并通过 NOTIFY 广播给其他副本。
+"""
+import json
+import logging
+
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+
+from .models import Allocation
+from .notify import MAX_PAYLOAD, listener, publish, publish_async
+
+logger = logging.getLogger(__name__)
+
+CHANNEL = "allocation_keys"
+
+Key = tuple[int, str, str]  # (domain_id, subdomain, type)
+
+def _keys_query():
+    return select(Allocation.domain_id, Allocation.subdomain, Allocation.type)
+
+class AvailabilityIndex:
+    def __init__(self):
+        self._taken: set[Key] = set()
+        self.loaded = False
+
+    def _replace(self, rows) -> None:
+        self._taken = {(d, s, t) for d, s, t in rows}
+        self.loaded = True
+        logger.info("Availability index loaded: %d keys", len(self._taken))
+
+    def load(self, db: Session) -> None:
+        self._replace(db.execute(_keys_query()).all())
+
+    async def load_async(self, db: AsyncSession) -> None:
+        self._replace((await db.execute(_keys_query())).all())
+
+    def is_taken(self, key: Key) -> bool:
+        return key in self._taken
+
+    def add(self, keys) -> None:
+        self._taken.update(keys)
+
+    def discard(self, keys) -> None:
+        self._taken.difference_update(keys)
+
+    def apply(self, payload: str) -> None:
+        """处理其他副本（或本进程）广播的变更"""
+        msg = json.loads(payload)
+        keys = [tuple(k) for k in msg["keys"]]
+        if msg["op"] == "add":
+            self.add(keys)
+        else:
+            self.discard(keys)
+
+def _payloads(op: str, keys: list[Key]):
+    """按 NOTIFY 负载上限切分"""
+    chunk: list[Key] = []
+    size = 0
+    for key in keys:
+        entry = len(key[1]) + len(key[2]) + 24
+        if chunk and size + entry > MAX_PAYLOAD:
+            yield json.dumps({"op": op, "keys": chunk})
+            chunk, size = [], 0
+        chunk.append(key)
+        size += entry
+    if chunk:
+        yield json.dumps({"op": op, "keys": chunk})
+
+def broadcast(db: Session, op: str, keys: list[Key]) -> None:
+    """在调用方事务中广播占用变更，提交后各副本更新索引"""
+    for payload in _payloads(op, keys):
+        publish(db, CHANNEL, payload)
+
+async def broadcast_async(db: AsyncSession, op: str, keys: list[Key]) -> None:
+    for payload in _payloads(op, keys):
+        await publish_async(db, CHANNEL, payload)
+
+availability_index = AvailabilityIndex()
+
+def _reload() -> None:
+    from .db import SessionLocal
+
+    with SessionLocal() as db:
+        availability_index.load(db)
+
+listener.subscribe(CHANNEL, availability_index.apply)
+listener.on_reconnect(_reload)
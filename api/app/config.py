@@ -6,13 +6,40 @@ class Settings:
     POSTGRES_DB: str = os.getenv("POSTGRES_DB", "domainapp")
     POSTGRES_USER: str = os.getenv("POSTGRES_USER", "domainapp") 
     POSTGRES_PASSWORD: str = os.getenv("POSTGRES_PASSWORD", "password")
-    DATABASE_URL: str = f"postgresql://{POSTGRES_USER}:{POSTGRES_PASSWORD}@db:5432/{POSTGRES_DB}"
+    DATABASE_URL: str = os.getenv("DATABASE_URL", f"postgresql://{POSTGRES_USER}:{POSTGRES_PASSWORD}@db:5432/{POSTGRES_DB}")
+    DB_POOL_SIZE: int = int(os.getenv("DB_POOL_SIZE", "10"))
+    DB_MAX_OVERFLOW: int = int(os.getenv("DB_MAX_OVERFLOW", "20"))
+    DB_POOL_TIMEOUT: int = int(os.getenv("DB_POOL_TIMEOUT", "30"))  # 等待连接的最长时间（秒）
+    DB_STATEMENT_TIMEOUT_MS: int = int(os.getenv("DB_STATEMENT_TIMEOUT_MS", "0"))  # 0 表示不限制
+    # 只读副本连接串（逗号分隔），列表与查询接口轮询使用；留空则全部走主库
+    DATABASE_REPLICA_URLS: list[str] = [
+        u.strip() for u in os.getenv("DATABASE_REPLICA_URLS", "").split(",") if u.strip()
+    ]
+    DB_REPLICA_CHECK_SEC: int = int(os.getenv("DB_REPLICA_CHECK_SEC", "5"))          # 副本健康检查间隔
+    DB_REPLICA_MAX_LAG_SEC: float = float(os.getenv("DB_REPLICA_MAX_LAG_SEC", "5"))  # 复制延迟超过此值暂停使用
+    DB_READ_AFTER_WRITE_SEC: float = float(os.getenv("DB_READ_AFTER_WRITE_SEC", "10"))  # 用户写入后该时长内读主库
+    # 启动时 create_all 补建缺失的表；多 worker 部署由 start.sh 启动前执行一次并关闭此项
+    DB_AUTO_CREATE: bool = os.getenv("DB_AUTO_CREATE", "true").lower() == "true"
+
+    @property
+    def ASYNC_DATABASE_URL(self) -> str:
+        return self.DATABASE_URL.replace("postgresql://", "postgresql+asyncpg://", 1)
     
     # JWT
     JWT_SECRET: str = os.getenv("JWT_SECRET", "change_me_super_long")
     JWT_REFRESH_SECRET: str = os.getenv("JWT_REFRESH_SECRET", "change_me_even_longer")
     ACCESS_TOKEN_TTL_MIN: int = int(os.getenv("ACCESS_TOKEN_TTL_MIN", "30"))
     REFRESH_TOKEN_TTL_DAYS: int = int(os.getenv("REFRESH_TOKEN_TTL_DAYS", "14"))
+    TOKEN_CACHE_SIZE: int = int(os.getenv("TOKEN_CACHE_SIZE", "10000"))  # 0 表示关闭令牌缓存
+    TOKEN_CACHE_TTL: int = int(os.getenv("TOKEN_CACHE_TTL", "300"))      # 秒，且不超过令牌 exp
+
+    # Password hashing
+    ARGON2_TIME_COST: int = int(os.getenv("ARGON2_TIME_COST", "3"))
+    ARGON2_MEMORY_COST: int = int(os.getenv("ARGON2_MEMORY_COST", "65536"))  # KiB
+    ARGON2_PARALLELISM: int = int(os.getenv("ARGON2_PARALLELISM", "4"))
+    HASH_EXECUTOR: str = os.getenv("HASH_EXECUTOR", "thread")  # thread | process
+    HASH_WORKERS: int = int(os.getenv("HASH_WORKERS", str(os.cpu_count() or 2)))
+    HASH_MAX_QUEUE: int = int(os.getenv("HASH_MAX_QUEUE", "32"))  # 超过即返回 503
     
     # Public URLs
     PUBLIC_WEB_URL: str = os.getenv("PUBLIC_WEB_URL", "https://yourdomain.com")
@@ -26,13 +53,78 @@ class Settings:
     SMTP_PORT: int = int(os.getenv("SMTP_PORT", "587"))
     SMTP_USER: str = os.getenv("SMTP_USER", "")
     SMTP_PASS: str = os.getenv("SMTP_PASS", "")
+    MAIL_TIMEOUT: float = float(os.getenv("MAIL_TIMEOUT", "10"))      # 单次发送超时（秒）
+    MAIL_BATCH_SIZE: int = int(os.getenv("MAIL_BATCH_SIZE", "50"))     # worker 每轮认领邮件数（Resend 单批上限 100）
+    MAIL_MAX_ATTEMPTS: int = int(os.getenv("MAIL_MAX_ATTEMPTS", "8"))
+    SMTP_IDLE_SEC: int = int(os.getenv("SMTP_IDLE_SEC", "60"))  # 连接空闲超过该时长先 NOOP 探活
     
     # DNSPod
     DNSPOD_SECRET_ID: str = os.getenv("DNSPOD_SECRET_ID", "")
     DNSPOD_SECRET_KEY: str = os.getenv("DNSPOD_SECRET_KEY", "")
     DNS_ROOT_DOMAIN: str = os.getenv("DNS_ROOT_DOMAIN", "example.com")
+    # 可分发的根域名列表（逗号分隔），第一个为默认；未设置时仅使用 DNS_ROOT_DOMAIN
+    DNS_ROOT_DOMAINS: list[str] = [
+        d.strip().lower() for d in os.getenv("DNS_ROOT_DOMAINS", DNS_ROOT_DOMAIN).split(",") if d.strip()
+    ]
+    DNS_ROOT_DOMAIN = DNS_ROOT_DOMAINS[0] if DNS_ROOT_DOMAINS else DNS_ROOT_DOMAIN
     DNS_DEFAULT_TTL: int = int(os.getenv("DNS_DEFAULT_TTL", "600"))
+    # DNS 服务商（dnspod / fake），可按根域名单独指定，如 "example.com=dnspod,example.net=fake"
+    DNS_DEFAULT_PROVIDER: str = os.getenv("DNS_DEFAULT_PROVIDER", "DNSPod")
+    DNS_DOMAIN_PROVIDERS: dict[str, str] = {
+        k.strip().lower(): v.strip()
+        for k, _, v in (p.partition("=") for p in os.getenv("DNS_DOMAIN_PROVIDERS", "").split(",")) if v.strip()
+    }
+    FAKE_DNS_PATH: str = os.getenv("FAKE_DNS_PATH", "")  # fake 服务商的持久化文件，为空时只在内存中
+    DNSPOD_MAX_WORKERS: int = int(os.getenv("DNSPOD_MAX_WORKERS", "16"))  # 批量操作并发上限
+    DNSPOD_REGION: str = os.getenv("DNSPOD_REGION", "")
+    DNSPOD_ENDPOINT: str = os.getenv("DNSPOD_ENDPOINT", "")  # 为空时使用 SDK 默认地址
+    DNSPOD_TIMEOUT: int = int(os.getenv("DNSPOD_TIMEOUT", "10"))  # 单次请求超时（秒）
+    DNSPOD_RETRIES: int = int(os.getenv("DNSPOD_RETRIES", "2"))   # 网络错误/限频重试次数
+    DNSPOD_POOL_SIZE: int = int(os.getenv("DNSPOD_POOL_SIZE", "4"))  # 每个客户端预建连接数
+    DNSPOD_SLOW_MS: int = int(os.getenv("DNSPOD_SLOW_MS", "1000"))   # 慢调用告警阈值
+    DNSPOD_BATCH_SIZE: int = int(os.getenv("DNSPOD_BATCH_SIZE", "100"))  # 批量创建/删除每次调用的记录数，1 为关闭
+    DNSPOD_BATCH_WAIT_SEC: int = int(os.getenv("DNSPOD_BATCH_WAIT_SEC", "30"))  # 等待批量任务完成的上限
+
+    # Provisioning worker
+    PROVISION_BATCH_SIZE: int = int(os.getenv("PROVISION_BATCH_SIZE", "100"))    # 每轮认领任务数
+    PROVISION_POLL_INTERVAL: float = float(os.getenv("PROVISION_POLL_INTERVAL", "1"))  # 空闲轮询间隔（秒）
+    PROVISION_MAX_ATTEMPTS: int = int(os.getenv("PROVISION_MAX_ATTEMPTS", "5"))
+    PROVISION_BACKOFF_BASE: float = float(os.getenv("PROVISION_BACKOFF_BASE", "5"))   # 重试退避基数（秒）
+    PROVISION_BACKOFF_MAX: float = float(os.getenv("PROVISION_BACKOFF_MAX", "600"))
+    PROVISION_LEASE_SEC: int = int(os.getenv("PROVISION_LEASE_SEC", "300"))  # 任务租约，超时可被重新认领
+    WORKER_METRICS_PORT: int = int(os.getenv("WORKER_METRICS_PORT", "0"))  # worker 暴露 /metrics 的端口，0 为关闭
+    ALLOCATION_QUOTA_USER: int = int(os.getenv("ALLOCATION_QUOTA_USER", "10"))   # 普通用户默认配额，0 为不限
+    ALLOCATION_QUOTA_ADMIN: int = int(os.getenv("ALLOCATION_QUOTA_ADMIN", "0"))
+    BULK_MAX_ITEMS: int = int(os.getenv("BULK_MAX_ITEMS", "1000"))
+    ADMIN_PAGE_SIZE: int = int(os.getenv("ADMIN_PAGE_SIZE", "100"))
+    ADMIN_PAGE_MAX: int = int(os.getenv("ADMIN_PAGE_MAX", "500"))
+    EXPORT_BATCH_SIZE: int = int(os.getenv("EXPORT_BATCH_SIZE", "2000"))  # 导出时每批读取行数
     
+    # DDNS
+    DDNS_CACHE_SIZE: int = int(os.getenv("DDNS_CACHE_SIZE", "100000"))  # 令牌 -> 当前值的内存缓存条目上限
+    DDNS_CACHE_TTL: int = int(os.getenv("DDNS_CACHE_TTL", "300"))       # 秒，其他副本的修改最迟在此之后可见
+    DDNS_COALESCE_SEC: float = float(os.getenv("DDNS_COALESCE_SEC", "30"))  # 上游更新延迟执行，合并期间的连续变化
+
+    # Maintenance（过期数据清理）
+    CLEANUP_INTERVAL_SEC: int = int(os.getenv("CLEANUP_INTERVAL_SEC", "0"))  # API 内置定时清理间隔，0 为关闭
+    CLEANUP_BATCH_SIZE: int = int(os.getenv("CLEANUP_BATCH_SIZE", "1000"))  # 每个事务删除的行数
+    CLEANUP_PENDING_DAYS: int = int(os.getenv("CLEANUP_PENDING_DAYS", "30"))  # 超过该天数未审批的申请，0 为保留
+    CLEANUP_UNVERIFIED_DAYS: int = int(os.getenv("CLEANUP_UNVERIFIED_DAYS", "7"))  # 未验证邮箱的用户，0 为保留
+    CLEANUP_FINISHED_DAYS: int = int(os.getenv("CLEANUP_FINISHED_DAYS", "7"))  # 已完成的任务与邮件，0 为保留
+
+    # Rate limiting（令牌桶，格式为 "次数/秒"）
+    RATE_LIMIT_ENABLED: bool = os.getenv("RATE_LIMIT_ENABLED", "true").lower() == "true"
+    RATE_LIMIT_BACKEND: str = os.getenv("RATE_LIMIT_BACKEND", "memory")  # memory | redis（多实例共享）
+    RATE_LIMIT_REDIS_URL: str = os.getenv("RATE_LIMIT_REDIS_URL", "redis://localhost:6379/0")
+    RATE_LIMIT_LOGIN: str = os.getenv("RATE_LIMIT_LOGIN", "10/60")       # 按 IP
+    RATE_LIMIT_REGISTER: str = os.getenv("RATE_LIMIT_REGISTER", "5/600")  # 按 IP
+    RATE_LIMIT_ALLOCATE: str = os.getenv("RATE_LIMIT_ALLOCATE", "30/60")  # 按用户，未登录按 IP
+    RATE_LIMIT_DDNS: str = os.getenv("RATE_LIMIT_DDNS", "60/60")          # 按 IP
+    # 可信反向代理（IP 或 CIDR，逗号分隔），只有来自这些地址的 X-Forwarded-For 才被采信
+    RATE_LIMIT_TRUSTED_PROXIES: list[str] = [
+        p.strip() for p in os.getenv("RATE_LIMIT_TRUSTED_PROXIES", "").split(",") if p.strip()
+    ]
+
     # CORS/Cookies
     COOKIE_DOMAIN: str = os.getenv("COOKIE_DOMAIN", ".yourdomain.com")
     COOKIE_SECURE: bool = os.getenv("COOKIE_SECURE", "false").lower() == "true"
@@ -1,14 +1,49 @@
 from sqlalchemy import create_engine
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker
 from sqlalchemy.orm import sessionmaker
 from .config import get_settings
 
 settings = get_settings()
 
-engine = create_engine(
-    settings.DATABASE_URL,
+_pool_kwargs = dict(
     pool_pre_ping=True,
     pool_recycle=300,
-    echo=False
+    pool_size=settings.DB_POOL_SIZE,
+    max_overflow=settings.DB_MAX_OVERFLOW,
+    pool_timeout=settings.DB_POOL_TIMEOUT,
+    echo=False,
+)
+
+def _statement_timeout_args(async_driver: bool) -> dict:
+    if settings.DB_STATEMENT_TIMEOUT_MS <= 0:
+        return {}
+    if async_driver:
+        return {"server_settings": {"statement_timeout": str(settings.DB_STATEMENT_TIMEOUT_MS)}}
+    return {"options": f"-c statement_timeout={settings.DB_STATEMENT_TIMEOUT_MS}"}
+
+engine = create_engine(
+    settings.DATABASE_URL,
+    connect_args=_statement_timeout_args(async_driver=False),
+    **_pool_kwargs
 )
 
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+
+# 异步引擎：热点接口使用，并发受连接池限制而不是线程池
+async_engine = create_async_engine(
+    settings.ASYNC_DATABASE_URL,
+    connect_args=_statement_timeout_args(async_driver=True),
+    **_pool_kwargs
+)
+
+AsyncSessionLocal = async_sessionmaker(async_engine, autoflush=False, expire_on_commit=False)
+
+# 只读副本：每个副本一个异步引擎，由 replicas 模块做健康检查与轮询
+replica_engines = [
+    create_async_engine(
+        url.replace("postgresql://", "postgresql+asyncpg://", 1),
+        connect_args=_statement_timeout_args(async_driver=True),
+        **_pool_kwargs
+    )
+    for url in settings.DATABASE_REPLICA_URLS
+]
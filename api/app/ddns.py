@@ -0,0 +1,163 @@
+"""动态 DNS：家用路由器等客户端按 dyndns2 协议上报当前 IP
+
+每个分发可生成一个 DDNS 令牌，数据库只保存其 SHA-256。令牌对应的目标（分发 ID、
+主机名、当前值）缓存在内存中：IP 未变化时直接应答，不访问数据库、不调用服务商。
+IP 变化时更新分发并延迟 DDNS_COALESCE_SEC 入队上游修改，窗口内的连续变化只触发一次调用。
+分发被修改或更换令牌时通过 NOTIFY 通知各副本丢弃缓存条目。
+"""
+import hashlib
+import ipaddress
+import json
+import secrets
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+
+from .models import Allocation, AllocationStatus
+from .config import get_settings
+from .zones import domain_cache
+from .notify import listener, publish, publish_async
+from . import provisioning
+
+settings = get_settings()
+
+CHANNEL = "ddns_targets"
+_CHUNK = 500  # 每条 NOTIFY 携带的分发 ID 数，远低于负载上限
+
+# 记录类型 -> 允许的 IP 版本
+_IP_VERSIONS = {"A": 4, "AAAA": 6}
+
+def new_token() -> tuple[str, str]:
+    """生成令牌，返回 (明文, 摘要)；明文只在生成时返回给用户一次"""
+    token = secrets.token_urlsafe(24)
+    return token, hash_token(token)
+
+def hash_token(token: str) -> str:
+    return hashlib.sha256(token.encode()).hexdigest()
+
+def parse_ip(value: str, record_type: str) -> str | None:
+    """校验 IP 与记录类型匹配，返回规范化的地址"""
+    try:
+        addr = ipaddress.ip_address(value.strip())
+    except ValueError:
+        return None
+    return str(addr) if _IP_VERSIONS.get(record_type) == addr.version else None
+
+@dataclass(slots=True)
+class Target:
+    alloc_id: int
+    hostname: str   # 完整主机名，如 home.example.com
+    type: str
+    value: str
+    active: bool
+    expires: float
+
+class TargetCache:
+    """令牌摘要 -> 目标的 LRU 缓存，条目最多存活 DDNS_CACHE_TTL 秒"""
+
+    def __init__(self, maxsize: int, ttl: int):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._data: OrderedDict[str, Target] = OrderedDict()
+        self._by_alloc: dict[int, str] = {}
+        self._lock = threading.Lock()
+
+    def get(self, token_hash: str) -> Target | None:
+        with self._lock:
+            target = self._data.get(token_hash)
+            if target is None:
+                return None
+            if target.expires <= time.monotonic():
+                self._pop(token_hash)
+                return None
+            self._data.move_to_end(token_hash)
+            return target
+
+    def put(self, token_hash: str, target: Target) -> None:
+        if self.maxsize <= 0:
+            return
+        target.expires = time.monotonic() + self.ttl
+        with self._lock:
+            self._data[token_hash] = target
+            self._data.move_to_end(token_hash)
+            self._by_alloc[target.alloc_id] = token_hash
+            while len(self._data) > self.maxsize:
+                self._pop(next(iter(self._data)))
+
+    def discard(self, alloc_ids) -> None:
+        """分发被修改、禁用或更换令牌后丢弃本进程的缓存"""
+        with self._lock:
+            for alloc_id in alloc_ids:
+                token_hash = self._by_alloc.get(alloc_id)
+                if token_hash is not None:
+                    self._pop(token_hash)
+
+    def _pop(self, token_hash: str) -> None:
+        target = self._data.pop(token_hash, None)
+        if target is not None and self._by_alloc.get(target.alloc_id) == token_hash:
+            del self._by_alloc[target.alloc_id]
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+            self._by_alloc.clear()
+
+target_cache = TargetCache(settings.DDNS_CACHE_SIZE, settings.DDNS_CACHE_TTL)
+
+def _payloads(alloc_ids: list[int]):
+    for i in range(0, len(alloc_ids), _CHUNK):
+        yield json.dumps(alloc_ids[i:i + _CHUNK])
+
+def invalidate(db: Session, alloc_ids: list[int]) -> None:
+    """在调用方事务中广播缓存失效，提交后各副本丢弃对应条目"""
+    target_cache.discard(alloc_ids)
+    for payload in _payloads(alloc_ids):
+        publish(db, CHANNEL, payload)
+
+async def invalidate_async(db: AsyncSession, alloc_ids: list[int]) -> None:
+    target_cache.discard(alloc_ids)
+    for payload in _payloads(alloc_ids):
+        await publish_async(db, CHANNEL, payload)
+
+def _target(alloc: Allocation) -> Target | None:
+    domain = domain_cache.get(alloc.domain_id)
+    if domain is None:
+        return None
+    return Target(alloc.id, f"{alloc.subdomain}.{domain.name}", alloc.type, alloc.value,
+                  alloc.status == AllocationStatus.active, 0.0)
+
+async def lookup(db: AsyncSession, token_hash: str) -> Target | None:
+    """缓存未命中时按令牌摘要查询分发（唯一索引）"""
+    alloc = await db.scalar(select(Allocation).where(Allocation.ddns_token_hash == token_hash))
+    target = _target(alloc) if alloc else None
+    if target is not None:
+        target_cache.put(token_hash, target)
+    return target
+
+async def apply(db: AsyncSession, token_hash: str, ip: str) -> Target | None:
+    """写入新 IP 并延迟入队上游修改；分发已不存在或令牌已更换时返回 None"""
+    alloc = await db.scalar(
+        select(Allocation).where(Allocation.ddns_token_hash == token_hash).with_for_update()
+    )
+    if alloc is None:
+        return None
+    if alloc.status == AllocationStatus.active and alloc.value != ip:
+        alloc.value = ip
+        await db.run_sync(lambda session: provisioning.enqueue_updates(
+            session, [(alloc, {"value"})], delay=settings.DDNS_COALESCE_SEC,
+        ))
+        # 其他副本缓存的旧值会把"改回旧 IP"误判为未变化
+        await invalidate_async(db, [alloc.id])
+    await db.commit()
+    target = _target(alloc)
+    if target is not None:
+        target_cache.put(token_hash, target)
+    return target
+
+listener.subscribe(CHANNEL, lambda payload: target_cache.discard(json.loads(payload)))
+listener.on_reconnect(target_cache.clear)
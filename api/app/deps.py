@@ -1,5 +1,9 @@
+from fastapi import Security
 from sqlalchemy.orm import Session
-from .db import SessionLocal
+from .db import SessionLocal, AsyncSessionLocal
+from .auth import require_user
+from .schemas import TokenData
+from .replicas import replica_set
 
 def get_db():
     """数据库依赖注入"""
@@ -8,3 +12,13 @@ def get_db():
         yield db
     finally:
         db.close()
+
+async def get_async_db():
+    """异步数据库会话依赖注入"""
+    async with AsyncSessionLocal() as db:
+        yield db
+
+async def get_read_db(user: TokenData = Security(require_user)):
+    """只读会话：轮询健康的只读副本，用户刚写入过或无可用副本时使用主库"""
+    async with replica_set.sessionmaker_for(user.sub)() as db:
+        yield db
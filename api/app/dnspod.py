@@ -1,25 +1,232 @@
-import os
-from tencentcloud.common import credential
-from tencentcloud.dnspod.v20210323 import dnspod_client, models
+"""腾讯云 DNSPod API 调用：客户端复用、重试与耗时统计，业务代码通过 providers.dnspod 使用
+
+腾讯云 SDK 体积较大，首次调用时才导入，只读取 call_stats 的 API 进程不会加载。
+"""
+import logging
+import threading
+import time
+from contextlib import contextmanager
+
+from tenacity import Retrying, retry_if_exception, stop_after_attempt, wait_exponential
+
+from .config import get_settings
+from .metrics import DNSPOD_LATENCY
+
+settings = get_settings()
+logger = logging.getLogger(__name__)
+
+# 可重试的错误码：网络错误与限频，业务错误（如记录已存在）不重试
+_RETRYABLE_CODES = {"ClientNetworkError", "ServerNetworkError", "InternalError"}
+# 不幂等的接口，重试可能重复创建记录
+_NON_IDEMPOTENT = {"CreateRecord", "CreateRecordBatch"}
+
+_local = threading.local()
+_domain_ids: dict[str, int] = {}
+_stats: dict[str, dict] = {}
+_stats_lock = threading.Lock()
+
+def _models():
+    from tencentcloud.dnspod.v20210323 import models
+
+    return models
 
 def get_client():
-    cred = credential.Credential(os.getenv("DNSPOD_SECRET_ID"), os.getenv("DNSPOD_SECRET_KEY"))
-    return dnspod_client.DnspodClient(cred, "")
+    """获取当前线程复用的 DNSPod 客户端（keep-alive 长连接，进程内复用）"""
+    client = getattr(_local, "client", None)
+    if client is None:
+        from tencentcloud.common import credential
+        from tencentcloud.common.profile.client_profile import ClientProfile
+        from tencentcloud.common.profile.http_profile import HttpProfile
+        from tencentcloud.dnspod.v20210323 import dnspod_client
+
+        endpoint, protocol = settings.DNSPOD_ENDPOINT, None
+        if "://" in endpoint:
+            # 允许 http://host:port 形式，便于接入本地压测桩（bench/fake_dnspod.py）
+            protocol, endpoint = endpoint.split("://", 1)
+        http_profile = HttpProfile(protocol=protocol, reqTimeout=settings.DNSPOD_TIMEOUT, keepAlive=True)
+        if endpoint:
+            http_profile.endpoint = endpoint
+        http_profile.pre_conn_pool_size = settings.DNSPOD_POOL_SIZE
+        cred = credential.Credential(settings.DNSPOD_SECRET_ID, settings.DNSPOD_SECRET_KEY)
+        client = dnspod_client.DnspodClient(cred, settings.DNSPOD_REGION, ClientProfile(httpProfile=http_profile))
+        _local.client = client
+    return client
+
+def _error_code(exc: BaseException) -> str | None:
+    from tencentcloud.common.exception.tencent_cloud_sdk_exception import TencentCloudSDKException
+
+    return (exc.get_code() or "") if isinstance(exc, TencentCloudSDKException) else None
+
+def _is_rejected(exc: BaseException) -> bool:
+    """限频：请求在处理前被拒绝，确定未生效"""
+    return (_error_code(exc) or "").startswith("RequestLimitExceeded")
+
+def _is_retryable(exc: BaseException) -> bool:
+    code = _error_code(exc)
+    return code is not None and (code in _RETRYABLE_CODES or _is_rejected(exc))
+
+@contextmanager
+def _timed(action: str):
+    """记录单次 DNSPod 调用耗时"""
+    start = time.perf_counter()
+    ok = False
+    try:
+        yield
+        ok = True
+    finally:
+        elapsed = time.perf_counter() - start
+        elapsed_ms = elapsed * 1000
+        DNSPOD_LATENCY.labels(action, "ok" if ok else "error").observe(elapsed)
+        with _stats_lock:
+            s = _stats.setdefault(action, {"calls": 0, "errors": 0, "total_ms": 0.0, "max_ms": 0.0})
+            s["calls"] += 1
+            s["errors"] += 0 if ok else 1
+            s["total_ms"] += elapsed_ms
+            s["max_ms"] = max(s["max_ms"], elapsed_ms)
+        if elapsed_ms >= settings.DNSPOD_SLOW_MS:
+            logger.warning("DNSPod %s slow: %.1fms (ok=%s)", action, elapsed_ms, ok)
+        else:
+            logger.debug("DNSPod %s took %.1fms (ok=%s)", action, elapsed_ms, ok)
+
+def _call(action: str, req, recover=None):
+    """带超时重试的 DNSPod 调用，每次尝试单独计时
 
-def create_record(subdomain: str, record_type: str, value: str, ttl: int = None):
+    创建类接口不幂等：网络错误或服务端内部错误时请求可能已经生效，直接重试会产生重复记录。
+    这类接口只在限频拒绝后自动重试；提供 recover 时，重试前先用它查找已生效的结果，
+    找到即作为本次调用的结果返回。
+    """
     client = get_client()
+    idempotent = action not in _NON_IDEMPOTENT
+
+    def retryable(exc: BaseException) -> bool:
+        return _is_retryable(exc) and (idempotent or recover is not None or _is_rejected(exc))
+
+    maybe_applied = False
+    for attempt in Retrying(
+        stop=stop_after_attempt(settings.DNSPOD_RETRIES + 1),
+        wait=wait_exponential(multiplier=0.2, max=5),
+        retry=retry_if_exception(retryable),
+        reraise=True,
+    ):
+        with attempt:
+            if maybe_applied:
+                found = recover()
+                if found is not None:
+                    return found
+            try:
+                with _timed(action):
+                    return getattr(client, action)(req)
+            except Exception as e:
+                maybe_applied = not idempotent and not _is_rejected(e)
+                raise
+
+def call_stats() -> dict:
+    """返回各 DNSPod 接口的调用次数与耗时统计"""
+    with _stats_lock:
+        return {
+            action: {**s, "avg_ms": round(s["total_ms"] / s["calls"], 1) if s["calls"] else 0.0}
+            for action, s in _stats.items()
+        }
+
+def create_record(subdomain: str, record_type: str, value: str, ttl: int = None, domain: str = None):
+    models = _models()
     req = models.CreateRecordRequest()
-    req.Domain = os.getenv("DNS_ROOT_DOMAIN")     # example.com
-    req.SubDomain = subdomain                      # alice
-    req.RecordType = record_type                   # A / CNAME / TXT...
+    req.Domain = domain or settings.DNS_ROOT_DOMAIN  # example.com
+    req.SubDomain = subdomain                        # alice
+    req.RecordType = record_type                     # A / CNAME / TXT...
     req.RecordLine = "默认"
     req.Value = value
-    req.TTL = ttl or int(os.getenv("DNS_DEFAULT_TTL","600"))
-    return client.CreateRecord(req)
+    req.TTL = ttl or settings.DNS_DEFAULT_TTL
+    # 失败后按 (子域名, 类型, 值) 查找，上次尝试已生效时直接取用该记录（同样带 RecordId）
+    return _call("CreateRecord", req, recover=lambda: next(
+        (r for r in list_records(req.Domain, subdomain=subdomain, record_type=record_type) if r.Value == value), None,
+    ))
 
-def delete_record(record_id: int):
-    client = get_client()
+def modify_record(record_id: int, subdomain: str, record_type: str, value: str, ttl: int = None, domain: str = None):
+    models = _models()
+    req = models.ModifyRecordRequest()
+    req.Domain = domain or settings.DNS_ROOT_DOMAIN
+    req.RecordId = record_id
+    req.SubDomain = subdomain
+    req.RecordType = record_type
+    req.RecordLine = "默认"
+    req.Value = value
+    req.TTL = ttl or settings.DNS_DEFAULT_TTL
+    return _call("ModifyRecord", req)
+
+def delete_record(record_id: int, domain: str = None):
+    models = _models()
     req = models.DeleteRecordRequest()
-    req.Domain = os.getenv("DNS_ROOT_DOMAIN")
+    req.Domain = domain or settings.DNS_ROOT_DOMAIN
     req.RecordId = record_id
-    return client.DeleteRecord(req)
+    return _call("DeleteRecord", req)
+
+def list_records(domain: str = None, page_size: int = 3000, subdomain: str = None, record_type: str = None):
+    """分页遍历域名下的解析记录（DescribeRecordList，单页最多 3000 条），可按子域名与类型过滤"""
+    models = _models()
+    offset = 0
+    while True:
+        req = models.DescribeRecordListRequest()
+        req.Domain = domain or settings.DNS_ROOT_DOMAIN
+        req.Offset = offset
+        req.Limit = page_size
+        req.ErrorOnEmpty = "no"
+        if subdomain:
+            req.Subdomain = subdomain
+        if record_type:
+            req.RecordType = record_type
+        resp = _call("DescribeRecordList", req)
+        records = resp.RecordList or []
+        yield from records
+        offset += len(records)
+        total = resp.RecordCountInfo.TotalCount if resp.RecordCountInfo else 0
+        if not records or offset >= total:
+            return
+
+def domain_id(domain: str) -> int:
+    """域名在 DNSPod 中的 ID（批量接口按 ID 指定域名），进程内缓存"""
+    cached = _domain_ids.get(domain)
+    if cached is None:
+        req = _models().DescribeDomainRequest()
+        req.Domain = domain
+        cached = _domain_ids[domain] = int(_call("DescribeDomain", req).DomainInfo.DomainId)
+    return cached
+
+def create_record_batch(domain: str, records: list[dict]):
+    """一次调用批量添加记录（异步任务），records 为 SubDomain/RecordType/Value/TTL 字典，返回 JobId"""
+    models = _models()
+    req = models.CreateRecordBatchRequest()
+    req.DomainIdList = [str(domain_id(domain))]
+    items = []
+    for r in records:
+        item = models.AddRecordBatch()
+        item.SubDomain = r["SubDomain"]
+        item.RecordType = r["RecordType"]
+        item.Value = r["Value"]
+        item.TTL = r.get("TTL") or settings.DNS_DEFAULT_TTL
+        item.RecordLine = "默认"
+        items.append(item)
+    req.RecordList = items
+    return _call("CreateRecordBatch", req).JobId
+
+def delete_record_batch(record_ids: list[int]):
+    """一次调用批量删除记录（异步任务），返回 JobId"""
+    models = _models()
+    req = models.DeleteRecordBatchRequest()
+    req.RecordIdList = [int(i) for i in record_ids]
+    return _call("DeleteRecordBatch", req).JobId
+
+def modify_record_batch(record_ids: list[int], change: str, change_to: str):
+    """一次调用把多条记录的同一字段改为同一值（异步任务），返回 JobId"""
+    models = _models()
+    req = models.ModifyRecordBatchRequest()
+    req.RecordIdList = [int(i) for i in record_ids]
+    req.Change = change
+    req.ChangeTo = change_to
+    return _call("ModifyRecordBatch", req).JobId
+
+def describe_batch_task(job_id: int):
+    models = _models()
+    req = models.DescribeBatchTaskRequest()
+    req.JobId = job_id
+    return _call("DescribeBatchTask", req)
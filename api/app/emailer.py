@@ -1,28 +1,175 @@
-import os, httpx
-from email.message import EmailMessage
+"""邮件发送：连接在进程内复用，支持批量发送
+
+由 worker 调用（同步），API 进程只写 mail_outbox，不直接发信。
+"""
+import logging
 import smtplib
+import threading
+import time
+from dataclasses import dataclass
+from email.message import EmailMessage
+from typing import TYPE_CHECKING
+
+from .config import get_settings
+from .metrics import EMAIL_LATENCY, timed
+
+if TYPE_CHECKING:
+    import httpx
+
+settings = get_settings()
+logger = logging.getLogger(__name__)
+
+RESEND_BATCH_MAX = 100  # Resend /emails/batch 单次上限
 
-async def send_verification(to: str, verify_url: str):
-    subj = "Verify your email"
+@dataclass
+class Mail:
+    to: str
+    subject: str
+    html: str
+    text: str | None = None
+
+def render_verification(to: str, verify_url: str) -> Mail:
+    """生成邮箱验证邮件"""
     html = f"""<p>点击验证：</p><p><a href="{verify_url}">{verify_url}</a></p>"""
+    return Mail(to=to, subject="Verify your email", html=html,
+                text="请复制到浏览器打开验证链接：" + verify_url)
+
+class ResendSender:
+    """Resend 发送，复用同一个 HTTP 客户端（keep-alive），多封邮件走批量接口"""
+    provider = "resend"
+
+    def __init__(self):
+        self._client: "httpx.Client | None" = None
+
+    @property
+    def client(self) -> "httpx.Client":
+        if self._client is None:
+            import httpx  # 只有 worker 发信时才需要
+
+            self._client = httpx.Client(
+                base_url="https://api.resend.com",
+                headers={"Authorization": f"Bearer {settings.RESEND_API_KEY}"},
+                timeout=settings.MAIL_TIMEOUT,
+            )
+        return self._client
+
+    def _body(self, mail: Mail) -> dict:
+        body = {"from": settings.EMAIL_FROM, "to": [mail.to], "subject": mail.subject, "html": mail.html}
+        if mail.text:
+            body["text"] = mail.text
+        return body
 
-    if os.getenv("MAIL_PROVIDER") == "RESEND":
-        async with httpx.AsyncClient(base_url="https://api.resend.com") as client:
-            r = await client.post("/emails",
-                headers={"Authorization": f"Bearer {os.getenv('RESEND_API_KEY')}"},
-                json={"from": os.getenv("EMAIL_FROM"),
-                      "to": [to],
-                      "subject": subj,
-                      "html": html})
-            r.raise_for_status()
-    else:
+    def send_many(self, mails: list[Mail]) -> list[Exception | None]:
+        """批量发送；Resend 批量接口整体成功或失败，错误应用到整批"""
+        results: list[Exception | None] = []
+        for i in range(0, len(mails), RESEND_BATCH_MAX):
+            chunk = mails[i:i + RESEND_BATCH_MAX]
+            try:
+                with timed(EMAIL_LATENCY, provider=self.provider):
+                    if len(chunk) == 1:
+                        r = self.client.post("/emails", json=self._body(chunk[0]))
+                    else:
+                        r = self.client.post("/emails/batch", json=[self._body(m) for m in chunk])
+                    r.raise_for_status()
+                results.extend([None] * len(chunk))
+            except Exception as e:
+                results.extend([e] * len(chunk))
+        return results
+
+    def close(self):
+        if self._client is not None:
+            self._client.close()
+            self._client = None
+
+class SmtpSender:
+    """SMTP 发送，保持一条已登录的长连接，断开后自动重连"""
+    provider = "smtp"
+
+    def __init__(self):
+        self._conn: smtplib.SMTP | None = None
+        self._last_used = 0.0
+        self._lock = threading.Lock()
+
+    def _connect(self) -> smtplib.SMTP:
+        conn = smtplib.SMTP(settings.SMTP_HOST, settings.SMTP_PORT, timeout=settings.MAIL_TIMEOUT)
+        conn.starttls()
+        if settings.SMTP_USER:
+            conn.login(settings.SMTP_USER, settings.SMTP_PASS)
+        return conn
+
+    def _connection(self) -> smtplib.SMTP:
+        if self._conn is not None and time.monotonic() - self._last_used > settings.SMTP_IDLE_SEC:
+            # 长时间空闲的连接可能已被服务器关闭，先探活
+            try:
+                if self._conn.noop()[0] != 250:
+                    raise smtplib.SMTPServerDisconnected("NOOP failed")
+            except smtplib.SMTPException:
+                self._drop()
+        if self._conn is None:
+            self._conn = self._connect()
+        return self._conn
+
+    def _drop(self):
+        if self._conn is not None:
+            try:
+                self._conn.quit()
+            except Exception:
+                pass
+            self._conn = None
+
+    def _message(self, mail: Mail) -> EmailMessage:
         msg = EmailMessage()
-        msg["From"] = os.getenv("EMAIL_FROM")
-        msg["To"] = to
-        msg["Subject"] = subj
-        msg.set_content("请复制到浏览器打开验证链接：" + verify_url)
-        msg.add_alternative(html, subtype="html")
-        with smtplib.SMTP(os.getenv("SMTP_HOST"), int(os.getenv("SMTP_PORT"))) as s:
-            s.starttls()
-            s.login(os.getenv("SMTP_USER"), os.getenv("SMTP_PASS"))
-            s.send_message(msg)
+        msg["From"] = settings.EMAIL_FROM
+        msg["To"] = mail.to
+        msg["Subject"] = mail.subject
+        msg.set_content(mail.text or "")
+        msg.add_alternative(mail.html, subtype="html")
+        return msg
+
+    def _send_one(self, mail: Mail):
+        msg = self._message(mail)
+        try:
+            self._connection().send_message(msg)
+        except (smtplib.SMTPServerDisconnected, ConnectionError):
+            # 连接被服务器断开，重连后重试一次
+            self._drop()
+            self._connection().send_message(msg)
+        self._last_used = time.monotonic()
+
+    def send_many(self, mails: list[Mail]) -> list[Exception | None]:
+        """同一连接上逐封发送，单封失败不影响其他邮件"""
+        results: list[Exception | None] = []
+        with self._lock:
+            for mail in mails:
+                try:
+                    with timed(EMAIL_LATENCY, provider=self.provider):
+                        self._send_one(mail)
+                    results.append(None)
+                except Exception as e:
+                    if not isinstance(e, smtplib.SMTPRecipientsRefused):
+                        self._drop()
+                    results.append(e)
+        return results
+
+    def close(self):
+        with self._lock:
+            self._drop()
+
+_sender = None
+_sender_lock = threading.Lock()
+
+def get_sender():
+    """进程内共享的发送器，按 MAIL_PROVIDER 选择"""
+    global _sender
+    if _sender is None:
+        with _sender_lock:
+            if _sender is None:
+                _sender = ResendSender() if settings.MAIL_PROVIDER.upper() == "RESEND" else SmtpSender()
+    return _sender
+
+def close_sender():
+    global _sender
+    with _sender_lock:
+        if _sender is not None:
+            _sender.close()
+            _sender = None
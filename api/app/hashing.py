@@ -0,0 +1,93 @@
+"""密码哈希：argon2 计算放到独立的有界执行器中，避免阻塞事件循环和默认线程池"""
+import asyncio
+import threading
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from functools import lru_cache
+
+from fastapi import HTTPException
+from passlib.context import CryptContext
+
+from .config import get_settings
+
+settings = get_settings()
+
+Argon2Params = tuple[int, int, int]  # (time_cost, memory_cost KiB, parallelism)
+
+DEFAULT_PARAMS: Argon2Params = (settings.ARGON2_TIME_COST, settings.ARGON2_MEMORY_COST, settings.ARGON2_PARALLELISM)
+
+@lru_cache(maxsize=8)
+def build_context(time_cost: int, memory_cost: int, parallelism: int) -> CryptContext:
+    return CryptContext(
+        schemes=["argon2"],
+        deprecated="auto",
+        argon2__rounds=time_cost,
+        argon2__memory_cost=memory_cost,
+        argon2__parallelism=parallelism,
+    )
+
+pwd_context = build_context(*DEFAULT_PARAMS)
+
+# 模块级函数，便于进程池序列化调用
+def _hash(params: Argon2Params, password: str) -> str:
+    return build_context(*params).hash(password)
+
+def _verify_and_update(params: Argon2Params, plain: str, hashed: str) -> tuple[bool, str | None]:
+    """校验密码；若哈希参数已过时，顺带返回按当前参数重新计算的哈希"""
+    return build_context(*params).verify_and_update(plain, hashed)
+
+class PasswordHasher:
+    def __init__(self, params: Argon2Params = DEFAULT_PARAMS, executor: str = None,
+                 workers: int = None, max_queue: int = None):
+        self.params = params
+        self.executor_kind = executor or settings.HASH_EXECUTOR
+        self.workers = workers or settings.HASH_WORKERS
+        self.max_queue = settings.HASH_MAX_QUEUE if max_queue is None else max_queue
+        self._executor: Executor | None = None
+        self._lock = threading.Lock()
+        self._inflight = 0
+
+    def hash(self, password: str) -> str:
+        return _hash(self.params, password)
+
+    def verify(self, hashed: str, plain: str) -> bool:
+        return _verify_and_update(self.params, plain, hashed)[0]
+
+    async def hash_async(self, password: str) -> str:
+        return await self._submit(_hash, self.params, password)
+
+    async def verify_async(self, hashed: str, plain: str) -> tuple[bool, str | None]:
+        """返回 (是否匹配, 需要替换的新哈希或 None)"""
+        return await self._submit(_verify_and_update, self.params, plain, hashed)
+
+    @property
+    def inflight(self) -> int:
+        return self._inflight
+
+    def _get_executor(self) -> Executor:
+        if self._executor is None:
+            with self._lock:
+                if self._executor is None:
+                    if self.executor_kind == "process":
+                        self._executor = ProcessPoolExecutor(max_workers=self.workers)
+                    else:
+                        # argon2-cffi 计算期间释放 GIL，线程池即可并行
+                        self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="argon2")
+        return self._executor
+
+    async def _submit(self, fn, *args):
+        # 准入控制：执行中 + 排队超过上限时直接 503，避免请求堆积拖垮延迟
+        if self._inflight >= self.workers + self.max_queue:
+            raise HTTPException(503, "Server busy, please retry later", headers={"Retry-After": "1"})
+        self._inflight += 1
+        try:
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(self._get_executor(), fn, *args)
+        finally:
+            self._inflight -= 1
+
+    def shutdown(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+pwd_hasher = PasswordHasher()
@@ -1,21 +1,80 @@
+import time
+
+_import_started = time.perf_counter()  # 尽早记录，统计应用模块（含 FastAPI、SQLAlchemy）的导入耗时
+
+import asyncio
+import logging
+from contextlib import asynccontextmanager
+
 from fastapi import FastAPI, Depends
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse
+from fastapi.responses import JSONResponse, Response
 from sqlalchemy.orm import Session
 
 from .models import Base
-from .db import engine
+from .db import async_engine, AsyncSessionLocal
 from .deps import get_db
-from .routers import auth, users, domains, admin
+from .routers import auth, users, domains, admin, ddns
 from .schemas import HealthCheck
+from .zones import domain_cache
+from .availability import availability_index
+from .revocation import revocations
+from .notify import listener
+from . import metrics, maintenance
+from .config import get_settings
+from .ratelimit import RateLimitMiddleware, rate_limiter
+from .replicas import ReadAfterWriteMiddleware, replica_set
+
+settings = get_settings()
+# 使用 uvicorn 已配置的日志器，启动报告与 "Application startup complete" 一起输出
+logger = logging.getLogger("uvicorn.error")
+
+LISTEN_WAIT_SEC = 10
 
-# 创建数据库表
-Base.metadata.create_all(bind=engine)
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    started = time.perf_counter()
+    if settings.DB_AUTO_CREATE:
+        # 导入模块不再连接数据库；表结构由 alembic 和 start.sh 负责时可关闭
+        async with async_engine.begin() as conn:
+            await conn.run_sync(Base.metadata.create_all)
+    schema_done = time.perf_counter()
+    # 先 LISTEN 再加载快照，加载期间提交的变更不会丢失
+    if not await asyncio.to_thread(listener.start, LISTEN_WAIT_SEC):
+        logger.warning("LISTEN not ready after %ss, snapshots will be reloaded once connected", LISTEN_WAIT_SEC)
+    # 预热根域名缓存，请求路径上不再查询 domains 表
+    async with AsyncSessionLocal() as db:
+        await domain_cache.warm_async(db)
+        await availability_index.load_async(db)
+        await revocations.load_async(db)
+    # 首次检查通过的副本才参与读路由
+    await replica_set.check()
+    ready = time.perf_counter()
+    phases = {"import": started - _import_started, "schema": schema_done - started,
+              "warmup": ready - schema_done, "total": ready - _import_started}
+    for phase, seconds in phases.items():
+        metrics.STARTUP_SECONDS.labels(phase).set(seconds)
+    logger.info("Startup took %.0fms (%s)", phases["total"] * 1000,
+                ", ".join(f"{k} {v * 1000:.0f}ms" for k, v in phases.items() if k != "total"))
+    cleanup_task = replica_task = None
+    if settings.CLEANUP_INTERVAL_SEC > 0:
+        cleanup_task = asyncio.create_task(maintenance.schedule(settings.CLEANUP_INTERVAL_SEC))
+    if replica_set.replicas:
+        replica_task = asyncio.create_task(replica_set.monitor(settings.DB_REPLICA_CHECK_SEC))
+    yield
+    for task in (cleanup_task, replica_task):
+        if task:
+            task.cancel()
+    listener.stop()
+    await rate_limiter.close()
+    await replica_set.dispose()
+    await async_engine.dispose()
 
 app = FastAPI(
     title="Domain Distribution API", 
     description="域名分发系统API",
-    version="1.0.0"
+    version="1.0.0",
+    lifespan=lifespan
 )
 
 # CORS中间件
@@ -27,11 +86,21 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# 限流在路由之前执行，被拒绝的请求不会占用数据库连接或哈希线程
+app.add_middleware(RateLimitMiddleware)
+
+# 写请求成功后标记用户，随后的列表读取走主库（仅配置只读副本时生效）
+app.add_middleware(ReadAfterWriteMiddleware)
+
+# 指标中间件放在最外层，CORS 预检等请求也计入
+app.add_middleware(metrics.MetricsMiddleware)
+
 # 路由
 app.include_router(auth.router, prefix="/auth", tags=["认证"])
 app.include_router(users.router, prefix="/users", tags=["用户"])
 app.include_router(domains.router, prefix="/allocations", tags=["域名分发"])
 app.include_router(admin.router, prefix="/admin", tags=["管理员"])
+app.include_router(ddns.router, prefix="/ddns", tags=["DDNS"])
 
 @app.get("/", response_model=HealthCheck)
 def root():
@@ -41,6 +110,11 @@ def root():
 def health_check():
     return {"status": "ok"}
 
+@app.get("/metrics", include_in_schema=False)
+def prometheus_metrics():
+    body, content_type = metrics.render()
+    return Response(content=body, media_type=content_type)
+
 @app.exception_handler(Exception)
 async def global_exception_handler(request, exc):
     return JSONResponse(
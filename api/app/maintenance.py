@@ -0,0 +1,170 @@
+"""过期数据清理：过期邮箱令牌与刷新令牌、长期未验证的用户、超期未审批的申请、已完成的任务与邮件
+
+用法: python -m app.maintenance [--task NAME ...]
+也可设置 CLEANUP_INTERVAL_SEC 由 API 进程定时执行。多个实例通过 advisory lock
+保证同一时间只有一个在清理；每批删除单独提交，不长时间持有行锁。
+"""
+import argparse
+import asyncio
+import datetime as dt
+import json
+import logging
+import time
+
+from sqlalchemy import delete, exists, func, select, text
+from sqlalchemy.exc import IntegrityError, OperationalError
+from sqlalchemy.orm import Session
+
+from .models import (Allocation, AllocationStatus, Domain, EmailToken, JobStatus, MailOutbox,
+                     ProvisioningJob, RefreshToken, Role, User)
+from .availability import availability_index, broadcast
+from .config import get_settings
+from .db import SessionLocal, engine
+from . import quota
+
+settings = get_settings()
+logger = logging.getLogger("app.maintenance")
+
+_LOCK_KEY = 0x444E534D  # pg_advisory_lock 键，所有实例共用
+_FINISHED = (JobStatus.done, JobStatus.failed)
+
+def _delete_batches(db: Session, model, *conds, returning=(), on_batch=None, after_commit=None) -> int:
+    """按主键顺序分批删除满足条件的行，每批一个短事务，返回删除总数。
+    on_batch 在批次事务内执行，after_commit 在该批提交成功后更新进程内状态"""
+    total = 0
+    while True:
+        ids = (
+            select(model.id).where(*conds).order_by(model.id)
+            .limit(settings.CLEANUP_BATCH_SIZE)
+            .with_for_update(skip_locked=True)
+            .scalar_subquery()
+        )
+        stmt = delete(model).where(model.id.in_(ids)).execution_options(synchronize_session=False)
+        if returning:
+            stmt = stmt.returning(*returning)
+        # 遇到被业务事务锁住的行时快速失败，而不是排队等待
+        db.execute(text("SET LOCAL lock_timeout = '2s'"))
+        result = db.execute(stmt)
+        rows = result.all() if returning else None
+        count = len(rows) if returning else result.rowcount
+        if on_batch and rows:
+            on_batch(db, rows)
+        db.commit()
+        if after_commit and rows:
+            after_commit(rows)
+        total += count
+        if count < settings.CLEANUP_BATCH_SIZE:
+            return total
+
+def _pending_keys(rows) -> list[tuple]:
+    return [(d, s, t) for d, s, t, _ in rows]
+
+def _release_pending(db: Session, rows) -> None:
+    broadcast(db, "remove", _pending_keys(rows))
+    quota.release(db, quota.released((user_id, AllocationStatus.pending) for *_, user_id in rows))
+
+def _discard_pending(rows) -> None:
+    availability_index.discard(_pending_keys(rows))
+
+def cleanup_tokens(db: Session) -> int:
+    return _delete_batches(db, EmailToken, EmailToken.expire_at < dt.datetime.utcnow())
+
+def cleanup_refresh_tokens(db: Session) -> int:
+    # 过期令牌本身已无法通过 JWT 校验，吊销列表只保留访问令牌有效期内的会话
+    return _delete_batches(db, RefreshToken, RefreshToken.expires_at < dt.datetime.utcnow())
+
+def cleanup_unverified_users(db: Session) -> int:
+    if settings.CLEANUP_UNVERIFIED_DAYS <= 0:
+        return 0
+    cutoff = dt.datetime.utcnow() - dt.timedelta(days=settings.CLEANUP_UNVERIFIED_DAYS)
+    return _delete_batches(
+        db, User,
+        User.email_verified_at.is_(None),
+        User.created_at < cutoff,
+        User.role == Role.user,
+        # 外键未设置级联删除的引用：有分发或创建过根域名的用户保留
+        ~exists().where(Allocation.user_id == User.id),
+        ~exists().where(Domain.created_by == User.id),
+    )
+
+def cleanup_pending(db: Session) -> int:
+    if settings.CLEANUP_PENDING_DAYS <= 0:
+        return 0
+    cutoff = dt.datetime.utcnow() - dt.timedelta(days=settings.CLEANUP_PENDING_DAYS)
+    return _delete_batches(
+        db, Allocation,
+        Allocation.status == AllocationStatus.pending,
+        Allocation.created_at < cutoff,
+        returning=(Allocation.domain_id, Allocation.subdomain, Allocation.type, Allocation.user_id),
+        on_batch=_release_pending,
+        after_commit=_discard_pending,
+    )
+
+def cleanup_jobs(db: Session) -> int:
+    if settings.CLEANUP_FINISHED_DAYS <= 0:
+        return 0
+    cutoff = dt.datetime.utcnow() - dt.timedelta(days=settings.CLEANUP_FINISHED_DAYS)
+    return _delete_batches(db, ProvisioningJob,
+                           ProvisioningJob.status.in_(_FINISHED), ProvisioningJob.updated_at < cutoff)
+
+def cleanup_mail(db: Session) -> int:
+    if settings.CLEANUP_FINISHED_DAYS <= 0:
+        return 0
+    cutoff = dt.datetime.utcnow() - dt.timedelta(days=settings.CLEANUP_FINISHED_DAYS)
+    return _delete_batches(db, MailOutbox, MailOutbox.status.in_(_FINISHED), MailOutbox.created_at < cutoff)
+
+TASKS = {
+    "tokens": cleanup_tokens,
+    "refresh_tokens": cleanup_refresh_tokens,
+    "unverified_users": cleanup_unverified_users,
+    "pending_allocations": cleanup_pending,
+    "jobs": cleanup_jobs,
+    "mail": cleanup_mail,
+}
+
+def run_once(tasks: list[str] | None = None) -> dict | None:
+    """执行一轮清理，返回各项删除行数；其他实例正在清理时返回 None"""
+    with engine.connect() as lock_conn:
+        if not lock_conn.scalar(select(func.pg_try_advisory_lock(_LOCK_KEY))):
+            logger.info("Cleanup already running elsewhere, skipped")
+            return None
+        lock_conn.commit()
+        try:
+            report = {}
+            start = time.perf_counter()
+            for name in tasks or TASKS:
+                with SessionLocal() as db:
+                    try:
+                        report[name] = TASKS[name](db)
+                    except (OperationalError, IntegrityError) as e:
+                        # 多为 lock_timeout 或新增的外键引用，已提交的批次保留，其余清理项照常执行
+                        db.rollback()
+                        logger.warning("Cleanup %s interrupted: %s", name, e.orig)
+                        report[name] = None
+            report["elapsed_ms"] = round((time.perf_counter() - start) * 1000, 1)
+            logger.info("Cleanup finished: %s", report)
+            return report
+        finally:
+            lock_conn.execute(select(func.pg_advisory_unlock(_LOCK_KEY)))
+            lock_conn.commit()
+
+async def schedule(interval: int) -> None:
+    """API 进程内的定时清理，删除在线程中执行，不阻塞事件循环"""
+    while True:
+        await asyncio.sleep(interval)
+        try:
+            await asyncio.to_thread(run_once)
+        except Exception:
+            logger.exception("Scheduled cleanup failed")
+
+def main():
+    parser = argparse.ArgumentParser(description="Delete expired tokens and stale records")
+    parser.add_argument("--task", action="append", choices=sorted(TASKS), help="只执行指定清理项，可重复")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s [%(name)s] %(message)s")
+    report = run_once(args.task)
+    print(json.dumps(report, ensure_ascii=False))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,96 @@
+"""Prometheus 指标
+
+请求耗时按路由模板（而不是实际路径）统计，避免标签基数随 ID 增长；
+连接池使用情况在抓取时才读取，不占用请求路径。
+"""
+import time
+from contextlib import contextmanager
+
+from prometheus_client import CONTENT_TYPE_LATEST, REGISTRY, Counter, Gauge, Histogram, generate_latest
+from prometheus_client.core import GaugeMetricFamily
+
+_LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+
+HTTP_LATENCY = Histogram(
+    "http_request_duration_seconds", "HTTP 请求耗时",
+    ["method", "route", "status"], buckets=_LATENCY_BUCKETS,
+)
+DNSPOD_LATENCY = Histogram(
+    "dnspod_call_duration_seconds", "DNSPod 接口单次调用耗时（含失败）",
+    ["action", "outcome"], buckets=_LATENCY_BUCKETS,
+)
+EMAIL_LATENCY = Histogram(
+    "email_send_duration_seconds", "邮件发送耗时",
+    ["provider", "outcome"], buckets=_LATENCY_BUCKETS,
+)
+AUTH_FAILURES = Counter("auth_failures_total", "认证/鉴权失败次数", ["reason"])
+RATE_LIMITED = Counter("rate_limited_total", "被限流拒绝的请求数", ["rule"])
+DB_READ_ROUTE = Counter("db_read_route_total", "只读会话路由目标（副本名或回退主库的原因）", ["target"])
+DB_REPLICA_LAG = Gauge("db_replica_lag_seconds", "只读副本复制延迟", ["replica"])
+DB_REPLICA_HEALTHY = Gauge("db_replica_healthy", "只读副本是否参与路由", ["replica"])
+STARTUP_SECONDS = Gauge("api_startup_seconds", "进程启动各阶段耗时（import/schema/warmup/total）", ["phase"])
+DDNS_UPDATES = Counter("ddns_updates_total", "DDNS 上报次数（good/nochg/错误码）", ["result"])
+
+@contextmanager
+def timed(histogram: Histogram, **labels):
+    """计时代码块，按是否抛出异常记录 outcome=ok|error"""
+    start = time.perf_counter()
+    outcome = "error"
+    try:
+        yield
+        outcome = "ok"
+    finally:
+        histogram.labels(outcome=outcome, **labels).observe(time.perf_counter() - start)
+
+class PoolCollector:
+    """抓取时读取 SQLAlchemy 连接池状态"""
+
+    def collect(self):
+        from .db import engine, async_engine, replica_engines
+
+        size = GaugeMetricFamily("db_pool_size", "连接池常驻连接数", labels=["engine"])
+        checked_out = GaugeMetricFamily("db_pool_checked_out", "已借出的连接数", labels=["engine"])
+        overflow = GaugeMetricFamily("db_pool_overflow", "超出 pool_size 的溢出连接数", labels=["engine"])
+        pools = [("sync", engine.pool), ("async", async_engine.sync_engine.pool)]
+        pools += [(f"replica{i}", e.sync_engine.pool) for i, e in enumerate(replica_engines)]
+        for name, pool in pools:
+            size.add_metric([name], pool.size())
+            checked_out.add_metric([name], pool.checkedout())
+            overflow.add_metric([name], max(pool.overflow(), 0))
+        yield size
+        yield checked_out
+        yield overflow
+
+class MetricsMiddleware:
+    """纯 ASGI 中间件：记录每个请求的路由、状态码与耗时"""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        start = time.perf_counter()
+        status = 500
+
+        async def send_wrapper(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            # 路由匹配后 FastAPI 会把 route 写回 scope；未匹配的请求归为一类
+            route = scope.get("route")
+            path = getattr(route, "path", None) or "unmatched"
+            HTTP_LATENCY.labels(scope["method"], path, str(status)).observe(time.perf_counter() - start)
+
+def render() -> tuple[bytes, str]:
+    """生成 /metrics 响应内容"""
+    return generate_latest(REGISTRY), CONTENT_TYPE_LATEST
+
+REGISTRY.register(PoolCollector())
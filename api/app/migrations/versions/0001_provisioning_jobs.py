@@ -0,0 +1,52 @@
+"""add provisioning jobs queue
+
+Revision ID: 0001_provisioning_jobs
+Revises: 
+Create Date: 2026-10-18 10:00:00
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0001_provisioning_jobs'
+down_revision = None
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    inspector = sa.inspect(op.get_bind())
+    # 全新数据库由应用启动时 create_all 建表，迁移只负责已有库的增量变更
+    if not inspector.has_table("allocations"):
+        return
+
+    with op.get_context().autocommit_block():
+        op.execute("ALTER TYPE allocationstatus ADD VALUE IF NOT EXISTS 'provisioning' AFTER 'pending'")
+
+    if not inspector.has_table("provisioning_jobs"):
+        op.create_table(
+            "provisioning_jobs",
+            sa.Column("id", sa.Integer(), primary_key=True),
+            sa.Column("allocation_id", sa.Integer(), sa.ForeignKey("allocations.id", ondelete="SET NULL"), nullable=True),
+            sa.Column("action", sa.String(16), nullable=False),
+            sa.Column("payload", sa.JSON(), nullable=True),
+            sa.Column("status", sa.Enum("queued", "running", "done", "failed", name="jobstatus"), nullable=False),
+            sa.Column("attempts", sa.Integer(), nullable=False),
+            sa.Column("max_attempts", sa.Integer(), nullable=False),
+            sa.Column("run_after", sa.DateTime(), nullable=False),
+            sa.Column("locked_until", sa.DateTime(), nullable=True),
+            sa.Column("last_error", sa.Text(), nullable=True),
+            sa.Column("created_at", sa.DateTime(), nullable=False),
+            sa.Column("updated_at", sa.DateTime(), nullable=False),
+        )
+        op.create_index("ix_provisioning_jobs_allocation_id", "provisioning_jobs", ["allocation_id"])
+        op.create_index("ix_provisioning_jobs_claim", "provisioning_jobs", ["status", "run_after"])
+
+
+def downgrade() -> None:
+    op.drop_index("ix_provisioning_jobs_claim", table_name="provisioning_jobs")
+    op.drop_index("ix_provisioning_jobs_allocation_id", table_name="provisioning_jobs")
+    op.drop_table("provisioning_jobs")
+    op.execute("DROP TYPE IF EXISTS jobstatus")
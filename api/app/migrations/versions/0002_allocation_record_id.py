@@ -0,0 +1,29 @@
+"""store provider record id on allocations
+
+Revision ID: 0002_allocation_record_id
+Revises: 0001_provisioning_jobs
+Create Date: 2026-10-18 11:00:00
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0002_allocation_record_id'
+down_revision = '0001_provisioning_jobs'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    inspector = sa.inspect(op.get_bind())
+    if not inspector.has_table("allocations"):
+        return
+    columns = {c["name"] for c in inspector.get_columns("allocations")}
+    if "provider_record_id" not in columns:
+        op.add_column("allocations", sa.Column("provider_record_id", sa.BigInteger(), nullable=True))
+
+
+def downgrade() -> None:
+    op.drop_column("allocations", "provider_record_id")
@@ -0,0 +1,39 @@
+"""composite indexes for admin allocation listing
+
+Revision ID: 0003_allocation_list_indexes
+Revises: 0002_allocation_record_id
+Create Date: 2026-10-18 12:00:00
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0003_allocation_list_indexes'
+down_revision = '0002_allocation_record_id'
+branch_labels = None
+depends_on = None
+
+INDEXES = [
+    ("ix_allocations_status_id", ["status", "id"], {}),
+    ("ix_allocations_user_id_id", ["user_id", "id"], {}),
+    ("ix_allocations_type_id", ["type", "id"], {}),
+    ("ix_allocations_subdomain_prefix", ["subdomain"], {"postgresql_ops": {"subdomain": "varchar_pattern_ops"}}),
+]
+
+
+def upgrade() -> None:
+    if not sa.inspect(op.get_bind()).has_table("allocations"):
+        return
+    # CONCURRENTLY 不能在事务中执行；建索引期间不阻塞写入
+    with op.get_context().autocommit_block():
+        for name, columns, kwargs in INDEXES:
+            op.create_index(name, "allocations", columns, postgresql_concurrently=True,
+                            if_not_exists=True, **kwargs)
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        for name, _, _ in INDEXES:
+            op.drop_index(name, table_name="allocations", postgresql_concurrently=True, if_exists=True)
@@ -0,0 +1,47 @@
+"""add mail outbox
+
+Revision ID: 0004_mail_outbox
+Revises: 0003_allocation_list_indexes
+Create Date: 2026-10-18 14:00:00
+
+"""
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision = '0004_mail_outbox'
+down_revision = '0003_allocation_list_indexes'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    inspector = sa.inspect(op.get_bind())
+    if not inspector.has_table("allocations") or inspector.has_table("mail_outbox"):
+        return
+
+    op.create_table(
+        "mail_outbox",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column("to", sa.String(255), nullable=False),
+        sa.Column("subject", sa.String(255), nullable=False),
+        sa.Column("html", sa.Text(), nullable=False),
+        sa.Column("text", sa.Text(), nullable=True),
+        # 复用任务队列的 jobstatus 枚举类型
+        sa.Column("status", postgresql.ENUM(name="jobstatus", create_type=False), nullable=False),
+        sa.Column("attempts", sa.Integer(), nullable=False),
+        sa.Column("max_attempts", sa.Integer(), nullable=False),
+        sa.Column("run_after", sa.DateTime(), nullable=False),
+        sa.Column("locked_until", sa.DateTime(), nullable=True),
+        sa.Column("last_error", sa.Text(), nullable=True),
+        sa.Column("created_at", sa.DateTime(), nullable=False),
+        sa.Column("sent_at", sa.DateTime(), nullable=True),
+    )
+    op.create_index("ix_mail_outbox_claim", "mail_outbox", ["status", "run_after"])
+
+
+def downgrade() -> None:
+    op.drop_index("ix_mail_outbox_claim", table_name="mail_outbox")
+    op.drop_table("mail_outbox")
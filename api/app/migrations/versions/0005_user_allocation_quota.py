@@ -0,0 +1,41 @@
+"""per-user allocation counter and quota
+
+Revision ID: 0005_user_allocation_quota
+Revises: 0004_mail_outbox
+Create Date: 2026-10-18 16:00:00
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0005_user_allocation_quota'
+down_revision = '0004_mail_outbox'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    inspector = sa.inspect(op.get_bind())
+    if not inspector.has_table("allocations"):
+        return
+    columns = {c["name"] for c in inspector.get_columns("users")}
+
+    if "allocation_count" not in columns:
+        op.add_column("users", sa.Column("allocation_count", sa.Integer(), nullable=False, server_default="0"))
+    if "allocation_quota" not in columns:
+        op.add_column("users", sa.Column("allocation_quota", sa.Integer(), nullable=True))
+
+    # 按现有申请回填计数（禁用的不占配额）
+    op.execute("""
+        UPDATE users u SET allocation_count = c.n
+        FROM (SELECT user_id, count(*) AS n FROM allocations
+              WHERE status IN ('pending', 'provisioning', 'active') GROUP BY user_id) c
+        WHERE u.id = c.user_id
+    """)
+
+
+def downgrade() -> None:
+    op.drop_column("users", "allocation_quota")
+    op.drop_column("users", "allocation_count")
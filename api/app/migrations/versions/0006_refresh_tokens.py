@@ -0,0 +1,48 @@
+"""refresh token families and per-user token cutoff
+
+Revision ID: 0006_refresh_tokens
+Revises: 0005_user_allocation_quota
+Create Date: 2026-10-18 17:00:00
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0006_refresh_tokens'
+down_revision = '0005_user_allocation_quota'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    inspector = sa.inspect(op.get_bind())
+    if not inspector.has_table("allocations"):
+        return
+
+    if "tokens_valid_after" not in {c["name"] for c in inspector.get_columns("users")}:
+        op.add_column("users", sa.Column("tokens_valid_after", sa.DateTime(), nullable=True))
+
+    if inspector.has_table("refresh_tokens"):
+        return
+    op.create_table(
+        "refresh_tokens",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column("jti", sa.String(32), nullable=False, unique=True),
+        sa.Column("family_id", sa.String(32), nullable=False),
+        sa.Column("user_id", sa.Integer(), sa.ForeignKey("users.id", ondelete="CASCADE"), nullable=False),
+        sa.Column("issued_at", sa.DateTime(), nullable=False),
+        sa.Column("expires_at", sa.DateTime(), nullable=False),
+        sa.Column("used_at", sa.DateTime(), nullable=True),
+        sa.Column("revoked_at", sa.DateTime(), nullable=True),
+    )
+    op.create_index("ix_refresh_tokens_family_id", "refresh_tokens", ["family_id"])
+    op.create_index("ix_refresh_tokens_user_id", "refresh_tokens", ["user_id"])
+    op.create_index("ix_refresh_tokens_expires_at", "refresh_tokens", ["expires_at"])
+    op.create_index("ix_refresh_tokens_revoked_at", "refresh_tokens", ["revoked_at"])
+
+
+def downgrade() -> None:
+    op.drop_table("refresh_tokens")
+    op.drop_column("users", "tokens_valid_after")
@@ -0,0 +1,32 @@
+"""per-allocation DDNS token hash
+
+Revision ID: 0007_allocation_ddns_token
+Revises: 0006_refresh_tokens
+Create Date: 2026-10-18 19:00:00
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0007_allocation_ddns_token'
+down_revision = '0006_refresh_tokens'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    inspector = sa.inspect(op.get_bind())
+    if not inspector.has_table("allocations"):
+        return
+
+    if "ddns_token_hash" not in {c["name"] for c in inspector.get_columns("allocations")}:
+        op.add_column("allocations", sa.Column("ddns_token_hash", sa.String(64), nullable=True))
+    if "ix_allocations_ddns_token_hash" not in {i["name"] for i in inspector.get_indexes("allocations")}:
+        op.create_index("ix_allocations_ddns_token_hash", "allocations", ["ddns_token_hash"], unique=True)
+
+
+def downgrade() -> None:
+    op.drop_index("ix_allocations_ddns_token_hash", table_name="allocations")
+    op.drop_column("allocations", "ddns_token_hash")
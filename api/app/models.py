@@ -1,6 +1,6 @@
 import enum, datetime as dt
 from sqlalchemy.orm import DeclarativeBase, Mapped, mapped_column, relationship
-from sqlalchemy import String, Enum, Boolean, Integer, ForeignKey, DateTime, UniqueConstraint, Text
+from sqlalchemy import String, Enum, Boolean, Integer, BigInteger, ForeignKey, DateTime, UniqueConstraint, Text, JSON, Index
 
 class Base(DeclarativeBase): pass
 
@@ -17,6 +17,10 @@ class User(Base):
     is_active: Mapped[bool] = mapped_column(Boolean, default=True)
     email_verified_at: Mapped[dt.datetime | None] = mapped_column(DateTime, nullable=True)
     created_at: Mapped[dt.datetime] = mapped_column(DateTime, default=dt.datetime.utcnow)
+    # 占用配额的申请数（pending/provisioning/active），与申请变更同事务维护
+    allocation_count: Mapped[int] = mapped_column(Integer, default=0, server_default="0")
+    allocation_quota: Mapped[int | None] = mapped_column(Integer, nullable=True)  # 为空时按角色默认，0 为不限
+    tokens_valid_after: Mapped[dt.datetime | None] = mapped_column(DateTime, nullable=True)  # 此前签发的令牌一律无效
 
 class EmailToken(Base):
     __tablename__ = "email_tokens"
@@ -25,6 +29,18 @@ class EmailToken(Base):
     token: Mapped[str] = mapped_column(String(128), unique=True, index=True)
     expire_at: Mapped[dt.datetime] = mapped_column(DateTime, index=True)
 
+class RefreshToken(Base):
+    """已签发的刷新令牌，同一次登录轮换出的令牌属于同一家族（会话）"""
+    __tablename__ = "refresh_tokens"
+    id: Mapped[int] = mapped_column(primary_key=True)
+    jti: Mapped[str] = mapped_column(String(32), unique=True)
+    family_id: Mapped[str] = mapped_column(String(32), index=True)
+    user_id: Mapped[int] = mapped_column(ForeignKey("users.id", ondelete="CASCADE"), index=True)
+    issued_at: Mapped[dt.datetime] = mapped_column(DateTime, default=dt.datetime.utcnow)
+    expires_at: Mapped[dt.datetime] = mapped_column(DateTime, index=True)
+    used_at: Mapped[dt.datetime | None] = mapped_column(DateTime, nullable=True)     # 已轮换
+    revoked_at: Mapped[dt.datetime | None] = mapped_column(DateTime, nullable=True, index=True)
+
 class Domain(Base):
     __tablename__ = "domains"
     id: Mapped[int] = mapped_column(primary_key=True)
@@ -34,6 +50,7 @@ class Domain(Base):
 
 class AllocationStatus(str, enum.Enum):
     pending = "pending"
+    provisioning = "provisioning"  # 已审批，等待 worker 创建 DNS 记录
     active = "active"
     disabled = "disabled"
 
@@ -47,6 +64,58 @@ class Allocation(Base):
     value: Mapped[str] = mapped_column(String(255))     # IP or CNAME target
     ttl: Mapped[int] = mapped_column(Integer, default=600)
     status: Mapped[AllocationStatus] = mapped_column(Enum(AllocationStatus), default=AllocationStatus.pending)
+    provider_record_id: Mapped[int | None] = mapped_column(BigInteger, nullable=True)  # DNSPod RecordId
+    ddns_token_hash: Mapped[str | None] = mapped_column(String(64), nullable=True, unique=True, index=True)  # DDNS 令牌的 SHA-256
+    created_at: Mapped[dt.datetime] = mapped_column(DateTime, default=dt.datetime.utcnow)
+
+    __table_args__ = (
+        UniqueConstraint("domain_id","subdomain","type", name="uq_record"),
+        # 管理后台按 id 游标分页 + 筛选
+        Index("ix_allocations_status_id", "status", "id"),
+        Index("ix_allocations_user_id_id", "user_id", "id"),
+        Index("ix_allocations_type_id", "type", "id"),
+        Index("ix_allocations_subdomain_prefix", "subdomain", postgresql_ops={"subdomain": "varchar_pattern_ops"}),
+    )
+
+class JobStatus(str, enum.Enum):
+    queued = "queued"
+    running = "running"
+    done = "done"
+    failed = "failed"
+
+class ProvisioningJob(Base):
+    """DNS 记录异步操作队列，由 worker 以 FOR UPDATE SKIP LOCKED 认领"""
+    __tablename__ = "provisioning_jobs"
+    id: Mapped[int] = mapped_column(primary_key=True)
+    allocation_id: Mapped[int | None] = mapped_column(ForeignKey("allocations.id", ondelete="SET NULL"), nullable=True, index=True)
+    action: Mapped[str] = mapped_column(String(16))  # create / update / delete
+    payload: Mapped[dict | None] = mapped_column(JSON, nullable=True)  # 如 {"record_id": 123, "domain": "example.com"}
+    status: Mapped[JobStatus] = mapped_column(Enum(JobStatus), default=JobStatus.queued)
+    attempts: Mapped[int] = mapped_column(Integer, default=0)
+    max_attempts: Mapped[int] = mapped_column(Integer, default=5)
+    run_after: Mapped[dt.datetime] = mapped_column(DateTime, default=dt.datetime.utcnow)
+    locked_until: Mapped[dt.datetime | None] = mapped_column(DateTime, nullable=True)
+    last_error: Mapped[str | None] = mapped_column(Text, nullable=True)
+    created_at: Mapped[dt.datetime] = mapped_column(DateTime, default=dt.datetime.utcnow)
+    updated_at: Mapped[dt.datetime] = mapped_column(DateTime, default=dt.datetime.utcnow, onupdate=dt.datetime.utcnow)
+
+    __table_args__ = (Index("ix_provisioning_jobs_claim", "status", "run_after"),)
+
+class MailOutbox(Base):
+    """待发送邮件，与业务数据同事务写入，由 worker 批量发送并重试"""
+    __tablename__ = "mail_outbox"
+    id: Mapped[int] = mapped_column(primary_key=True)
+    to: Mapped[str] = mapped_column(String(255))
+    subject: Mapped[str] = mapped_column(String(255))
+    html: Mapped[str] = mapped_column(Text)
+    text: Mapped[str | None] = mapped_column(Text, nullable=True)
+    status: Mapped[JobStatus] = mapped_column(Enum(JobStatus), default=JobStatus.queued)
+    attempts: Mapped[int] = mapped_column(Integer, default=0)
+    max_attempts: Mapped[int] = mapped_column(Integer, default=8)
+    run_after: Mapped[dt.datetime] = mapped_column(DateTime, default=dt.datetime.utcnow)
+    locked_until: Mapped[dt.datetime | None] = mapped_column(DateTime, nullable=True)
+    last_error: Mapped[str | None] = mapped_column(Text, nullable=True)
     created_at: Mapped[dt.datetime] = mapped_column(DateTime, default=dt.datetime.utcnow)
+    sent_at: Mapped[dt.datetime | None] = mapped_column(DateTime, nullable=True)
 
-    __table_args__ = (UniqueConstraint("domain_id","subdomain","type", name="uq_record"),)
+    __table_args__ = (Index("ix_mail_outbox_claim", "status", "run_after"),)
@@ -0,0 +1,119 @@
+"""基于 Postgres LISTEN/NOTIFY 的跨副本广播
+
+写入方在业务事务内调用 publish，提交后才会投递；每个进程一个监听线程，
+按频道把消息分发给订阅的处理函数。启动时先建立 LISTEN 再加载内存快照；
+之后（含启动等待超时后才连上的首次连接）每次连上都触发 on_reconnect 回调，
+供内存索引全量重载以弥补未监听期间错过的消息。
+"""
+import logging
+import select as _select
+import threading
+import time
+from typing import Callable
+
+import psycopg2
+import psycopg2.extensions
+from sqlalchemy import func, select
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+
+from .config import get_settings
+
+settings = get_settings()
+logger = logging.getLogger(__name__)
+
+# NOTIFY 负载上限为 8000 字节，留出余量
+MAX_PAYLOAD = 7000
+
+def _stmt(channel: str, payload: str):
+    return select(func.pg_notify(channel, payload))
+
+def publish(db: Session, channel: str, payload: str) -> None:
+    """在当前事务中发送通知（提交后投递）"""
+    db.execute(_stmt(channel, payload))
+
+async def publish_async(db: AsyncSession, channel: str, payload: str) -> None:
+    await db.execute(_stmt(channel, payload))
+
+class Listener:
+    def __init__(self):
+        self._handlers: dict[str, list[Callable[[str], None]]] = {}
+        self._reconnect_hooks: list[Callable[[], None]] = []
+        self._thread: threading.Thread | None = None
+        self._stop = threading.Event()
+        self._ready = threading.Event()  # 已有调用方在 LISTEN 之后加载快照
+
+    def subscribe(self, channel: str, handler: Callable[[str], None]) -> None:
+        self._handlers.setdefault(channel, []).append(handler)
+
+    def on_reconnect(self, hook: Callable[[], None]) -> None:
+        self._reconnect_hooks.append(hook)
+
+    def start(self, wait: float = 0) -> bool:
+        """启动监听线程，最多等待 wait 秒直到 LISTEN 生效；返回后再加载的快照不会漏掉通知。
+        等待超时则返回 False，之后连上时由 on_reconnect 回调补一次全量重载"""
+        if self._thread is not None or not self._handlers:
+            return True
+        self._stop.clear()
+        self._ready.clear()
+        self._thread = threading.Thread(target=self._run, name="pg-listener", daemon=True)
+        self._thread.start()
+        if self._ready.wait(wait):
+            return True
+        self._ready.set()
+        return False
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=5)
+            self._thread = None
+
+    def _connect(self):
+        dsn = make_url(settings.DATABASE_URL).set(drivername="postgresql").render_as_string(hide_password=False)
+        conn = psycopg2.connect(dsn)
+        conn.set_isolation_level(psycopg2.extensions.ISOLATION_LEVEL_AUTOCOMMIT)
+        with conn.cursor() as cur:
+            for channel in self._handlers:
+                cur.execute(f'LISTEN "{channel}"')
+        return conn
+
+    def _run(self) -> None:
+        while not self._stop.is_set():
+            try:
+                conn = self._connect()
+            except Exception as e:
+                logger.warning("LISTEN connection failed: %s", e)
+                self._stop.wait(5)
+                continue
+            if self._ready.is_set():
+                for hook in self._reconnect_hooks:
+                    try:
+                        hook()
+                    except Exception:
+                        logger.exception("Reconnect hook failed")
+            else:
+                self._ready.set()  # 首次连接：start() 的调用方随后加载快照
+            try:
+                while not self._stop.is_set():
+                    if _select.select([conn], [], [], 1.0) == ([], [], []):
+                        continue
+                    conn.poll()
+                    while conn.notifies:
+                        n = conn.notifies.pop(0)
+                        for handler in self._handlers.get(n.channel, ()):
+                            try:
+                                handler(n.payload)
+                            except Exception:
+                                logger.exception("Notification handler failed on %s", n.channel)
+            except Exception as e:
+                logger.warning("LISTEN connection lost: %s", e)
+                time.sleep(1)
+            finally:
+                try:
+                    conn.close()
+                except Exception:
+                    pass
+
+listener = Listener()
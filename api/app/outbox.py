@@ -0,0 +1,92 @@
+"""邮件发件箱：API 在业务事务内写入，worker 认领后批量发送，失败按退避重试"""
+import datetime as dt
+import logging
+
+from sqlalchemy import select, or_, and_
+from sqlalchemy.orm import Session
+
+from .models import JobStatus, MailOutbox
+from .config import get_settings
+from .emailer import Mail, get_sender, render_verification
+from .provisioning import backoff_seconds
+
+settings = get_settings()
+logger = logging.getLogger(__name__)
+
+def enqueue(db, mail: Mail) -> MailOutbox:
+    """在调用方事务中加入一封邮件（同步或异步 Session 均可），由调用方负责提交"""
+    row = MailOutbox(
+        to=mail.to,
+        subject=mail.subject,
+        html=mail.html,
+        text=mail.text,
+        status=JobStatus.queued,
+        attempts=0,
+        max_attempts=settings.MAIL_MAX_ATTEMPTS,
+        run_after=dt.datetime.utcnow(),
+    )
+    db.add(row)
+    return row
+
+def enqueue_verification(db, to: str, verify_url: str) -> MailOutbox:
+    return enqueue(db, render_verification(to, verify_url))
+
+def claim(db: Session, limit: int) -> list[tuple[int, Mail]]:
+    """用 FOR UPDATE SKIP LOCKED 认领一批待发邮件并立即提交"""
+    now = dt.datetime.utcnow()
+    rows = db.scalars(
+        select(MailOutbox)
+        .where(or_(
+            and_(MailOutbox.status == JobStatus.queued, MailOutbox.run_after <= now),
+            and_(MailOutbox.status == JobStatus.running, MailOutbox.locked_until < now),
+        ))
+        .order_by(MailOutbox.id)
+        .limit(limit)
+        .with_for_update(skip_locked=True)
+    ).all()
+    if not rows:
+        db.rollback()
+        return []
+    lease = now + dt.timedelta(seconds=settings.PROVISION_LEASE_SEC)
+    claimed = []
+    for row in rows:
+        row.status = JobStatus.running
+        row.attempts += 1
+        row.locked_until = lease
+        claimed.append((row.id, Mail(to=row.to, subject=row.subject, html=row.html, text=row.text)))
+    db.commit()
+    return claimed
+
+def process_batch(db: Session, limit: int | None = None) -> int:
+    """认领并发送一批邮件，结果在一个事务中落库，返回处理数量"""
+    claimed = claim(db, limit or settings.MAIL_BATCH_SIZE)
+    if not claimed:
+        return 0
+
+    results = get_sender().send_many([mail for _, mail in claimed])
+
+    rows = {r.id: r for r in db.scalars(
+        select(MailOutbox).where(MailOutbox.id.in_([mail_id for mail_id, _ in claimed]))
+    ).all()}
+    now = dt.datetime.utcnow()
+    for (mail_id, mail), err in zip(claimed, results):
+        row = rows.get(mail_id)
+        if row is None or row.status != JobStatus.running:
+            continue
+        row.locked_until = None
+        if err is None:
+            row.status = JobStatus.done
+            row.sent_at = now
+            row.last_error = None
+        elif row.attempts < row.max_attempts:
+            row.status = JobStatus.queued
+            row.run_after = now + dt.timedelta(seconds=backoff_seconds(row.attempts))
+            row.last_error = str(err)[:2000]
+            logger.warning("Mail %s to %s failed, retry %s/%s: %s",
+                           row.id, mail.to, row.attempts, row.max_attempts, err)
+        else:
+            row.status = JobStatus.failed
+            row.last_error = str(err)[:2000]
+            logger.error("Mail %s to %s gave up after %s attempts: %s", row.id, mail.to, row.attempts, err)
+    db.commit()
+    return len(claimed)
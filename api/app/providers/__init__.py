@@ -0,0 +1,44 @@
+"""DNS 服务商注册表：按 Domain.provider 分发到具体实现"""
+import threading
+from typing import Callable
+
+from ..config import get_settings
+from .base import Change, ChangeResult, DNSProvider, ProviderError, Record, map_concurrent  # noqa: F401
+
+settings = get_settings()
+
+def _dnspod() -> DNSProvider:
+    from .dnspod import DNSPodProvider  # 按需导入腾讯云 SDK
+    return DNSPodProvider()
+
+def _fake() -> DNSProvider:
+    from .fake import FakeProvider
+    return FakeProvider(settings.FAKE_DNS_PATH or None)
+
+_factories: dict[str, Callable[[], DNSProvider]] = {"dnspod": _dnspod, "fake": _fake}
+_instances: dict[str, DNSProvider] = {}
+_lock = threading.Lock()
+
+def register(name: str, factory: Callable[[], DNSProvider]) -> None:
+    """注册（或替换）服务商实现，名称不区分大小写"""
+    with _lock:
+        _factories[name.lower()] = factory
+        _instances.pop(name.lower(), None)
+
+def get_provider(name: str | None = None) -> DNSProvider:
+    """按名称取服务商实例（进程内单例），为空时使用 DNS_DEFAULT_PROVIDER"""
+    key = (name or settings.DNS_DEFAULT_PROVIDER).lower()
+    provider = _instances.get(key)
+    if provider is None:
+        with _lock:
+            provider = _instances.get(key)
+            if provider is None:
+                if key not in _factories:
+                    raise ProviderError(f"Unknown DNS provider: {name}")
+                provider = _instances[key] = _factories[key]()
+    return provider
+
+def provider_name_for(domain: str) -> str:
+    """配置中根域名对应的服务商，写入 domains.provider"""
+    return settings.DNS_DOMAIN_PROVIDERS.get(domain, settings.DNS_DEFAULT_PROVIDER)
+
@@ -0,0 +1,98 @@
+"""DNS 服务商接口：单条增删改、分页列出与批量变更"""
+import threading
+from abc import ABC, abstractmethod
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from typing import Iterator
+
+from ..config import get_settings
+
+settings = get_settings()
+
+_executor: ThreadPoolExecutor | None = None
+_executor_lock = threading.Lock()
+
+@dataclass(slots=True)
+class Record:
+    """服务商返回的线上解析记录"""
+    record_id: int
+    name: str
+    type: str
+    value: str
+    ttl: int
+    system: bool = False  # 服务商自带的记录（如默认 NS），不参与对账
+
+@dataclass(slots=True)
+class Change:
+    op: str                      # create / update / delete
+    subdomain: str | None = None
+    type: str | None = None
+    value: str | None = None
+    ttl: int | None = None
+    record_id: int | None = None
+    fields: tuple[str, ...] = ()  # update 时实际改动的字段，为空表示未知（整条覆盖）
+
+@dataclass(slots=True)
+class ChangeResult:
+    record_id: int | None = None  # create 返回新记录 ID
+    error: Exception | None = None
+
+class ProviderError(Exception):
+    """服务商返回的业务错误"""
+
+class DNSProvider(ABC):
+    name: str
+
+    @abstractmethod
+    def create_record(self, domain: str, subdomain: str, record_type: str, value: str, ttl: int) -> int:
+        """创建记录并返回记录 ID"""
+
+    @abstractmethod
+    def update_record(self, domain: str, record_id: int, subdomain: str, record_type: str,
+                      value: str, ttl: int) -> None: ...
+
+    @abstractmethod
+    def delete_record(self, domain: str, record_id: int) -> None: ...
+
+    @abstractmethod
+    def list_records(self, domain: str) -> Iterator[Record]: ...
+
+    def find_record(self, domain: str, subdomain: str, record_type: str) -> Record | None:
+        """按名称与类型查找线上记录（分发缺少记录 ID 时关联用）；默认遍历整个域名，服务商支持条件查询时覆盖"""
+        name = subdomain.lower()
+        return next((r for r in self.list_records(domain)
+                     if not r.system and r.name.lower() == name and r.type == record_type), None)
+
+    def apply_one(self, domain: str, change: Change) -> ChangeResult:
+        try:
+            if change.op == "create":
+                return ChangeResult(self.create_record(domain, change.subdomain, change.type, change.value, change.ttl))
+            if change.op == "update":
+                self.update_record(domain, change.record_id, change.subdomain, change.type, change.value, change.ttl)
+            elif change.op == "delete":
+                self.delete_record(domain, change.record_id)
+            else:
+                raise ValueError(f"Unknown change: {change.op}")
+            return ChangeResult(change.record_id)
+        except Exception as e:
+            return ChangeResult(error=e)
+
+    def apply_batch(self, domain: str, changes: list[Change]) -> list[ChangeResult]:
+        """批量变更同一域名下的记录，按输入顺序返回结果；默认逐条并发执行，服务商有批量接口时覆盖"""
+        return map_concurrent(lambda c: self.apply_one(domain, c), changes)
+
+def _get_executor() -> ThreadPoolExecutor:
+    global _executor
+    if _executor is None:
+        with _executor_lock:
+            if _executor is None:
+                _executor = ThreadPoolExecutor(max_workers=settings.DNSPOD_MAX_WORKERS,
+                                               thread_name_prefix="dns")
+    return _executor
+
+def map_concurrent(fn, items) -> list:
+    """用进程级有界线程池并发执行服务商调用，按输入顺序返回结果，fn 自行处理异常"""
+    items = list(items)
+    if len(items) <= 1:
+        return [fn(item) for item in items]
+    return list(_get_executor().map(fn, items))
@@ -0,0 +1,136 @@
+"""DNSPod 服务商：单条操作走 app.dnspod，批量变更走 CreateRecordBatch / DeleteRecordBatch / ModifyRecordBatch"""
+import logging
+import time
+from collections import defaultdict, deque
+from typing import Iterator
+
+from ..config import get_settings
+from .. import dnspod
+from .base import Change, ChangeResult, DNSProvider, ProviderError, Record, map_concurrent
+
+settings = get_settings()
+logger = logging.getLogger(__name__)
+
+# 批量任务中记录的未完成状态
+_PENDING = {"", "waiting", "ready", "running", "pending"}
+# 可用 ModifyRecordBatch 整批修改的字段 -> 接口的 Change 参数
+_BATCH_FIELDS = {"value": "value", "ttl": "ttl"}
+
+def _chunks(items: list, size: int):
+    for i in range(0, len(items), size):
+        yield items[i:i + size]
+
+class DNSPodProvider(DNSProvider):
+    name = "DNSPod"
+
+    def create_record(self, domain, subdomain, record_type, value, ttl) -> int:
+        return int(dnspod.create_record(subdomain, record_type, value, ttl, domain=domain).RecordId)
+
+    def update_record(self, domain, record_id, subdomain, record_type, value, ttl) -> None:
+        dnspod.modify_record(record_id, subdomain, record_type, value, ttl, domain=domain)
+
+    def delete_record(self, domain, record_id) -> None:
+        dnspod.delete_record(record_id, domain=domain)
+
+    def list_records(self, domain, subdomain: str | None = None, record_type: str | None = None) -> Iterator[Record]:
+        for r in dnspod.list_records(domain, subdomain=subdomain, record_type=record_type):
+            yield Record(int(r.RecordId), r.Name, r.Type, r.Value, int(r.TTL or 0),
+                         system=bool(getattr(r, "DefaultNS", False)))
+
+    def find_record(self, domain, subdomain, record_type) -> Record | None:
+        """DescribeRecordList 按子域名与类型过滤，只取回匹配的记录"""
+        name = subdomain.lower()
+        return next((r for r in self.list_records(domain, subdomain, record_type)
+                     if not r.system and r.name.lower() == name and r.type == record_type), None)
+
+    def apply_batch(self, domain: str, changes: list[Change]) -> list[ChangeResult]:
+        """两条以上的创建、删除，或改动同一字段为同一值的更新（如整批换 IP），
+        按 DNSPOD_BATCH_SIZE 分块，每块一次批量调用；其余逐条并发执行"""
+        results: list[ChangeResult | None] = [None] * len(changes)
+        groups = defaultdict(list)
+        single = []
+        for i, change in enumerate(changes):
+            if change.op in ("create", "delete"):
+                groups[(change.op,)].append(i)
+            elif change.op == "update" and len(change.fields) == 1 and change.fields[0] in _BATCH_FIELDS:
+                field = change.fields[0]
+                groups[("update", field, getattr(change, field))].append(i)
+            else:
+                single.append(i)
+
+        for key, indexes in groups.items():
+            if len(indexes) < 2 or settings.DNSPOD_BATCH_SIZE < 2:
+                single.extend(indexes)
+                continue
+            for chunk in _chunks(indexes, settings.DNSPOD_BATCH_SIZE):
+                if key[0] == "create":
+                    self._create_batch(domain, changes, chunk, results)
+                elif key[0] == "delete":
+                    self._by_id_batch(changes, chunk, results, dnspod.delete_record_batch)
+                else:
+                    _, field, to = key
+                    self._by_id_batch(changes, chunk, results,
+                                      lambda ids: dnspod.modify_record_batch(ids, _BATCH_FIELDS[field], str(to)))
+
+        for i, result in zip(single, map_concurrent(lambda i: self.apply_one(domain, changes[i]), single)):
+            results[i] = result
+        return results
+
+    def _create_batch(self, domain, changes, chunk, results) -> None:
+        try:
+            job_id = dnspod.create_record_batch(domain, [
+                {"SubDomain": changes[i].subdomain, "RecordType": changes[i].type,
+                 "Value": changes[i].value, "TTL": changes[i].ttl} for i in chunk
+            ])
+            records, detail_error = self._wait(job_id)
+        except Exception as e:
+            for i in chunk:
+                results[i] = ChangeResult(error=e)
+            return
+        # 批量结果不带请求序号，按 (子域名, 类型, 值) 对应回请求
+        by_key = defaultdict(deque)
+        for r in records:
+            by_key[(r.SubDomain.lower(), r.RecordType, r.Value)].append(r)
+        for i in chunk:
+            c = changes[i]
+            queue = by_key.get((c.subdomain.lower(), c.type, c.value))
+            results[i] = self._result(queue.popleft() if queue else None, detail_error)
+
+    def _by_id_batch(self, changes, chunk, results, call) -> None:
+        """按记录 ID 批量操作（删除、修改），结果按 RecordId 对应回请求"""
+        try:
+            records, detail_error = self._wait(call([changes[i].record_id for i in chunk]))
+        except Exception as e:
+            for i in chunk:
+                results[i] = ChangeResult(error=e)
+            return
+        by_id = {int(r.RecordId): r for r in records if r.RecordId}
+        for i in chunk:
+            results[i] = self._result(by_id.get(int(changes[i].record_id)), detail_error)
+
+    @staticmethod
+    def _result(record, detail_error: str | None) -> ChangeResult:
+        if record is None:
+            return ChangeResult(error=ProviderError(detail_error or "Record missing from batch result"))
+        if (record.Status or "").lower() == "success":
+            return ChangeResult(int(record.RecordId) if record.RecordId else None)
+        return ChangeResult(error=ProviderError(record.ErrMsg or f"Batch status {record.Status}"))
+
+    @staticmethod
+    def _wait(job_id: int):
+        """轮询批量任务直到所有记录完成，返回 (记录结果, 域名级错误)"""
+        deadline = time.monotonic() + settings.DNSPOD_BATCH_WAIT_SEC
+        delay = 0.2
+        while True:
+            resp = dnspod.describe_batch_task(job_id)
+            details = resp.DetailList or []
+            records = [r for d in details for r in (d.RecordList or [])]
+            errors = [d.ErrMsg for d in details if d.ErrMsg]
+            pending = not details or any((d.Status or "").lower() in _PENDING - {""} for d in details) \
+                or any((r.Status or "").lower() in _PENDING for r in records)
+            if not pending:
+                return records, "; ".join(errors) or None
+            if time.monotonic() >= deadline:
+                raise ProviderError(f"DNSPod batch job {job_id} not finished in {settings.DNSPOD_BATCH_WAIT_SEC}s")
+            time.sleep(delay)
+            delay = min(delay * 2, 2)
@@ -0,0 +1,103 @@
+"""内存 DNS 服务商，供测试与本地开发使用
+
+设置 FAKE_DNS_PATH 时记录持久化为 JSON 文件，API 与 worker 进程可以共享同一份数据
+（每次操作前重新读取、写入时整体替换，适合单个 worker 的场景）。
+"""
+import dataclasses
+import itertools
+import json
+import os
+import threading
+from collections import Counter
+from typing import Iterator
+
+from .base import Change, ChangeResult, DNSProvider, ProviderError, Record
+
+class FakeProvider(DNSProvider):
+    name = "fake"
+
+    def __init__(self, path: str | None = None):
+        self.path = path
+        self.zones: dict[str, dict[int, Record]] = {}
+        self.calls: Counter = Counter()  # 按操作统计“API 调用”次数，批量变更只计一次
+        self._ids = itertools.count(1)
+        self._lock = threading.Lock()
+
+    def _load(self) -> None:
+        if not self.path or not os.path.exists(self.path):
+            return
+        with open(self.path) as f:
+            data = json.load(f)
+        self.zones = {
+            domain: {r["record_id"]: Record(**r) for r in records}
+            for domain, records in data["zones"].items()
+        }
+        self._ids = itertools.count(data["next_id"])
+
+    def _save(self) -> None:
+        if not self.path:
+            return
+        next_id = next(self._ids)
+        self._ids = itertools.count(next_id)
+        data = {
+            "next_id": next_id,
+            "zones": {d: [dataclasses.asdict(r) for r in z.values()] for d, z in self.zones.items()},
+        }
+        tmp = f"{self.path}.tmp"
+        with open(tmp, "w") as f:
+            json.dump(data, f)
+        os.replace(tmp, self.path)
+
+    def _apply(self, domain: str, change: Change) -> ChangeResult:
+        zone = self.zones.setdefault(domain, {})
+        if change.op == "create":
+            for r in zone.values():
+                if (r.name, r.type, r.value) == (change.subdomain, change.type, change.value):
+                    return ChangeResult(error=ProviderError("Record already exists"))
+            record = Record(next(self._ids), change.subdomain, change.type, change.value, change.ttl or 600)
+            zone[record.record_id] = record
+            return ChangeResult(record.record_id)
+        record = zone.get(change.record_id)
+        if record is None:
+            return ChangeResult(error=ProviderError(f"Record {change.record_id} not found"))
+        if change.op == "update":
+            record.name, record.type, record.value = change.subdomain, change.type, change.value
+            record.ttl = change.ttl or record.ttl
+        elif change.op == "delete":
+            del zone[change.record_id]
+        else:
+            return ChangeResult(error=ValueError(f"Unknown change: {change.op}"))
+        return ChangeResult(record.record_id)
+
+    def _run(self, name: str, domain: str, changes: list[Change]) -> list[ChangeResult]:
+        with self._lock:
+            self.calls[name] += 1
+            self._load()
+            results = [self._apply(domain, c) for c in changes]
+            self._save()
+            return results
+
+    def _raise(self, result: ChangeResult) -> ChangeResult:
+        if result.error:
+            raise result.error
+        return result
+
+    def create_record(self, domain, subdomain, record_type, value, ttl) -> int:
+        change = Change("create", subdomain, record_type, value, ttl)
+        return self._raise(self._run("create", domain, [change])[0]).record_id
+
+    def update_record(self, domain, record_id, subdomain, record_type, value, ttl) -> None:
+        self._raise(self._run("update", domain, [Change("update", subdomain, record_type, value, ttl, record_id)])[0])
+
+    def delete_record(self, domain, record_id) -> None:
+        self._raise(self._run("delete", domain, [Change("delete", record_id=record_id)])[0])
+
+    def list_records(self, domain) -> Iterator[Record]:
+        with self._lock:
+            self.calls["list"] += 1
+            self._load()
+            records = list(self.zones.get(domain, {}).values())
+        yield from records
+
+    def apply_batch(self, domain, changes) -> list[ChangeResult]:
+        return self._run("batch", domain, changes)
@@ -0,0 +1,289 @@
+"""DNS 记录异步操作队列：API 只负责入队，worker 认领后按域名所属服务商批量执行"""
+import datetime as dt
+import logging
+import random
+from collections import defaultdict
+from dataclasses import dataclass
+
+from sqlalchemy import select, insert, update, or_, and_
+from sqlalchemy.orm import Session
+
+from .models import Allocation, AllocationStatus, Domain, JobStatus, ProvisioningJob
+from .config import get_settings
+from .providers import Change, ChangeResult, get_provider, map_concurrent
+
+settings = get_settings()
+logger = logging.getLogger(__name__)
+
+ACTIONS = ("create", "update", "delete")
+
+@dataclass
+class JobTask:
+    """认领时生成的任务快照，供线程池使用，避免跨线程访问 ORM 对象"""
+    job_id: int
+    action: str
+    allocation_id: int | None
+    payload: dict
+    subdomain: str | None = None
+    type: str | None = None
+    value: str | None = None
+    ttl: int | None = None
+    domain: str | None = None
+    provider: str | None = None
+
+def enqueue(db: Session, allocation_id: int | None, action: str, payload: dict | None = None) -> ProvisioningJob:
+    """在调用方事务中加入一个任务，由调用方负责提交"""
+    if action not in ACTIONS:
+        raise ValueError(f"Unknown provisioning action: {action}")
+    job = ProvisioningJob(
+        allocation_id=allocation_id,
+        action=action,
+        payload=payload,
+        status=JobStatus.queued,
+        attempts=0,
+        max_attempts=settings.PROVISION_MAX_ATTEMPTS,
+        run_after=dt.datetime.utcnow(),
+    )
+    db.add(job)
+    return job
+
+def enqueue_many(db: Session, jobs: list[tuple[int | None, str, dict | None]], delay: float = 0) -> int:
+    """批量入队 (allocation_id, action, payload)，一条多行 INSERT，由调用方提交；delay 秒后才可被认领"""
+    if not jobs:
+        return 0
+    now = dt.datetime.utcnow()
+    run_after = now + dt.timedelta(seconds=delay)
+    rows = []
+    for allocation_id, action, payload in jobs:
+        if action not in ACTIONS:
+            raise ValueError(f"Unknown provisioning action: {action}")
+        rows.append(dict(allocation_id=allocation_id, action=action, payload=payload,
+                         status=JobStatus.queued, attempts=0, max_attempts=settings.PROVISION_MAX_ATTEMPTS,
+                         run_after=run_after, created_at=now, updated_at=now))
+    db.execute(insert(ProvisioningJob), rows)
+    return len(rows)
+
+def enqueue_deletes(db: Session, allocs: list[Allocation]) -> int:
+    """为已创建上游记录的分发入队删除任务，域名一次查询取回；返回入队数量"""
+    targets = [a for a in allocs if a.provider_record_id]
+    if not targets:
+        return 0
+    names = dict(db.execute(
+        select(Domain.id, Domain.name).where(Domain.id.in_({a.domain_id for a in targets}))
+    ).all())
+    # 任务自带 record_id 和域名，分发行被删除后仍可执行
+    return enqueue_many(db, [
+        (None, "delete", {"record_id": a.provider_record_id, "domain": names.get(a.domain_id), "allocation_id": a.id})
+        for a in targets
+    ])
+
+def enqueue_updates(db: Session, changed: list[tuple[Allocation, set[str]]], delay: float = 0) -> int:
+    """为已生效的分发入队更新任务，payload.fields 记录改动的字段；
+    同一分发已有排队中的更新任务时合并字段，不重复入队（worker 执行时读取最新值）。
+    未保存记录 ID 的分发（旧数据）由 worker 按名称与类型关联线上记录，找不到时创建。
+    delay 用于合并短时间内的连续修改。返回新入队数量"""
+    targets = {a.id: (a, fields) for a, fields in changed if fields}
+    if not targets:
+        return 0
+    queued = db.scalars(
+        select(ProvisioningJob)
+        .where(ProvisioningJob.allocation_id.in_(list(targets)),
+               ProvisioningJob.status == JobStatus.queued,
+               ProvisioningJob.action == "update")
+        .with_for_update(skip_locked=True)
+    ).all()
+    for job in queued:
+        alloc, fields = targets.pop(job.allocation_id, (None, None))
+        if alloc is None:
+            continue
+        merged = set((job.payload or {}).get("fields") or ()) | fields
+        job.payload = {"record_id": alloc.provider_record_id, "fields": sorted(merged)}
+    return enqueue_many(db, [
+        (a.id, "update", {"record_id": a.provider_record_id, "fields": sorted(fields)})
+        for a, fields in targets.values()
+    ], delay=delay)
+
+def cancel_pending(db: Session, allocation_ids: list[int]) -> None:
+    """取消尚未执行的创建/更新任务（分发已被禁用或删除）"""
+    if not allocation_ids:
+        return
+    db.execute(
+        update(ProvisioningJob)
+        .where(ProvisioningJob.allocation_id.in_(allocation_ids),
+               ProvisioningJob.status == JobStatus.queued,
+               ProvisioningJob.action.in_(("create", "update")))
+        .values(status=JobStatus.failed, last_error="cancelled", updated_at=dt.datetime.utcnow())
+    )
+
+def claim_jobs(db: Session, limit: int) -> list[JobTask]:
+    """用 FOR UPDATE SKIP LOCKED 认领一批到期任务并立即提交，多个 worker 互不阻塞"""
+    now = dt.datetime.utcnow()
+    jobs = db.scalars(
+        select(ProvisioningJob)
+        .where(or_(
+            and_(ProvisioningJob.status == JobStatus.queued, ProvisioningJob.run_after <= now),
+            # 租约过期的 running 任务视为 worker 崩溃，重新认领
+            and_(ProvisioningJob.status == JobStatus.running, ProvisioningJob.locked_until < now),
+        ))
+        .order_by(ProvisioningJob.id)
+        .limit(limit)
+        .with_for_update(skip_locked=True)
+    ).all()
+    if not jobs:
+        db.rollback()
+        return []
+
+    alloc_ids = {j.allocation_id for j in jobs if j.allocation_id is not None}
+    allocs = {}
+    if alloc_ids:
+        rows = db.execute(
+            select(Allocation, Domain.name, Domain.provider)
+            .join(Domain, Domain.id == Allocation.domain_id)
+            .where(Allocation.id.in_(alloc_ids))
+        ).all()
+        allocs = {a.id: (a, name, provider) for a, name, provider in rows}
+    # 删除任务只带域名，服务商另行查询
+    payload_domains = {j.payload["domain"] for j in jobs if j.payload and j.payload.get("domain")}
+    providers = {}
+    if payload_domains:
+        providers = dict(db.execute(
+            select(Domain.name, Domain.provider).where(Domain.name.in_(payload_domains))
+        ).all())
+
+    lease = now + dt.timedelta(seconds=settings.PROVISION_LEASE_SEC)
+    tasks = []
+    for job in jobs:
+        job.status = JobStatus.running
+        job.attempts += 1
+        job.locked_until = lease
+        task = JobTask(job_id=job.id, action=job.action, allocation_id=job.allocation_id, payload=dict(job.payload or {}))
+        if job.allocation_id in allocs:
+            alloc, domain_name, provider = allocs[job.allocation_id]
+            task.subdomain, task.type, task.value, task.ttl = alloc.subdomain, alloc.type, alloc.value, alloc.ttl
+            task.domain, task.provider = domain_name, provider
+        if task.payload.get("domain") in providers:
+            task.provider = providers[task.payload["domain"]]
+        tasks.append(task)
+    db.commit()
+    return tasks
+
+def _change(task: JobTask) -> Change:
+    if task.action == "delete":
+        return Change("delete", record_id=task.payload["record_id"])
+    if task.subdomain is None:
+        raise RuntimeError("Allocation no longer exists")
+    if task.action == "create":
+        return Change("create", task.subdomain, task.type, task.value, task.ttl)
+    if task.action == "update":
+        return Change("update", task.subdomain, task.type, task.value, task.ttl, task.payload["record_id"],
+                      fields=tuple(task.payload.get("fields") or ()))
+    raise ValueError(f"Unknown provisioning action: {task.action}")
+
+def _link(task: JobTask) -> Exception | None:
+    """缺少记录 ID 的更新任务：按名称与类型查找线上记录并整条覆盖，找不到时改为创建"""
+    try:
+        record = get_provider(task.provider).find_record(task.domain, task.subdomain, task.type)
+    except Exception as e:
+        return e
+    if record is None:
+        task.action = "create"
+    else:
+        task.payload.update(record_id=record.record_id, fields=[])
+    return None
+
+def execute(tasks: list[JobTask]) -> list[ChangeResult]:
+    """按 (服务商, 域名) 分组，每组交给服务商的批量接口执行，按输入顺序返回结果"""
+    results: list[ChangeResult | None] = [None] * len(tasks)
+    unlinked = [i for i, t in enumerate(tasks)
+                if t.action == "update" and not t.payload.get("record_id") and t.subdomain is not None]
+    for i, error in zip(unlinked, map_concurrent(lambda i: _link(tasks[i]), unlinked)):
+        if error is not None:
+            results[i] = ChangeResult(error=error)
+    groups = defaultdict(list)
+    for i, task in enumerate(tasks):
+        if results[i] is not None:
+            continue
+        try:
+            change = _change(task)
+        except Exception as e:
+            results[i] = ChangeResult(error=e)
+            continue
+        domain = task.payload.get("domain") or task.domain or settings.DNS_ROOT_DOMAIN
+        groups[(task.provider, domain)].append((i, change))
+
+    for (provider_name, domain), items in groups.items():
+        try:
+            outcomes = get_provider(provider_name).apply_batch(domain, [c for _, c in items])
+        except Exception as e:
+            outcomes = [ChangeResult(error=e)] * len(items)
+        for (i, _), outcome in zip(items, outcomes):
+            results[i] = outcome
+    return results
+
+def backoff_seconds(attempts: int) -> float:
+    """指数退避加抖动"""
+    delay = min(settings.PROVISION_BACKOFF_BASE * (2 ** max(attempts - 1, 0)), settings.PROVISION_BACKOFF_MAX)
+    return delay * random.uniform(0.8, 1.2)
+
+def _on_success(db: Session, job: ProvisioningJob, task: JobTask, result: ChangeResult):
+    job.status = JobStatus.done
+    job.last_error = None
+    # 创建的记录，或更新时按名称关联到的记录（task.action 可能已由 _link 改为 create）
+    if job.action == "create" or (job.action == "update" and not (job.payload or {}).get("record_id")):
+        record_id = result.record_id
+        job.payload = {**(job.payload or {}), "record_id": record_id}
+        alloc = db.get(Allocation, task.allocation_id) if task.allocation_id else None
+        if alloc is None:
+            # 创建期间分发已被删除，记录成了孤儿，立即安排删除
+            enqueue(db, None, "delete", {"record_id": record_id, "domain": task.domain})
+            return
+        alloc.provider_record_id = record_id
+        if alloc.status == AllocationStatus.provisioning:
+            alloc.status = AllocationStatus.active
+        elif alloc.status == AllocationStatus.disabled:
+            enqueue_deletes(db, [alloc])
+    elif task.action == "delete":
+        alloc_id = task.payload.get("allocation_id")
+        alloc = db.get(Allocation, alloc_id) if alloc_id else None
+        if alloc and alloc.provider_record_id == task.payload.get("record_id"):
+            alloc.provider_record_id = None
+
+def _on_failure(db: Session, job: ProvisioningJob, task: JobTask, err: Exception):
+    job.last_error = str(err)[:2000]
+    if job.attempts < job.max_attempts:
+        job.status = JobStatus.queued
+        job.run_after = dt.datetime.utcnow() + dt.timedelta(seconds=backoff_seconds(job.attempts))
+        logger.warning("Provisioning job %s (%s) failed, retry %s/%s: %s",
+                       job.id, job.action, job.attempts, job.max_attempts, err)
+        return
+    job.status = JobStatus.failed
+    logger.error("Provisioning job %s (%s) gave up after %s attempts: %s",
+                 job.id, job.action, job.attempts, err)
+    if task.action == "create" and task.allocation_id:
+        # 创建彻底失败时退回待审核，管理员可重新审批
+        alloc = db.get(Allocation, task.allocation_id)
+        if alloc and alloc.status == AllocationStatus.provisioning:
+            alloc.status = AllocationStatus.pending
+
+def process_batch(db: Session, limit: int | None = None) -> int:
+    """认领并执行一批任务，结果在一个事务中落库，返回处理的任务数"""
+    tasks = claim_jobs(db, limit or settings.PROVISION_BATCH_SIZE)
+    if not tasks:
+        return 0
+
+    outcomes = execute(tasks)
+
+    jobs = {j.id: j for j in db.scalars(
+        select(ProvisioningJob).where(ProvisioningJob.id.in_([t.job_id for t in tasks]))
+    ).all()}
+    for task, outcome in zip(tasks, outcomes):
+        job = jobs.get(task.job_id)
+        if job is None or job.status != JobStatus.running:
+            continue
+        job.locked_until = None
+        if outcome.error is None:
+            _on_success(db, job, task, outcome)
+        else:
+            _on_failure(db, job, task, outcome.error)
+    db.commit()
+    return len(tasks)
@@ -0,0 +1,91 @@
+"""分发配额：users.allocation_count 记录占用配额的申请数（待审批/解析中/已生效）
+
+计数与申请的插入、状态变更在同一事务内更新，配额检查只读写用户这一行，
+不统计 allocations 表。
+"""
+from collections import Counter
+
+from sqlalchemy import bindparam, case, func, or_, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+
+from .models import Allocation, AllocationStatus, Role, User
+from .config import get_settings
+
+settings = get_settings()
+
+# 禁用的申请不占用配额
+COUNTED = (AllocationStatus.pending, AllocationStatus.provisioning, AllocationStatus.active)
+
+_users = User.__table__
+
+def effective_quota(user: User) -> int | None:
+    """用户实际配额：个人配额优先，否则按角色默认；None 表示不限"""
+    quota = user.allocation_quota
+    if quota is None:
+        quota = settings.ALLOCATION_QUOTA_ADMIN if user.role == Role.admin else settings.ALLOCATION_QUOTA_USER
+    return quota if quota > 0 else None
+
+def _quota_expr():
+    default = case((User.role == Role.admin, settings.ALLOCATION_QUOTA_ADMIN), else_=settings.ALLOCATION_QUOTA_USER)
+    return func.coalesce(User.allocation_quota, default)
+
+async def reserve(db: AsyncSession, user_id: int, n: int = 1) -> bool:
+    """在配额内为用户增加 n 个计数（条件 UPDATE，原子），超出配额时返回 False"""
+    quota = _quota_expr()
+    updated = await db.scalar(
+        update(User)
+        .where(User.id == user_id, or_(quota <= 0, User.allocation_count + n <= quota))
+        .values(allocation_count=User.allocation_count + n)
+        .returning(User.id)
+        .execution_options(synchronize_session=False)
+    )
+    return updated is not None
+
+async def remaining(db: AsyncSession, user_id: int) -> int | None:
+    """锁定用户行并返回剩余配额（None 表示不限），用于批量提交时截断"""
+    row = (await db.execute(
+        select(User.allocation_count, _quota_expr()).where(User.id == user_id).with_for_update()
+    )).one_or_none()
+    if row is None:
+        return 0
+    count, quota = row
+    return None if quota <= 0 else max(quota - count, 0)
+
+async def add_async(db: AsyncSession, user_id: int, n: int) -> None:
+    await db.execute(
+        update(_users).where(_users.c.id == user_id).values(allocation_count=_users.c.allocation_count + n)
+    )
+
+def _release_stmt():
+    return (
+        update(_users)
+        .where(_users.c.id == bindparam("uid"))
+        .values(allocation_count=func.greatest(_users.c.allocation_count - bindparam("n"), 0))
+    )
+
+def released(pairs) -> Counter:
+    """统计即将离开计数状态（禁用或删除）的申请，pairs 为 (user_id, 原状态)，按用户汇总"""
+    counts = Counter()
+    for user_id, status in pairs:
+        if status in COUNTED:
+            counts[user_id] += 1
+    return counts
+
+def release(db: Session, counts: Counter) -> None:
+    """按用户减少计数，由调用方提交"""
+    if counts:
+        db.execute(_release_stmt(), [{"uid": uid, "n": n} for uid, n in counts.items()])
+
+def recount(db: Session) -> None:
+    """按 allocations 表重新计算全部用户的计数（迁移、播种或修复时使用）"""
+    counts = (
+        select(Allocation.user_id, func.count().label("n"))
+        .where(Allocation.status.in_(COUNTED))
+        .group_by(Allocation.user_id)
+        .subquery()
+    )
+    db.execute(update(_users).values(allocation_count=0).where(_users.c.allocation_count != 0))
+    db.execute(
+        update(_users).where(_users.c.id == counts.c.user_id).values(allocation_count=counts.c.n)
+    )
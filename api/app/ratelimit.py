@@ -0,0 +1,242 @@
+"""令牌桶限流中间件
+
+在路由之前执行：被拒绝的请求不会打开数据库会话，也不会计算密码哈希。
+单实例使用内存后端；多实例部署设置 RATE_LIMIT_BACKEND=redis 共享计数。
+"""
+import ipaddress
+import json
+import logging
+import math
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+
+from fastapi import HTTPException
+
+from .auth import token_cache, verify_token
+from .config import get_settings
+from .metrics import RATE_LIMITED
+
+settings = get_settings()
+logger = logging.getLogger(__name__)
+
+@dataclass(frozen=True)
+class Rule:
+    name: str
+    method: str
+    path: str
+    capacity: int
+    refill_per_sec: float
+    per_user: bool = False
+
+def parse_rate(value: str) -> tuple[int, float]:
+    """解析 "次数/秒"，返回 (桶容量, 每秒补充令牌数)"""
+    count, _, period = value.partition("/")
+    capacity, seconds = int(count), float(period or 1)
+    if capacity <= 0 or seconds <= 0:
+        raise ValueError(f"Invalid rate limit: {value!r}")
+    return capacity, capacity / seconds
+
+def build_rules() -> list[Rule]:
+    login = parse_rate(settings.RATE_LIMIT_LOGIN)
+    register = parse_rate(settings.RATE_LIMIT_REGISTER)
+    allocate = parse_rate(settings.RATE_LIMIT_ALLOCATE)
+    ddns = parse_rate(settings.RATE_LIMIT_DDNS)
+    return [
+        Rule("login", "POST", "/auth/login", *login),
+        Rule("register", "POST", "/auth/register", *register),
+        # 单条与批量申请共用一个桶
+        Rule("allocate", "POST", "/allocations", *allocate, per_user=True),
+        Rule("allocate", "POST", "/allocations/batch", *allocate, per_user=True),
+        Rule("ddns", "GET", "/ddns/update", *ddns),
+    ]
+
+class MemoryBackend:
+    """进程内令牌桶，适用于单实例部署
+
+    桶按最近访问排序（LRU）。每次访问顺带检查最久未访问的几个桶，空闲到足以补满的
+    （capacity / refill_per_sec 秒）与新桶等价，直接丢弃；超过 max_keys 时从最旧一端
+    淘汰到低水位，淘汰开销摊还到每次访问为 O(1)。
+    """
+
+    _SWEEP = 2  # 每次访问检查的最旧桶数
+
+    def __init__(self, max_keys: int = 100_000):
+        self.max_keys = max_keys
+        self._low_water = max(1, int(max_keys * 0.9))
+        self._buckets: OrderedDict[str, tuple[float, float, float]] = OrderedDict()  # key -> (令牌, 时间, 补满时刻)
+
+    async def hit(self, key: str, capacity: int, refill_per_sec: float) -> float:
+        """消耗一个令牌；允许时返回 0，否则返回需要等待的秒数"""
+        now = time.monotonic()
+        tokens, ts, _ = self._buckets.get(key, (capacity, now, now))
+        tokens = min(capacity, tokens + (now - ts) * refill_per_sec)
+        if tokens >= 1:
+            retry_after = 0.0
+            tokens -= 1
+        else:
+            retry_after = (1 - tokens) / refill_per_sec
+        self._buckets[key] = (tokens, now, now + (capacity - tokens) / refill_per_sec)
+        self._buckets.move_to_end(key)
+        self._evict(now)
+        return retry_after
+
+    def _evict(self, now: float) -> None:
+        buckets = self._buckets
+        for _ in range(self._SWEEP):
+            key, (_, _, full_at) = next(iter(buckets.items()))
+            if full_at > now:
+                break
+            del buckets[key]
+        if len(buckets) > self.max_keys:
+            for _ in range(len(buckets) - self._low_water):
+                buckets.popitem(last=False)
+
+    async def close(self):
+        self._buckets.clear()
+
+_REDIS_SCRIPT = """
+local capacity = tonumber(ARGV[1])
+local rate = tonumber(ARGV[2])
+local t = redis.call('TIME')
+local now = tonumber(t[1]) + tonumber(t[2]) / 1000000
+local b = redis.call('HMGET', KEYS[1], 'tokens', 'ts')
+local tokens = tonumber(b[1]) or capacity
+local ts = tonumber(b[2]) or now
+tokens = math.min(capacity, tokens + (now - ts) * rate)
+local retry = 0
+if tokens >= 1 then
+    tokens = tokens - 1
+else
+    retry = (1 - tokens) / rate
+end
+redis.call('HSET', KEYS[1], 'tokens', tokens, 'ts', now)
+redis.call('PEXPIRE', KEYS[1], math.ceil(capacity / rate * 1000))
+return tostring(retry)
+"""
+
+class RedisBackend:
+    """Redis 令牌桶（Lua 脚本保证原子性），多实例共享限额；需要安装 redis 包"""
+
+    def __init__(self, url: str):
+        import redis.asyncio as redis  # 可选依赖，仅在启用时导入
+
+        self._client = redis.from_url(url)
+        self._script = self._client.register_script(_REDIS_SCRIPT)
+
+    async def hit(self, key: str, capacity: int, refill_per_sec: float) -> float:
+        try:
+            return float(await self._script(keys=[key], args=[capacity, refill_per_sec]))
+        except Exception as e:
+            # 限流后端故障时放行，不影响登录等核心功能
+            logger.warning("Rate limit backend error, allowing request: %s", e)
+            return 0.0
+
+    async def close(self):
+        await self._client.aclose()
+
+def _build_backend():
+    if settings.RATE_LIMIT_BACKEND == "redis":
+        return RedisBackend(settings.RATE_LIMIT_REDIS_URL)
+    return MemoryBackend()
+
+_trusted_proxies = [ipaddress.ip_network(p, strict=False) for p in settings.RATE_LIMIT_TRUSTED_PROXIES]
+
+def _is_trusted(ip: str) -> bool:
+    try:
+        addr = ipaddress.ip_address(ip)
+    except ValueError:
+        return False
+    return any(addr in net for net in _trusted_proxies)
+
+def client_ip(scope, headers: dict[bytes, bytes]) -> str:
+    """客户端 IP：来自可信代理时取 X-Forwarded-For 中最右侧的非代理地址"""
+    client = scope.get("client")
+    ip = client[0] if client else "unknown"
+    if not _trusted_proxies or not _is_trusted(ip):
+        return ip
+    forwarded = headers.get(b"x-forwarded-for", b"").decode("latin-1")
+    for hop in reversed([h.strip() for h in forwarded.split(",") if h.strip()]):
+        if not _is_trusted(hop):
+            return hop
+    return ip
+
+def _bearer_token(headers: dict[bytes, bytes]) -> str | None:
+    auth = headers.get(b"authorization", b"").decode("latin-1")
+    scheme, _, credentials = auth.partition(" ")
+    if scheme.lower() == "bearer" and credentials:
+        return credentials.strip()
+    for part in headers.get(b"cookie", b"").decode("latin-1").split(";"):
+        name, _, value = part.strip().partition("=")
+        if name == "access_token" and value:
+            return value
+    return None
+
+def user_id(headers: dict[bytes, bytes]) -> str | None:
+    """从访问令牌取用户 ID（优先命中令牌缓存，不查数据库），无效时返回 None"""
+    token = _bearer_token(headers)
+    if not token:
+        return None
+    cached = token_cache.get(token_cache.key(token))
+    if cached is not None:
+        return str(cached.sub)
+    try:
+        return str(verify_token(token, settings.JWT_SECRET).sub)
+    except HTTPException:
+        return None
+
+class RateLimiter:
+    def __init__(self, rules: list[Rule], backend):
+        self.rules = {(r.method, r.path): r for r in rules}
+        self.backend = backend
+
+    def match(self, method: str, path: str) -> Rule | None:
+        return self.rules.get((method, path.rstrip("/") or "/"))
+
+    async def check(self, rule: Rule, scope, headers: dict[bytes, bytes]) -> float:
+        ident = None
+        if rule.per_user:
+            uid = user_id(headers)
+            ident = f"u:{uid}" if uid else None
+        if ident is None:
+            ident = f"ip:{client_ip(scope, headers)}"
+        return await self.backend.hit(f"rl:{rule.name}:{ident}", rule.capacity, rule.refill_per_sec)
+
+    async def close(self):
+        await self.backend.close()
+
+rate_limiter = RateLimiter(build_rules(), _build_backend())
+
+class RateLimitMiddleware:
+    """纯 ASGI 中间件，只对配置了规则的路由生效"""
+
+    def __init__(self, app, limiter: RateLimiter = rate_limiter):
+        self.app = app
+        self.limiter = limiter
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not settings.RATE_LIMIT_ENABLED:
+            await self.app(scope, receive, send)
+            return
+        rule = self.limiter.match(scope["method"], scope["path"])
+        if rule is None:
+            await self.app(scope, receive, send)
+            return
+
+        retry_after = await self.limiter.check(rule, scope, dict(scope["headers"]))
+        if retry_after <= 0:
+            await self.app(scope, receive, send)
+            return
+
+        RATE_LIMITED.labels(rule.name).inc()
+        body = json.dumps({"detail": "Too many requests"}).encode()
+        await send({
+            "type": "http.response.start",
+            "status": 429,
+            "headers": [
+                (b"content-type", b"application/json"),
+                (b"content-length", str(len(body)).encode()),
+                (b"retry-after", str(max(1, math.ceil(retry_after))).encode()),
+            ],
+        })
+        await send({"type": "http.response.body", "body": body})
@@ -0,0 +1,204 @@
+"""区域对账：比对数据库分发记录与服务商线上解析，生成最小变更计划
+
+用法: python -m app.reconcile [--domain example.com] [--apply] [--prune]
+"""
+import argparse
+import json
+import logging
+import time
+from collections import Counter
+from dataclasses import dataclass, field, asdict
+from typing import Iterable
+
+from sqlalchemy import select, update
+from sqlalchemy.orm import Session
+
+from .models import Allocation, AllocationStatus, Domain
+from .config import get_settings
+from .providers import Record, get_provider
+from .zones import domain_cache
+from . import provisioning
+
+settings = get_settings()
+logger = logging.getLogger(__name__)
+
+# 不参与对账的系统记录类型
+SKIP_TYPES = {"NS", "SOA"}
+# 值为主机名的记录类型，服务商返回时带结尾的点
+HOST_TYPES = {"CNAME", "MX", "NS"}
+
+class UnknownDomain(ValueError):
+    """对账目标不是托管的根域名"""
+
+@dataclass(slots=True)
+class ZoneRecord:
+    record_id: int
+    value: str
+    ttl: int
+
+@dataclass
+class PlanItem:
+    op: str                      # create / update / delete / link
+    subdomain: str
+    type: str
+    allocation_id: int | None = None
+    record_id: int | None = None
+    value: str | None = None
+    ttl: int | None = None
+    reason: str = ""
+
+@dataclass
+class Plan:
+    domain: str
+    zone_records: int = 0
+    allocations: int = 0
+    elapsed_ms: float = 0.0
+    items: list[PlanItem] = field(default_factory=list)
+
+    def summary(self) -> dict:
+        return dict(Counter(i.op for i in self.items))
+
+    def to_dict(self, limit: int | None = None) -> dict:
+        items = self.items if limit is None else self.items[:limit]
+        return {
+            "domain": self.domain,
+            "zone_records": self.zone_records,
+            "allocations": self.allocations,
+            "elapsed_ms": round(self.elapsed_ms, 1),
+            "summary": self.summary(),
+            "items": [asdict(i) for i in items],
+            "truncated": limit is not None and len(self.items) > limit,
+        }
+
+def normalize_value(rtype: str, value: str | None) -> str | None:
+    """统一线上与数据库中的记录值写法：主机名去掉结尾的点并转小写，TXT 去掉外层引号"""
+    if value is None:
+        return None
+    if rtype in HOST_TYPES:
+        return value.rstrip(".").lower()
+    if rtype == "TXT" and len(value) >= 2 and value[0] == value[-1] == '"':
+        return value[1:-1]
+    return value
+
+def build_index(records: Iterable[Record]) -> tuple[dict[tuple[str, str], list[ZoneRecord]], int]:
+    """把线上记录按 (subdomain, type) 建索引，只保留对账需要的字段"""
+    index: dict[tuple[str, str], list[ZoneRecord]] = {}
+    count = 0
+    for r in records:
+        count += 1
+        if r.type in SKIP_TYPES or r.system:
+            continue
+        key = (r.name.lower(), r.type)
+        index.setdefault(key, []).append(ZoneRecord(r.record_id, r.value, r.ttl))
+    return index, count
+
+def diff(index: dict[tuple[str, str], list[ZoneRecord]], allocations, prune: bool = False) -> list[PlanItem]:
+    """比对索引与数据库分发，index 会被就地消耗"""
+    items: list[PlanItem] = []
+    for alloc in allocations:
+        key = (alloc.subdomain, alloc.type)
+        records = index.pop(key, [])
+        value = normalize_value(alloc.type, alloc.value)
+        if alloc.status == AllocationStatus.active:
+            if not records:
+                items.append(PlanItem("create", alloc.subdomain, alloc.type, alloc.id,
+                                      value=alloc.value, ttl=alloc.ttl, reason="missing upstream"))
+                continue
+            match = next((r for r in records if r.record_id == alloc.provider_record_id), None) \
+                or next((r for r in records if normalize_value(alloc.type, r.value) == value), None) \
+                or records[0]
+            if normalize_value(alloc.type, match.value) != value or match.ttl != alloc.ttl:
+                items.append(PlanItem("update", alloc.subdomain, alloc.type, alloc.id, match.record_id,
+                                      alloc.value, alloc.ttl, reason="value/ttl drift"))
+            if alloc.provider_record_id != match.record_id:
+                items.append(PlanItem("link", alloc.subdomain, alloc.type, alloc.id, match.record_id,
+                                      reason="record id not stored"))
+            if prune:
+                items.extend(PlanItem("delete", alloc.subdomain, alloc.type, alloc.id, r.record_id,
+                                      r.value, reason="duplicate")
+                             for r in records if r is not match)
+        elif alloc.status == AllocationStatus.disabled:
+            items.extend(PlanItem("delete", alloc.subdomain, alloc.type, alloc.id, r.record_id,
+                                  r.value, reason="allocation disabled")
+                         for r in records
+                         if prune or r.record_id == alloc.provider_record_id
+                         or normalize_value(alloc.type, r.value) == value)
+        # pending / provisioning：由审批流程或 worker 负责，不做处理
+
+    if prune:
+        for (subdomain, rtype), records in index.items():
+            items.extend(PlanItem("delete", subdomain, rtype, None, r.record_id, r.value, reason="unmanaged")
+                         for r in records if subdomain != "@")
+    return items
+
+def resolve_domain(db: Session, domain: str) -> tuple[int, str]:
+    """取托管根域名的 (id, provider)，缓存和 domains 表中都没有时抛出 UnknownDomain，
+    避免拿默认服务商列出一个没有任何分发的区域后把记录当作未托管删除"""
+    cached = domain_cache.find(domain)
+    if cached is not None:
+        return cached.id, cached.provider
+    row = db.execute(select(Domain.id, Domain.provider).where(Domain.name == domain)).one_or_none()
+    if row is None or not row.provider:
+        raise UnknownDomain(f"Unmanaged domain: {domain}")
+    return row.id, row.provider
+
+def build_plan(db: Session, domain: str | None = None, prune: bool = False) -> Plan:
+    domain = (domain or settings.DNS_ROOT_DOMAIN).lower()
+    started = time.perf_counter()
+    plan = Plan(domain=domain)
+
+    domain_id, provider = resolve_domain(db, domain)
+    index, plan.zone_records = build_index(get_provider(provider).list_records(domain))
+
+    allocations = db.execute(
+        select(Allocation.id, Allocation.subdomain, Allocation.type, Allocation.value,
+               Allocation.ttl, Allocation.status, Allocation.provider_record_id)
+        .where(Allocation.domain_id == domain_id)
+    ).all()
+    plan.allocations = len(allocations)
+    plan.items = diff(index, allocations, prune=prune)
+    plan.elapsed_ms = (time.perf_counter() - started) * 1000
+    return plan
+
+def apply_plan(db: Session, plan: Plan) -> None:
+    """在一个事务中执行计划：回填记录ID，其余变更入队交给 worker"""
+    links = [{"id": i.allocation_id, "provider_record_id": i.record_id} for i in plan.items if i.op == "link"]
+    if links:
+        db.execute(update(Allocation), links)
+    jobs = []
+    for item in plan.items:
+        if item.op == "create":
+            jobs.append((item.allocation_id, "create", None))
+        elif item.op == "update":
+            jobs.append((item.allocation_id, "update", {"record_id": item.record_id}))
+        elif item.op == "delete":
+            jobs.append((None, "delete", {"record_id": item.record_id, "domain": plan.domain,
+                                          "allocation_id": item.allocation_id}))
+    provisioning.enqueue_many(db, jobs)
+    db.commit()
+
+def main():
+    parser = argparse.ArgumentParser(description="Reconcile allocations against provider zone records")
+    parser.add_argument("--domain", default=None, help="要对账的根域名，默认全部 DNS_ROOT_DOMAINS")
+    parser.add_argument("--apply", action="store_true", help="执行计划（默认只输出）")
+    parser.add_argument("--prune", action="store_true", help="同时删除未被任何分发管理的记录")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s [%(name)s] %(message)s")
+    from .db import SessionLocal
+
+    for domain in ([args.domain] if args.domain else settings.DNS_ROOT_DOMAINS):
+        with SessionLocal() as db:
+            try:
+                plan = build_plan(db, domain, prune=args.prune)
+            except UnknownDomain as e:
+                parser.error(str(e))
+            if args.apply:
+                apply_plan(db, plan)
+        print(json.dumps(plan.to_dict(), ensure_ascii=False, indent=2))
+        logger.info("Reconciled %s: %s zone records, %s allocations, %s (%.0fms)%s",
+                    plan.domain, plan.zone_records, plan.allocations, plan.summary(), plan.elapsed_ms,
+                    " [applied]" if args.apply else "")
+
+if __name__ == "__main__":
+    main()
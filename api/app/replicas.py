@@ -0,0 +1,163 @@
+"""只读副本路由：列表与查询接口轮询健康的副本，用户刚写入时改读主库
+
+后台任务定期检查每个副本的连通性与复制延迟，连接失败或延迟超过
+DB_REPLICA_MAX_LAG_SEC 的副本暂停使用，全部不可用时回退主库。
+用户的写请求成功后，DB_READ_AFTER_WRITE_SEC 内其读取走主库（读己之写）；
+写入标记通过 NOTIFY 同步到其他进程。未配置副本时所有读取直接走主库。
+"""
+import asyncio
+import itertools
+import logging
+import threading
+import time
+
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncEngine, async_sessionmaker
+
+from .config import get_settings
+from .db import AsyncSessionLocal, replica_engines
+from .metrics import DB_READ_ROUTE, DB_REPLICA_HEALTHY, DB_REPLICA_LAG
+from .notify import listener, publish_async
+from .ratelimit import user_id
+
+settings = get_settings()
+logger = logging.getLogger(__name__)
+
+CHANNEL = "user_writes"
+
+_SAFE_METHODS = {"GET", "HEAD", "OPTIONS"}
+
+# 已回放到接收位置时视为无延迟；否则用最后回放事务的时间估算（主库空闲时不会误判）
+_LAG_QUERY = text(
+    "SELECT CASE WHEN NOT pg_is_in_recovery() THEN 0 "
+    "WHEN pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0 "
+    "ELSE COALESCE(EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp()), 0) END"
+)
+
+class Replica:
+    def __init__(self, name: str, engine: AsyncEngine):
+        self.name = name
+        self.engine = engine
+        self.sessionmaker = async_sessionmaker(engine, autoflush=False, expire_on_commit=False)
+        self.healthy = False  # 首次检查通过前不使用
+        self.lag: float | None = None
+
+class RecentWrites:
+    """用户 ID -> 读主库截止时间（monotonic）"""
+
+    def __init__(self, window: float):
+        self.window = window
+        self._until: dict[str, float] = {}
+        self._lock = threading.Lock()
+        self._next_prune = 1024
+
+    def mark(self, uid: str) -> bool:
+        """记录一次写入，返回是否需要广播：距上次广播超过半个窗口才再发，
+        其他进程在任意一次写入之后至少还会读主库半个窗口"""
+        now = time.monotonic()
+        with self._lock:
+            previous = self._until.get(uid, 0.0)
+            self._until[uid] = now + self.window
+            if len(self._until) >= self._next_prune:
+                self._until = {u: t for u, t in self._until.items() if t > now}
+                self._next_prune = max(1024, len(self._until) * 2)
+        return previous - now < self.window / 2
+
+    def recent(self, uid: str) -> bool:
+        return self._until.get(uid, 0.0) > time.monotonic()
+
+class ReplicaSet:
+    def __init__(self, engines: list[AsyncEngine]):
+        self.replicas = [Replica(f"replica{i}", e) for i, e in enumerate(engines)]
+        self.recent_writes = RecentWrites(settings.DB_READ_AFTER_WRITE_SEC)
+        self._counter = itertools.count()
+
+    def pick(self) -> Replica | None:
+        """在健康副本间轮询"""
+        healthy = [r for r in self.replicas if r.healthy]
+        if not healthy:
+            return None
+        return healthy[next(self._counter) % len(healthy)]
+
+    def sessionmaker_for(self, uid) -> async_sessionmaker:
+        """用户最近写入过或无可用副本时返回主库会话工厂"""
+        if not self.replicas:
+            return AsyncSessionLocal
+        if self.recent_writes.recent(str(uid)):
+            DB_READ_ROUTE.labels("primary_recent_write").inc()
+            return AsyncSessionLocal
+        replica = self.pick()
+        if replica is None:
+            DB_READ_ROUTE.labels("primary_no_replica").inc()
+            return AsyncSessionLocal
+        DB_READ_ROUTE.labels(replica.name).inc()
+        return replica.sessionmaker
+
+    async def _lag(self, replica: Replica) -> float:
+        async with replica.engine.connect() as conn:
+            return float(await conn.scalar(_LAG_QUERY))
+
+    async def _check(self, replica: Replica) -> None:
+        try:
+            lag = await asyncio.wait_for(self._lag(replica), timeout=max(settings.DB_REPLICA_CHECK_SEC, 1))
+        except Exception as e:
+            if replica.healthy:
+                logger.warning("Replica %s unavailable: %s", replica.name, e)
+            replica.healthy, replica.lag = False, None
+        else:
+            healthy = lag <= settings.DB_REPLICA_MAX_LAG_SEC
+            if replica.healthy and not healthy:
+                logger.warning("Replica %s lagging %.1fs, routing reads to primary", replica.name, lag)
+            replica.healthy, replica.lag = healthy, lag
+            DB_REPLICA_LAG.labels(replica.name).set(lag)
+        DB_REPLICA_HEALTHY.labels(replica.name).set(1 if replica.healthy else 0)
+
+    async def check(self) -> None:
+        await asyncio.gather(*(self._check(r) for r in self.replicas))
+
+    async def monitor(self, interval: int) -> None:
+        """定期健康检查，由 API 进程在 lifespan 中启动"""
+        while True:
+            await asyncio.sleep(interval)
+            await self.check()
+
+    async def mark_write(self, uid: str) -> None:
+        if not self.recent_writes.mark(uid):
+            return
+        try:
+            async with AsyncSessionLocal() as db:
+                await publish_async(db, CHANNEL, uid)
+                await db.commit()
+        except Exception:
+            logger.exception("Failed to broadcast write marker for user %s", uid)
+
+    async def dispose(self) -> None:
+        for replica in self.replicas:
+            await replica.engine.dispose()
+
+replica_set = ReplicaSet(replica_engines)
+
+class ReadAfterWriteMiddleware:
+    """纯 ASGI 中间件：登录用户的写请求成功后，在响应发出前标记其近期读主库"""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not replica_set.replicas or scope["method"] in _SAFE_METHODS:
+            await self.app(scope, receive, send)
+            return
+        uid = user_id(dict(scope["headers"]))
+        if uid is None:
+            await self.app(scope, receive, send)
+            return
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start" and message["status"] < 400:
+                await replica_set.mark_write(uid)
+            await send(message)
+
+        await self.app(scope, receive, send_wrapper)
+
+if replica_set.replicas:
+    listener.subscribe(CHANNEL, lambda payload: replica_set.recent_writes.mark(payload))
@@ -0,0 +1,136 @@
+"""令牌吊销列表：内存中保存已停用用户、令牌失效时间点与已吊销的会话（刷新令牌家族）
+
+require_user 只查这里，不访问 users 表。启动时从数据库加载，写入方在业务事务中
+通过 NOTIFY 广播变更，各副本提交后同步；监听断线重连后全量重载。
+"""
+import datetime as dt
+import json
+import logging
+import time
+
+from sqlalchemy import event, func, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+
+from .models import RefreshToken, User
+from .schemas import TokenData
+from .config import get_settings
+from .notify import listener, publish, publish_async
+
+settings = get_settings()
+logger = logging.getLogger(__name__)
+
+CHANNEL = "auth_revocations"
+
+def _epoch(value: dt.datetime) -> float:
+    return value.replace(tzinfo=dt.timezone.utc).timestamp()
+
+def _ttl() -> int:
+    return settings.ACCESS_TOKEN_TTL_MIN * 60
+
+class RevocationList:
+    def __init__(self):
+        self._inactive: set[int] = set()
+        self._cutoff: dict[int, float] = {}   # user_id -> 此前签发的令牌全部失效
+        self._sessions: dict[str, float] = {}  # family_id -> 条目到期时间
+        self._next_prune = 1024
+        self.loaded = False
+
+    def _replace(self, inactive, cutoffs, sessions) -> None:
+        self._inactive = set(inactive)
+        self._cutoff = {user_id: _epoch(at) for user_id, at in cutoffs}
+        self._sessions = {family: _epoch(at) + _ttl() for family, at in sessions}
+        self.loaded = True
+        logger.info("Revocation list loaded: %d inactive users, %d cutoffs, %d sessions",
+                    len(self._inactive), len(self._cutoff), len(self._sessions))
+
+    @staticmethod
+    def _queries():
+        # 刷新令牌在数据库中逐个校验，内存里只需覆盖仍可能有效的访问令牌
+        horizon = dt.datetime.utcnow() - dt.timedelta(seconds=_ttl())
+        return (
+            select(User.id).where(User.is_active.is_(False)),
+            select(User.id, User.tokens_valid_after).where(User.tokens_valid_after > horizon),
+            select(RefreshToken.family_id, func.max(RefreshToken.revoked_at))
+            .where(RefreshToken.revoked_at > horizon)
+            .group_by(RefreshToken.family_id),
+        )
+
+    def load(self, db: Session) -> None:
+        inactive, cutoffs, sessions = self._queries()
+        self._replace(db.scalars(inactive).all(), db.execute(cutoffs).all(), db.execute(sessions).all())
+
+    async def load_async(self, db: AsyncSession) -> None:
+        inactive, cutoffs, sessions = self._queries()
+        self._replace((await db.scalars(inactive)).all(), (await db.execute(cutoffs)).all(),
+                      (await db.execute(sessions)).all())
+
+    def is_revoked(self, data: TokenData) -> bool:
+        """O(1) 判断令牌是否已被吊销"""
+        if data.sub in self._inactive:
+            return True
+        cutoff = self._cutoff.get(data.sub)
+        if cutoff is not None and (data.iat or 0) <= cutoff:
+            return True
+        return data.sid is not None and data.sid in self._sessions
+
+    def apply(self, payload: str) -> None:
+        """处理其他副本（或本进程）广播的变更"""
+        msg = json.loads(payload)
+        op = msg["op"]
+        if op == "deactivate":
+            self._inactive.add(msg["user_id"])
+        elif op == "activate":
+            self._inactive.discard(msg["user_id"])
+        elif op == "cutoff":
+            self._cutoff[msg["user_id"]] = max(msg["at"], self._cutoff.get(msg["user_id"], 0))
+        elif op == "session":
+            self._prune()
+            self._sessions[msg["family"]] = msg["at"] + _ttl()
+
+    def _prune(self) -> None:
+        """丢弃已无有效访问令牌的会话条目（定期或集合变大时）"""
+        now = time.time()
+        if len(self._sessions) >= self._next_prune:
+            self._sessions = {f: exp for f, exp in self._sessions.items() if exp > now}
+            self._next_prune = max(1024, len(self._sessions) * 2)
+
+revocations = RevocationList()
+
+def _message(op: str, **fields) -> str:
+    return json.dumps({"op": op, **fields})
+
+def _pending(session: Session) -> list[str]:
+    """本事务中待应用的变更；提交后应用到本进程，回滚时丢弃，与其他副本收到 NOTIFY 的时机一致"""
+    pending = session.info.get("revocations")
+    if pending is None:
+        pending = session.info["revocations"] = []
+        event.listen(session, "after_commit", _apply_pending)
+        event.listen(session, "after_rollback", lambda s: s.info["revocations"].clear())
+    return pending
+
+def _apply_pending(session: Session) -> None:
+    pending = session.info["revocations"]
+    for payload in pending:
+        revocations.apply(payload)
+    pending.clear()
+
+def broadcast(db: Session, op: str, **fields) -> None:
+    """在调用方事务中广播吊销变更，提交后各副本（含本进程）更新吊销列表"""
+    payload = _message(op, **fields)
+    publish(db, CHANNEL, payload)
+    _pending(db).append(payload)
+
+async def broadcast_async(db: AsyncSession, op: str, **fields) -> None:
+    payload = _message(op, **fields)
+    await publish_async(db, CHANNEL, payload)
+    _pending(db.sync_session).append(payload)
+
+def _reload() -> None:
+    from .db import SessionLocal
+
+    with SessionLocal() as db:
+        revocations.load(db)
+
+listener.subscribe(CHANNEL, revocations.apply)
+listener.on_reconnect(_reload)
@@ -1,72 +1,273 @@
-from fastapi import APIRouter, Depends, HTTPException
+import datetime as dt
+
+from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi.responses import StreamingResponse
 from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 from typing import List, Optional
 
-from ..models import User, Allocation, AllocationStatus, Role
-from ..schemas import UserOut, AllocationOut
+from ..models import User, Allocation, AllocationStatus, Role, Domain
+from ..schemas import UserPage, AllocationPage, DomainOut, BulkApproveIn, BulkIdsIn, BulkItemResult, BulkResult
 from ..auth import require_admin
-from ..deps import get_db
-from .. import dnspod
+from ..deps import get_db, get_async_db, get_read_db
+from ..config import get_settings
+from ..zones import domain_cache
+from ..availability import availability_index, broadcast
+from .. import ddns, dnspod, zones, provisioning, reconcile, exporter, quota, revocation, sessions
 
 router = APIRouter()
+settings = get_settings()
+
+def _locked_ids(db: Session, ids: List[int], found: set) -> set:
+    """被 SKIP LOCKED 跳过的 id：行存在但正被其他请求锁定"""
+    missing = [i for i in ids if i not in found]
+    if not missing:
+        return set()
+    return set(db.scalars(select(Allocation.id).where(Allocation.id.in_(missing))).all())
+
+def _page_limit(limit: Optional[int]) -> int:
+    return max(1, min(limit or settings.ADMIN_PAGE_SIZE, settings.ADMIN_PAGE_MAX))
 
-@router.get("/users", response_model=List[UserOut])
-def get_users(admin=Depends(require_admin), db: Session = Depends(get_db)):
-    """获取所有用户列表"""
-    users = db.scalars(select(User)).all()
-    return users
+@router.get("/users", response_model=UserPage)
+async def get_users(cursor: Optional[int] = None, limit: Optional[int] = None,
+                    admin=Depends(require_admin), db: AsyncSession = Depends(get_read_db)):
+    """获取用户列表（按 id 游标分页）"""
+    limit = _page_limit(limit)
+    query = select(User).order_by(User.id).limit(limit + 1)
+    if cursor is not None:
+        query = query.where(User.id > cursor)
+    users = (await db.scalars(query)).all()
+    has_more = len(users) > limit
+    users = users[:limit]
+    return UserPage(items=users, next_cursor=users[-1].id if has_more else None)
 
 @router.patch("/users/{user_id}")
 def update_user(user_id: int, role: Optional[str] = None, is_active: Optional[bool] = None, 
+                allocation_quota: Optional[int] = None,
                 admin=Depends(require_admin), db: Session = Depends(get_db)):
-    """更新用户权限"""
+    """更新用户权限与配额（allocation_quota: 0 为不限，负数恢复角色默认）"""
     user = db.get(User, user_id)
     if not user:
         raise HTTPException(404, "User not found")
     
-    if role and role in ["admin", "user"]:
+    revoke = False
+    if role and role in ["admin", "user"] and user.role != Role(role):
         user.role = Role(role)
-    if is_active is not None:
+        revoke = True  # 令牌里的角色已过期
+    if is_active is not None and is_active != user.is_active:
         user.is_active = is_active
+        revocation.broadcast(db, "activate" if is_active else "deactivate", user_id=user.id)
+        revoke = revoke or not is_active
+    if revoke:
+        sessions.revoke_user(db, user)
+    if allocation_quota is not None:
+        user.allocation_quota = allocation_quota if allocation_quota >= 0 else None
     
     db.commit()
     return {"ok": True}
 
-@router.get("/allocations", response_model=List[AllocationOut])
-def get_allocations(status: Optional[str] = None, admin=Depends(require_admin), db: Session = Depends(get_db)):
-    """获取分发申请列表"""
-    query = select(Allocation)
+@router.get("/allocations", response_model=AllocationPage)
+async def get_allocations(status: Optional[AllocationStatus] = None, user_id: Optional[int] = None,
+                          subdomain_prefix: Optional[str] = None, type: Optional[str] = None,
+                          cursor: Optional[int] = None, limit: Optional[int] = None,
+                          admin=Depends(require_admin), db: AsyncSession = Depends(get_read_db)):
+    """获取分发申请列表（按 id 游标分页，筛选条件均走索引）"""
+    limit = _page_limit(limit)
+    query = select(Allocation).order_by(Allocation.id).limit(limit + 1)
     if status:
-        query = query.where(Allocation.status == AllocationStatus(status))
-    
-    allocations = db.scalars(query).all()
-    return allocations
+        query = query.where(Allocation.status == status)
+    if user_id is not None:
+        query = query.where(Allocation.user_id == user_id)
+    if type:
+        query = query.where(Allocation.type == type)
+    if subdomain_prefix:
+        escaped = subdomain_prefix.lower().replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+        query = query.where(Allocation.subdomain.like(f"{escaped}%", escape="\\"))
+    if cursor is not None:
+        query = query.where(Allocation.id > cursor)
+
+    allocations = (await db.scalars(query)).all()
+    has_more = len(allocations) > limit
+    allocations = allocations[:limit]
+    return AllocationPage(items=allocations, next_cursor=allocations[-1].id if has_more else None)
+
+@router.post("/allocations/approve", response_model=BulkResult)
+def bulk_approve_allocations(body: BulkApproveIn, admin=Depends(require_admin), db: Session = Depends(get_db)):
+    """批量审批分发申请，一次事务内置为 provisioning 并入队，由 worker 并发创建 DNS 记录"""
+    if body.ids:
+        ids = list(dict.fromkeys(body.ids))
+        if len(ids) > settings.BULK_MAX_ITEMS:
+            raise HTTPException(400, f"Too many ids (max {settings.BULK_MAX_ITEMS})")
+        query = select(Allocation).where(Allocation.id.in_(ids))
+    elif body.status == AllocationStatus.pending:
+        query = (select(Allocation)
+                 .where(Allocation.status == AllocationStatus.pending)
+                 .order_by(Allocation.id)
+                 .limit(min(body.limit, settings.BULK_MAX_ITEMS)))
+        ids = None
+    else:
+        raise HTTPException(400, "Either ids or status=pending is required")
+
+    # 行锁避免并发审批重复创建记录；已被其他事务锁定的行跳过
+    allocs = db.scalars(query.with_for_update(skip_locked=True)).all()
+    pending = [a for a in allocs if a.status == AllocationStatus.pending]
+    if ids is None:
+        ids = [a.id for a in pending]
+
+    locked = _locked_ids(db, ids, {a.id for a in allocs})
+    results = {}
+    for alloc in pending:
+        alloc.status = AllocationStatus.provisioning
+        provisioning.enqueue(db, alloc.id, "create")
+        results[alloc.id] = BulkItemResult(id=alloc.id, ok=True)
+    db.commit()
+
+    items = [results.get(i) or BulkItemResult(
+        id=i, ok=False, error="Allocation is locked, retry" if i in locked else "Invalid allocation",
+    ) for i in ids]
+    succeeded = sum(1 for r in items if r.ok)
+    return BulkResult(total=len(items), succeeded=succeeded, failed=len(items) - succeeded, results=items)
 
 @router.post("/allocations/{alloc_id}/approve")
 def approve_allocation(alloc_id: int, admin=Depends(require_admin), db: Session = Depends(get_db)):
     """审批通过分发申请"""
-    alloc = db.get(Allocation, alloc_id)
+    alloc = db.get(Allocation, alloc_id, with_for_update=True)
     if not alloc or alloc.status != AllocationStatus.pending:
         raise HTTPException(400, "Invalid allocation")
-    
-    try:
-        resp = dnspod.create_record(alloc.subdomain, alloc.type, alloc.value, alloc.ttl)
-        # 记录返回的 RecordId 以便后续删除/禁用
-        # alloc.provider_record_id = resp.RecordId
-        alloc.status = AllocationStatus.active
-        db.commit()
-        return {"ok": True}
-    except Exception as e:
-        raise HTTPException(500, f"DNS record creation failed: {str(e)}")
+
+    # DNS 记录由 worker 异步创建，接口立即返回
+    alloc.status = AllocationStatus.provisioning
+    provisioning.enqueue(db, alloc.id, "create")
+    db.commit()
+    return {"ok": True, "status": alloc.status}
+
+def _disable(db: Session, allocs: List[Allocation]) -> None:
+    """置为禁用并入队上游记录删除，由调用方提交"""
+    quota.release(db, quota.released((a.user_id, a.status) for a in allocs))
+    for alloc in allocs:
+        alloc.status = AllocationStatus.disabled
+    provisioning.cancel_pending(db, [a.id for a in allocs])
+    provisioning.enqueue_deletes(db, allocs)
+    ddns.invalidate(db, [a.id for a in allocs])
+
+@router.post("/allocations/disable", response_model=BulkResult)
+def bulk_disable_allocations(body: BulkIdsIn, admin=Depends(require_admin), db: Session = Depends(get_db)):
+    """批量禁用分发记录，上游删除任务一次入队，由 worker 分批并发执行"""
+    ids = list(dict.fromkeys(body.ids))
+    if len(ids) > settings.BULK_MAX_ITEMS:
+        raise HTTPException(400, f"Too many ids (max {settings.BULK_MAX_ITEMS})")
+
+    allocs = db.scalars(
+        select(Allocation).where(Allocation.id.in_(ids)).with_for_update(skip_locked=True)
+    ).all()
+    found = {a.id for a in allocs}
+    locked = _locked_ids(db, ids, found)
+    targets = [a for a in allocs if a.status != AllocationStatus.disabled]
+    _disable(db, targets)
+    db.commit()
+
+    items = [BulkItemResult(id=i, ok=True) if i in found else BulkItemResult(
+        id=i, ok=False, error="Allocation is locked, retry" if i in locked else "Allocation not found",
+    ) for i in ids]
+    succeeded = sum(1 for r in items if r.ok)
+    return BulkResult(total=len(items), succeeded=succeeded, failed=len(items) - succeeded, results=items)
 
 @router.post("/allocations/{alloc_id}/disable")
 def disable_allocation(alloc_id: int, admin=Depends(require_admin), db: Session = Depends(get_db)):
-    """禁用分发记录"""
-    alloc = db.get(Allocation, alloc_id)
+    """禁用分发记录，并异步删除上游 DNS 记录"""
+    alloc = db.get(Allocation, alloc_id, with_for_update=True)
     if not alloc:
         raise HTTPException(404, "Allocation not found")
-    
-    alloc.status = AllocationStatus.disabled
+
+    if alloc.status != AllocationStatus.disabled:
+        _disable(db, [alloc])
+    db.commit()
+    return {"ok": True}
+
+@router.delete("/allocations/{alloc_id}")
+def delete_allocation(alloc_id: int, admin=Depends(require_admin), db: Session = Depends(get_db)):
+    """删除分发记录，上游 DNS 记录由 worker 异步删除"""
+    alloc = db.get(Allocation, alloc_id, with_for_update=True)
+    if not alloc:
+        raise HTTPException(404, "Allocation not found")
+
+    provisioning.cancel_pending(db, [alloc.id])
+    provisioning.enqueue_deletes(db, [alloc])
+    ddns.invalidate(db, [alloc.id])
+    quota.release(db, quota.released([(alloc.user_id, alloc.status)]))
+    key = (alloc.domain_id, alloc.subdomain, alloc.type)
+    db.delete(alloc)
+    broadcast(db, "remove", [key])
     db.commit()
+    availability_index.discard([key])
     return {"ok": True}
+
+def _export_response(name: str, query, format: str, gzip: bool) -> StreamingResponse:
+    media_type, ext = exporter.FORMATS[format]
+    filename = f"{name}-{dt.datetime.utcnow():%Y%m%d%H%M%S}.{ext}"
+    if gzip:
+        media_type, filename = "application/gzip", filename + ".gz"
+    return StreamingResponse(
+        exporter.export(query, format, gzip=gzip),
+        media_type=media_type,
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'},
+    )
+
+@router.get("/export/allocations")
+def export_allocations(format: str = Query("ndjson", pattern="^(ndjson|csv)$"), gzip: bool = False,
+                       since: Optional[dt.datetime] = None, status: Optional[AllocationStatus] = None,
+                       admin=Depends(require_admin)):
+    """流式导出分发记录；since 用于按 created_at 增量导出"""
+    query = select(
+        Allocation.id, Allocation.user_id, Allocation.domain_id, Allocation.subdomain, Allocation.type,
+        Allocation.value, Allocation.ttl, Allocation.status, Allocation.provider_record_id, Allocation.created_at,
+    ).order_by(Allocation.id)
+    if since is not None:
+        query = query.where(Allocation.created_at > since)
+    if status:
+        query = query.where(Allocation.status == status)
+    return _export_response("allocations", query, format, gzip)
+
+@router.get("/export/users")
+def export_users(format: str = Query("ndjson", pattern="^(ndjson|csv)$"), gzip: bool = False,
+                 since: Optional[dt.datetime] = None, admin=Depends(require_admin)):
+    """流式导出用户（不含密码哈希）"""
+    query = select(
+        User.id, User.email, User.role, User.is_active, User.email_verified_at, User.created_at,
+    ).order_by(User.id)
+    if since is not None:
+        query = query.where(User.created_at > since)
+    return _export_response("users", query, format, gzip)
+
+@router.get("/domains", response_model=List[DomainOut])
+async def get_domains(admin=Depends(require_admin), db: AsyncSession = Depends(get_read_db)):
+    """获取根域名列表"""
+    return (await db.scalars(select(Domain).order_by(Domain.id))).all()
+
+@router.post("/domains/reload")
+async def reload_domains(admin=Depends(require_admin), db: AsyncSession = Depends(get_async_db)):
+    """重新加载根域名缓存（修改 domains 表后调用），并通知其他副本"""
+    domain_cache.invalidate()
+    await domain_cache.warm_async(db)
+    await zones.broadcast_reload(db)
+    return {"ok": True, "domains": [d.name for d in domain_cache.all()]}
+
+@router.post("/reconcile")
+def reconcile_zone(domain: Optional[str] = None, apply: bool = False, prune: bool = False, limit: int = 1000,
+                   admin=Depends(require_admin), db: Session = Depends(get_db)):
+    """比对数据库与服务商线上记录；apply=true 时执行最小变更计划"""
+    try:
+        plan = reconcile.build_plan(db, domain, prune=prune)
+    except reconcile.UnknownDomain as e:
+        raise HTTPException(400, str(e))
+    except Exception as e:
+        raise HTTPException(502, f"Failed to list zone records: {e}")
+    if apply:
+        reconcile.apply_plan(db, plan)
+    return plan.to_dict(limit=limit)
+
+@router.get("/dnspod/stats")
+def dnspod_stats(admin=Depends(require_admin)):
+    """查看 DNSPod 调用延迟统计（当前进程）"""
+    return dnspod.call_stats()
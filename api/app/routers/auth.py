@@ -1,16 +1,19 @@
 import datetime as dt
 import logging
 import secrets
-from fastapi import APIRouter, Depends, HTTPException, BackgroundTasks, Response, Request, Body
-from sqlalchemy import select, func
+from fastapi import APIRouter, Depends, HTTPException, Response, Request, Body
+from sqlalchemy import select
 from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 
 from ..models import User, EmailToken, Role
 from ..schemas import RegisterIn, LoginIn, UserOut, TokenPair
-from ..auth import pwd_hasher, create_tokens, verify_token
-from ..deps import get_db
-from ..emailer import send_verification
+from ..auth import pwd_hasher, verify_token
+from ..deps import get_db, get_async_db
+from ..revocation import revocations
+from .. import outbox, sessions
+from ..metrics import AUTH_FAILURES
 from ..config import get_settings
 
 router = APIRouter()
@@ -31,14 +34,15 @@ def _cookie_params():
     return params
 
 @router.post("/register", response_model=UserOut)
-async def register(payload: RegisterIn, db: Session = Depends(get_db), bg: BackgroundTasks = None):
+async def register(payload: RegisterIn, db: AsyncSession = Depends(get_async_db)):
+    # 哈希在独立执行器中计算，且在开启事务之前完成，不占用数据库连接
+    hashed = await pwd_hasher.hash_async(payload.password)  # argon2
+
     # 事务内确保首个用户角色升级不发生竞态
-    with db.begin():
-        exists = db.scalar(select(func.count(User.id)))
-        role = Role.admin if exists == 0 else Role.user
-        is_first_user = exists == 0
+    async with db.begin():
+        is_first_user = await db.scalar(select(User.id).limit(1)) is None
+        role = Role.admin if is_first_user else Role.user
 
-        hashed = pwd_hasher.hash(payload.password)  # argon2 or bcrypt
         user = User(email=payload.email.lower(), password_hash=hashed, role=role)
         
         # 首位用户自动验证邮箱，无需邮件验证
@@ -47,7 +51,7 @@ async def register(payload: RegisterIn, db: Session = Depends(get_db), bg: Backg
             
         db.add(user)
         try:
-            db.flush()  # get user.id
+            await db.flush()  # get user.id
         except IntegrityError:
             logger.info("Attempted to register duplicate email: %s", payload.email)
             raise HTTPException(409, "Email already registered")
@@ -58,10 +62,9 @@ async def register(payload: RegisterIn, db: Session = Depends(get_db), bg: Backg
             db.add(EmailToken(user_id=user.id,
                               token=token,
                               expire_at=dt.datetime.utcnow() + dt.timedelta(hours=24)))
-            # 发邮件（后台异步）
+            # 验证邮件与用户同事务写入发件箱，由 worker 发送，失败自动重试
             verify_url = f"{settings.PUBLIC_WEB_URL}/verify?token={token}"
-            if bg:
-                bg.add_task(send_verification, to=user.email, verify_url=verify_url)
+            outbox.enqueue_verification(db, user.email, verify_url)
     return user
 
 @router.get("/verify")
@@ -76,13 +79,27 @@ def verify_email(token: str, db: Session = Depends(get_db)):
     return {"ok": True}
 
 @router.post("/login", response_model=TokenPair)
-def login(payload: LoginIn, response: Response, db: Session = Depends(get_db)):
-    user = db.scalar(select(User).where(User.email==payload.email.lower()))
-    if not user or not pwd_hasher.verify(user.password_hash, payload.password):
+async def login(payload: LoginIn, response: Response, db: AsyncSession = Depends(get_async_db)):
+    user = await db.scalar(select(User).where(User.email==payload.email.lower()))
+    if not user:
+        AUTH_FAILURES.labels("bad_credentials").inc()
         raise HTTPException(401, "Invalid credentials")
+    ok, new_hash = await pwd_hasher.verify_async(user.password_hash, payload.password)
+    if not ok:
+        AUTH_FAILURES.labels("bad_credentials").inc()
+        raise HTTPException(401, "Invalid credentials")
+    if new_hash:
+        # argon2 参数调整后，登录时顺带升级旧哈希
+        user.password_hash = new_hash
+        await db.commit()
     if not user.email_verified_at:
+        AUTH_FAILURES.labels("email_unverified").inc()
         raise HTTPException(403, "Email not verified")
-    access, refresh = create_tokens(user)   # jose + HS256，带 role / sub
+    if not user.is_active:
+        AUTH_FAILURES.labels("inactive").inc()
+        raise HTTPException(403, "Account disabled")
+    access, refresh = await sessions.issue(db, user)   # HS256，带 role / sub / sid
+    await db.commit()
 
     cookie_kwargs = _cookie_params()
     access_max_age = max(1, settings.ACCESS_TOKEN_TTL_MIN * 60)
@@ -94,26 +111,30 @@ def login(payload: LoginIn, response: Response, db: Session = Depends(get_db)):
 
     return {"access_token": access, "refresh_token": refresh}
 
+def _refresh_value(request: Request, payload: dict | None) -> str | None:
+    return (payload or {}).get("refresh_token") or request.cookies.get("refresh_token")
+
 @router.post("/refresh", response_model=TokenPair)
-def refresh_token(
+async def refresh_token(
     request: Request,
     response: Response,
     payload: dict | None = Body(None),
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
 ):
-    refresh_token_value = (payload or {}).get("refresh_token") if payload else None
-    if not refresh_token_value:
-        refresh_token_value = request.cookies.get("refresh_token")
-
+    refresh_token_value = _refresh_value(request, payload)
     if not refresh_token_value:
         raise HTTPException(400, "Refresh token required")
 
-    token_data = verify_token(refresh_token_value, settings.JWT_REFRESH_SECRET)
-    user = db.get(User, token_data.sub)
-    if not user:
-        raise HTTPException(401, "User not found")
+    try:
+        token_data = verify_token(refresh_token_value, settings.JWT_REFRESH_SECRET)
+    except HTTPException:
+        AUTH_FAILURES.labels("invalid_refresh").inc()
+        raise
+    if revocations.is_revoked(token_data):
+        AUTH_FAILURES.labels("revoked").inc()
+        raise HTTPException(401, "Refresh token revoked")
 
-    access, refresh = create_tokens(user)
+    access, refresh = await sessions.rotate(db, token_data)
 
     cookie_kwargs = _cookie_params()
     access_max_age = max(1, settings.ACCESS_TOKEN_TTL_MIN * 60)
@@ -121,6 +142,30 @@ def refresh_token(
 
     response.set_cookie("access_token", access, max_age=access_max_age, **cookie_kwargs)
     response.set_cookie("refresh_token", refresh, max_age=refresh_max_age, **cookie_kwargs)
-    logger.info("Rotated refresh token for user_id=%s", user.id)
+    logger.info("Rotated refresh token for user_id=%s", token_data.sub)
 
     return {"access_token": access, "refresh_token": refresh}
+
+@router.post("/logout")
+async def logout(
+    request: Request,
+    response: Response,
+    payload: dict | None = Body(None),
+    db: AsyncSession = Depends(get_async_db),
+):
+    """吊销当前会话并清除 cookie；令牌缺失或无效时同样返回成功"""
+    refresh_token_value = _refresh_value(request, payload)
+    if refresh_token_value:
+        try:
+            token_data = verify_token(refresh_token_value, settings.JWT_REFRESH_SECRET)
+        except HTTPException:
+            token_data = None
+        if token_data and token_data.sid:
+            await sessions.revoke_family_async(db, token_data.sid)
+            await db.commit()
+            logger.info("Logged out session for user_id=%s", token_data.sub)
+
+    cookie_kwargs = _cookie_params()
+    response.delete_cookie("access_token", **cookie_kwargs)
+    response.delete_cookie("refresh_token", **cookie_kwargs)
+    return {"ok": True}
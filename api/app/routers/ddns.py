@@ -0,0 +1,70 @@
+import base64
+from typing import Optional
+
+from fastapi import APIRouter, Request
+from fastapi.responses import PlainTextResponse
+
+from ..db import AsyncSessionLocal
+from ..metrics import DDNS_UPDATES
+from ..ratelimit import client_ip
+from .. import ddns
+
+router = APIRouter()
+
+def _secret(request: Request, token: Optional[str]) -> str | None:
+    """令牌可放在 token 参数、Bearer 或 Basic 认证的密码中（用户名任意）"""
+    if token:
+        return token
+    scheme, _, credentials = request.headers.get("authorization", "").partition(" ")
+    scheme = scheme.lower()
+    if scheme == "bearer":
+        return credentials.strip() or None
+    if scheme == "basic":
+        try:
+            decoded = base64.b64decode(credentials).decode()
+        except ValueError:
+            return None
+        return decoded.partition(":")[2] or None
+    return None
+
+def _reply(result: str, ip: str = "") -> PlainTextResponse:
+    """dyndns2 客户端只读响应正文中的结果码，非 2xx 会被当作网络故障反复重试，因此一律返回 200"""
+    DDNS_UPDATES.labels(result).inc()
+    return PlainTextResponse(f"{result} {ip}".strip())
+
+@router.get("/update", response_class=PlainTextResponse)
+async def ddns_update(request: Request, hostname: Optional[str] = None, myip: Optional[str] = None,
+                      token: Optional[str] = None):
+    """dyndns2 兼容的 IP 上报，返回 good/nochg/badauth/nohost/badip；IP 未变化时只读内存缓存"""
+    secret = _secret(request, token)
+    if not secret:
+        # 未携带凭据时发出 Basic 质询，部分路由器固件收到质询后才发送用户名密码
+        DDNS_UPDATES.labels("badauth").inc()
+        return PlainTextResponse("badauth", status_code=401,
+                                 headers={"WWW-Authenticate": 'Basic realm="ddns"'})
+    token_hash = ddns.hash_token(secret)
+    target = ddns.target_cache.get(token_hash)
+    if target is None:
+        async with AsyncSessionLocal() as db:
+            target = await ddns.lookup(db, token_hash)
+        if target is None:
+            return _reply("badauth")
+
+    if hostname and hostname.lower().rstrip(".") != target.hostname:
+        return _reply("nohost")
+    if not target.active:
+        return _reply("nohost")
+    ip = ddns.parse_ip(myip or client_ip(request.scope, dict(request.scope["headers"])), target.type)
+    if ip is None:
+        return _reply("badip")
+    if ip == target.value:
+        return _reply("nochg", ip=ip)
+
+    async with AsyncSessionLocal() as db:
+        target = await ddns.apply(db, token_hash, ip)
+    if target is None:
+        return _reply("badauth")
+    # 缓存命中之后分发可能已被禁用，apply 未入队任何变更
+    if not target.active:
+        return _reply("nohost")
+    return _reply("good", ip=ip)
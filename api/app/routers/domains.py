@@ -1,59 +1,248 @@
-from fastapi import APIRouter, Depends, HTTPException
-from sqlalchemy import select
+import datetime as dt
+
+from fastapi import APIRouter, Depends, HTTPException, Query
+from sqlalchemy import select, tuple_
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
-from typing import List
+from typing import List, Optional
 
-from ..models import Allocation, Domain, AllocationStatus
-from ..schemas import AllocationIn, AllocationOut
+from ..models import Allocation, AllocationStatus, Domain
+from ..schemas import (AllocationIn, AllocationOut, AllocationBatchIn, AllocationBatchItem, AllocationBatchOut,
+                       AllocationUpdate, AllocationBulkUpdateIn, AvailabilityOut, AvailabilityBatchIn,
+                       AvailabilityBatchOut, BulkItemResult, BulkResult, DDNSTokenOut, SUBDOMAIN_PATTERN)
 from ..auth import require_user
-from ..deps import get_db
+from ..deps import get_db, get_async_db, get_read_db
 from ..config import get_settings
+from ..zones import domain_cache
+from ..availability import availability_index, broadcast_async
+from .. import ddns, provisioning, quota
 
 router = APIRouter()
 settings = get_settings()
 
-def _get_root_domain_id(db: Session) -> int:
-    """获取根域名ID，如果不存在则创建"""
-    domain = db.scalar(select(Domain).where(Domain.name == settings.DNS_ROOT_DOMAIN))
-    if not domain:
-        domain = Domain(name=settings.DNS_ROOT_DOMAIN, provider="DNSPod")
-        db.add(domain)
-        db.commit()
-        db.refresh(domain)
-    return domain.id
-
 @router.post("/", response_model=AllocationOut)
-def request_allocation(body: AllocationIn, user=Depends(require_user), db: Session = Depends(get_db)):
+async def request_allocation(body: AllocationIn, user=Depends(require_user), db: AsyncSession = Depends(get_async_db)):
     """用户提交域名分发申请"""
-    # 检查子域名是否已被占用
-    existing = db.scalar(
-        select(Allocation).where(
-            Allocation.domain_id == _get_root_domain_id(db),
-            Allocation.subdomain == body.subdomain.lower(),
-            Allocation.type == body.type,
-            Allocation.status != AllocationStatus.disabled
-        )
-    )
-    if existing:
+    domain_id = (await domain_cache.resolve(db, body.domain)).id
+    key = (domain_id, body.subdomain.lower(), body.type)
+    # 内存索引快速拒绝已占用的名称；最终以 uq_record 约束为准
+    if availability_index.is_taken(key):
         raise HTTPException(400, "Subdomain already allocated")
+    # 条件 UPDATE 同时完成配额检查与计数，事务回滚时一并撤销
+    if not await quota.reserve(db, user.sub):
+        raise HTTPException(403, "Allocation quota exceeded")
     
     alloc = Allocation(
         user_id=user.sub, 
-        domain_id=_get_root_domain_id(db),
+        domain_id=domain_id,
         subdomain=body.subdomain.lower(), 
         type=body.type, 
         value=body.value,
         ttl=body.ttl
     )
     db.add(alloc)
-    db.commit()
-    db.refresh(alloc)
+    try:
+        await db.flush()
+    except IntegrityError:
+        await db.rollback()
+        availability_index.add([key])
+        raise HTTPException(400, "Subdomain already allocated")
+    await broadcast_async(db, "add", [key])
+    await db.commit()
+    availability_index.add([key])
+    await db.refresh(alloc)
     return alloc
 
+@router.get("/available", response_model=AvailabilityOut)
+async def check_available(subdomain: str = Query(pattern=SUBDOMAIN_PATTERN, max_length=63), type: str = "A",
+                    domain: Optional[str] = None):
+    """查询子域名是否可用：只读内存索引，无需登录、不访问数据库"""
+    zone = domain_cache.lookup(domain)
+    name = subdomain.lower()
+    return AvailabilityOut(subdomain=name, type=type, domain=zone.name,
+                           available=not availability_index.is_taken((zone.id, name, type)))
+
+@router.post("/available", response_model=AvailabilityBatchOut)
+async def check_available_batch(body: AvailabilityBatchIn):
+    """批量查询子域名是否可用"""
+    zone = domain_cache.lookup(body.domain)
+    names = [n.lower() for n in body.subdomains]
+    return AvailabilityBatchOut(type=body.type, domain=zone.name, available={
+        n: not availability_index.is_taken((zone.id, n, body.type)) for n in names
+    })
+
+@router.post("/batch", response_model=AllocationBatchOut)
+async def request_allocations_batch(body: AllocationBatchIn, user=Depends(require_user),
+                                    db: AsyncSession = Depends(get_async_db)):
+    """批量提交分发申请：一次查询判断冲突，一条多行 INSERT ... ON CONFLICT 写入"""
+    if len(body.items) > settings.BULK_MAX_ITEMS:
+        raise HTTPException(400, f"Too many items (max {settings.BULK_MAX_ITEMS})")
+
+    results: list[AllocationBatchItem] = []
+    candidates: dict[tuple[int, str, str], AllocationBatchItem] = {}
+    for index, item in enumerate(body.items):
+        result = AllocationBatchItem(index=index, subdomain=item.subdomain.lower(), type=item.type, ok=False)
+        results.append(result)
+        try:
+            domain_id = (await domain_cache.resolve(db, item.domain)).id
+        except HTTPException as e:
+            result.error = e.detail
+            continue
+        key = (domain_id, result.subdomain, item.type)
+        if key in candidates:
+            result.error = "Duplicate item in batch"
+        else:
+            candidates[key] = result
+
+    # 先用内存索引剔除已知占用的名称，剩余的再用一次查询确认
+    for key in [k for k in candidates if availability_index.is_taken(k)]:
+        candidates.pop(key).error = "Subdomain already allocated"
+
+    # uq_record 覆盖所有状态（含已禁用），冲突检查与之保持一致
+    if candidates:
+        taken = set((await db.execute(
+            select(Allocation.domain_id, Allocation.subdomain, Allocation.type).where(
+                tuple_(Allocation.domain_id, Allocation.subdomain, Allocation.type).in_(list(candidates)),
+            )
+        )).all())
+        for key in taken:
+            candidates.pop(key).error = "Subdomain already allocated"
+
+    # 锁定用户行读取剩余配额，超出部分按提交顺序拒绝
+    if candidates:
+        left = await quota.remaining(db, user.sub)
+        if left is not None:
+            for key in list(candidates)[left:]:
+                candidates.pop(key).error = "Allocation quota exceeded"
+
+    if candidates:
+        now = dt.datetime.utcnow()
+        values = [
+            dict(user_id=user.sub, domain_id=domain_id, subdomain=sub, type=rtype,
+                 value=body.items[r.index].value, ttl=body.items[r.index].ttl,
+                 status=AllocationStatus.pending, created_at=now)
+            for (domain_id, sub, rtype), r in candidates.items()
+        ]
+        stmt = (pg_insert(Allocation).values(values)
+                .on_conflict_do_nothing(constraint="uq_record")
+                .returning(Allocation.id, Allocation.domain_id, Allocation.subdomain, Allocation.type))
+        created_keys = []
+        for alloc_id, domain_id, sub, rtype in (await db.execute(stmt)).all():
+            result = candidates.pop((domain_id, sub, rtype))
+            result.ok, result.id = True, alloc_id
+            created_keys.append((domain_id, sub, rtype))
+        await quota.add_async(db, user.sub, len(created_keys))
+        await broadcast_async(db, "add", created_keys)
+        await db.commit()
+        availability_index.add(created_keys)
+        # 查询与插入之间被并发请求抢占的名称
+        for result in candidates.values():
+            result.error = "Subdomain already allocated"
+
+    created = sum(1 for r in results if r.ok)
+    return AllocationBatchOut(created=created, failed=len(results) - created, results=results)
+
 @router.get("/mine", response_model=List[AllocationOut])
-def get_my_allocations(user=Depends(require_user), db: Session = Depends(get_db)):
-    """获取当前用户的分发记录"""
-    allocations = db.scalars(
+async def get_my_allocations(user=Depends(require_user), db: AsyncSession = Depends(get_read_db)):
+    """获取当前用户的分发记录（读只读副本，刚提交过申请时读主库）"""
+    allocations = (await db.scalars(
         select(Allocation).where(Allocation.user_id == user.sub)
-    ).all()
+    )).all()
     return allocations
+
+def _apply_update(alloc: Allocation, body: AllocationUpdate) -> set[str]:
+    """把请求中的值写入分发，返回实际变化的字段；解析中或已禁用的分发不可修改"""
+    if alloc.status == AllocationStatus.provisioning:
+        raise HTTPException(409, "Allocation is being provisioned, retry later")
+    if alloc.status == AllocationStatus.disabled:
+        raise HTTPException(400, "Allocation is disabled")
+    changed = set()
+    for field in ("value", "ttl"):
+        new = getattr(body, field)
+        if new is not None and new != getattr(alloc, field):
+            setattr(alloc, field, new)
+            changed.add(field)
+    return changed
+
+def _owned(query, user):
+    return query if user.role == "admin" else query.where(Allocation.user_id == user.sub)
+
+@router.patch("/{alloc_id}", response_model=AllocationOut)
+def update_allocation(alloc_id: int, body: AllocationUpdate, user=Depends(require_user),
+                      db: Session = Depends(get_db)):
+    """修改解析值或 TTL：已生效的记录由 worker 按记录 ID 原地修改上游，值未变化时不调用上游"""
+    alloc = db.scalar(_owned(select(Allocation).where(Allocation.id == alloc_id), user).with_for_update())
+    if alloc is None:
+        raise HTTPException(404, "Allocation not found")
+    changed = _apply_update(alloc, body)
+    if changed and alloc.status == AllocationStatus.active:
+        provisioning.enqueue_updates(db, [(alloc, changed)])
+        ddns.invalidate(db, [alloc.id])
+    db.commit()
+    return alloc
+
+@router.post("/update", response_model=BulkResult)
+def bulk_update_allocations(body: AllocationBulkUpdateIn, user=Depends(require_user),
+                            db: Session = Depends(get_db)):
+    """批量修改解析值或 TTL（如整批切换到新的负载均衡 IP），上游按批量接口合并执行"""
+    ids = list(dict.fromkeys(body.ids))
+    if len(ids) > settings.BULK_MAX_ITEMS:
+        raise HTTPException(400, f"Too many ids (max {settings.BULK_MAX_ITEMS})")
+
+    # 按 id 顺序加锁，并发批量修改不会互相死锁
+    allocs = {a.id: a for a in db.scalars(
+        _owned(select(Allocation).where(Allocation.id.in_(ids)), user).order_by(Allocation.id).with_for_update()
+    ).all()}
+    items, changed = [], []
+    for alloc_id in ids:
+        alloc = allocs.get(alloc_id)
+        if alloc is None:
+            items.append(BulkItemResult(id=alloc_id, ok=False, error="Allocation not found"))
+            continue
+        try:
+            fields = _apply_update(alloc, body)
+        except HTTPException as e:
+            items.append(BulkItemResult(id=alloc_id, ok=False, error=e.detail))
+            continue
+        if fields and alloc.status == AllocationStatus.active:
+            changed.append((alloc, fields))
+        items.append(BulkItemResult(id=alloc_id, ok=True))
+    provisioning.enqueue_updates(db, changed)
+    ddns.invalidate(db, [a.id for a, _ in changed])
+    db.commit()
+
+    succeeded = sum(1 for r in items if r.ok)
+    return BulkResult(total=len(items), succeeded=succeeded, failed=len(items) - succeeded, results=items)
+
+def _owned_alloc(db: Session, alloc_id: int, user) -> Allocation:
+    alloc = db.scalar(_owned(select(Allocation).where(Allocation.id == alloc_id), user).with_for_update())
+    if alloc is None:
+        raise HTTPException(404, "Allocation not found")
+    return alloc
+
+@router.post("/{alloc_id}/ddns-token", response_model=DDNSTokenOut)
+def create_ddns_token(alloc_id: int, user=Depends(require_user), db: Session = Depends(get_db)):
+    """生成（或重新生成）DDNS 令牌，旧令牌立即失效；明文只返回这一次"""
+    alloc = _owned_alloc(db, alloc_id, user)
+    if alloc.type not in ("A", "AAAA"):
+        raise HTTPException(400, "DDNS is only supported for A/AAAA records")
+    if alloc.status == AllocationStatus.disabled:
+        raise HTTPException(400, "Allocation is disabled")
+    token, alloc.ddns_token_hash = ddns.new_token()
+    ddns.invalidate(db, [alloc.id])
+    hostname = f"{alloc.subdomain}.{db.get(Domain, alloc.domain_id).name}"
+    db.commit()
+    return DDNSTokenOut(token=token, hostname=hostname,
+                        update_url=f"{settings.PUBLIC_API_URL}/ddns/update?hostname={hostname}")
+
+@router.delete("/{alloc_id}/ddns-token")
+def delete_ddns_token(alloc_id: int, user=Depends(require_user), db: Session = Depends(get_db)):
+    """停用 DDNS 令牌"""
+    alloc = _owned_alloc(db, alloc_id, user)
+    if alloc.ddns_token_hash is not None:
+        alloc.ddns_token_hash = None
+        ddns.invalidate(db, [alloc.id])
+    db.commit()
+    return {"ok": True}
@@ -1,17 +1,22 @@
 from fastapi import APIRouter, Depends, HTTPException
-from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 
 from ..models import User
-from ..schemas import UserOut
+from ..schemas import UserMe
 from ..auth import require_user
-from ..deps import get_db
+from ..deps import get_read_db
+from ..quota import effective_quota
 
 router = APIRouter()
 
-@router.get("/me", response_model=UserOut)
-def get_current_user(user_token = Depends(require_user), db: Session = Depends(get_db)):
-    """获取当前用户信息"""
-    user = db.get(User, user_token.sub)
+@router.get("/me", response_model=UserMe)
+async def get_current_user(user_token = Depends(require_user), db: AsyncSession = Depends(get_read_db)):
+    """获取当前用户信息及配额使用情况（计数列直接读取，不统计申请表）"""
+    user = await db.get(User, user_token.sub)
     if not user:
         raise HTTPException(404, "User not found")
-    return user
+    limit = effective_quota(user)
+    me = UserMe.model_validate(user)
+    me.quota_limit = limit
+    me.quota_remaining = None if limit is None else max(limit - user.allocation_count, 0)
+    return me
@@ -1,5 +1,5 @@
 from datetime import datetime
-from typing import Optional
+from typing import List, Optional
 from pydantic import BaseModel, EmailStr, Field
 from .models import Role, AllocationStatus
 
@@ -8,6 +8,9 @@ class TokenData(BaseModel):
     sub: int
     role: str
     exp: int
+    iat: Optional[float] = None
+    sid: Optional[str] = None   # 会话（刷新令牌家族）
+    jti: Optional[str] = None   # 仅刷新令牌
 
 class TokenPair(BaseModel):
     access_token: str
@@ -29,10 +32,16 @@ class UserOut(UserBase):
     is_active: bool
     email_verified_at: Optional[datetime] = None
     created_at: datetime
+    allocation_count: int = 0
+    allocation_quota: Optional[int] = None  # 个人配额，为空时按角色默认
 
     class Config:
         from_attributes = True
 
+class UserMe(UserOut):
+    quota_limit: Optional[int] = None   # 实际生效的配额，None 表示不限
+    quota_remaining: Optional[int] = None
+
 # Domain schemas
 class DomainBase(BaseModel):
     name: str = Field(pattern=r'^[a-zA-Z0-9][a-zA-Z0-9\-\.]*[a-zA-Z0-9]$')
@@ -49,25 +58,102 @@ class DomainOut(DomainBase):
         from_attributes = True
 
 # Allocation schemas
+SUBDOMAIN_PATTERN = r'^[a-zA-Z0-9][a-zA-Z0-9\-]*[a-zA-Z0-9]$'
+
 class AllocationBase(BaseModel):
-    subdomain: str = Field(pattern=r'^[a-zA-Z0-9][a-zA-Z0-9\-]*[a-zA-Z0-9]$', min_length=1, max_length=63)
+    subdomain: str = Field(pattern=SUBDOMAIN_PATTERN, min_length=1, max_length=63)
     type: str = Field(default="A")
     value: str = Field(min_length=1, max_length=255)
     ttl: int = Field(default=600, ge=60, le=86400)
 
 class AllocationIn(AllocationBase):
-    pass
+    domain: Optional[str] = None  # 根域名，默认 DNS_ROOT_DOMAIN
 
 class AllocationOut(AllocationBase):
     id: int
     user_id: int
     domain_id: int
     status: AllocationStatus
+    provider_record_id: Optional[int] = None
     created_at: datetime
 
     class Config:
         from_attributes = True
 
+class AllocationUpdate(BaseModel):
+    """修改解析值或 TTL，未提供的字段保持不变"""
+    value: Optional[str] = Field(default=None, min_length=1, max_length=255)
+    ttl: Optional[int] = Field(default=None, ge=60, le=86400)
+
+class AllocationBulkUpdateIn(AllocationUpdate):
+    ids: List[int] = Field(min_length=1)
+
+class DDNSTokenOut(BaseModel):
+    token: str          # 只在生成时返回一次
+    hostname: str
+    update_url: str
+
+class AllocationBatchIn(BaseModel):
+    items: List[AllocationIn] = Field(min_length=1)
+
+class AllocationBatchItem(BaseModel):
+    index: int                      # 对应请求 items 中的位置
+    subdomain: str
+    type: str
+    ok: bool
+    id: Optional[int] = None
+    error: Optional[str] = None
+
+class AllocationBatchOut(BaseModel):
+    created: int
+    failed: int
+    results: List[AllocationBatchItem]
+
+class AvailabilityOut(BaseModel):
+    subdomain: str
+    type: str
+    domain: str
+    available: bool
+
+class AvailabilityBatchIn(BaseModel):
+    subdomains: List[str] = Field(min_length=1, max_length=100)
+    type: str = "A"
+    domain: Optional[str] = None
+
+class AvailabilityBatchOut(BaseModel):
+    type: str
+    domain: str
+    available: dict[str, bool]
+
+# Pagination schemas
+class AllocationPage(BaseModel):
+    items: List[AllocationOut]
+    next_cursor: Optional[int] = None  # 传给下一次请求的 cursor，为空表示没有更多
+
+class UserPage(BaseModel):
+    items: List[UserOut]
+    next_cursor: Optional[int] = None
+
+# Bulk schemas
+class BulkApproveIn(BaseModel):
+    ids: Optional[List[int]] = None                # 指定ID列表
+    status: Optional[AllocationStatus] = None      # 或按状态筛选（仅支持 pending）
+    limit: int = Field(default=500, ge=1)
+
+class BulkIdsIn(BaseModel):
+    ids: List[int] = Field(min_length=1)
+
+class BulkItemResult(BaseModel):
+    id: int
+    ok: bool
+    error: Optional[str] = None
+
+class BulkResult(BaseModel):
+    total: int
+    succeeded: int
+    failed: int
+    results: List[BulkItemResult]
+
 # Health check
 class HealthCheck(BaseModel):
     status: str = "ok"
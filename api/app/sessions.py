@@ -0,0 +1,81 @@
+"""登录会话：刷新令牌轮换与吊销
+
+每次登录创建一个令牌家族（会话），刷新时旧令牌标记为已使用并签发同家族的新令牌。
+已使用的令牌再次出现说明被盗用，整个家族立即吊销。吊销结果广播到各副本的
+内存吊销列表，访问令牌校验无需查库。
+"""
+import datetime as dt
+import logging
+import time
+from types import SimpleNamespace
+
+from fastapi import HTTPException
+from sqlalchemy import select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+
+from .models import RefreshToken, Role, User
+from .schemas import TokenData
+from .auth import create_tokens, new_token_id
+from .config import get_settings
+from .metrics import AUTH_FAILURES
+from .revocation import broadcast, broadcast_async
+
+settings = get_settings()
+logger = logging.getLogger(__name__)
+
+def _record(user_id: int, family: str) -> RefreshToken:
+    now = dt.datetime.utcnow()
+    return RefreshToken(jti=new_token_id(), family_id=family, user_id=user_id, issued_at=now,
+                        expires_at=now + dt.timedelta(days=settings.REFRESH_TOKEN_TTL_DAYS))
+
+async def issue(db: AsyncSession, user: User) -> tuple[str, str]:
+    """登录时开启新会话，由调用方提交"""
+    record = _record(user.id, new_token_id())
+    db.add(record)
+    return create_tokens(user, record.family_id, record.jti)
+
+async def rotate(db: AsyncSession, data: TokenData) -> tuple[str, str]:
+    """用刷新令牌换取新令牌对，角色取自令牌声明（改权限时会话已被吊销），不读用户表"""
+    if not data.jti:
+        # 未登记的旧格式令牌无法做重用检测，要求重新登录
+        raise HTTPException(401, "Invalid refresh token")
+    record = await db.scalar(select(RefreshToken).where(RefreshToken.jti == data.jti).with_for_update())
+    if record is None or record.revoked_at is not None:
+        await db.rollback()
+        raise HTTPException(401, "Refresh token revoked")
+    if record.used_at is not None:
+        logger.warning("Refresh token reuse detected for user_id=%s, revoking session %s",
+                       record.user_id, record.family_id)
+        AUTH_FAILURES.labels("refresh_reuse").inc()
+        await revoke_family_async(db, record.family_id)
+        await db.commit()
+        raise HTTPException(401, "Refresh token reused")
+
+    record.used_at = dt.datetime.utcnow()
+    child = _record(record.user_id, record.family_id)
+    db.add(child)
+    await db.commit()
+    subject = SimpleNamespace(id=data.sub, role=Role(data.role))
+    return create_tokens(subject, child.family_id, child.jti)
+
+async def revoke_family_async(db: AsyncSession, family: str) -> None:
+    """吊销一个会话（登出或检测到重用），由调用方提交"""
+    await db.execute(
+        update(RefreshToken)
+        .where(RefreshToken.family_id == family, RefreshToken.revoked_at.is_(None))
+        .values(revoked_at=dt.datetime.utcnow())
+    )
+    await broadcast_async(db, "session", family=family, at=time.time())
+
+def revoke_user(db: Session, user: User) -> None:
+    """吊销用户的全部会话，此前签发的访问令牌随之失效，由调用方提交"""
+    at = time.time()
+    now = dt.datetime.utcfromtimestamp(at)
+    db.execute(
+        update(RefreshToken)
+        .where(RefreshToken.user_id == user.id, RefreshToken.revoked_at.is_(None))
+        .values(revoked_at=now)
+    )
+    user.tokens_valid_after = now
+    broadcast(db, "cutoff", user_id=user.id, at=at)
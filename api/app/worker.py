@@ -0,0 +1,64 @@
+"""异步任务 worker：DNS 记录任务与邮件发件箱
+
+用法: python -m app.worker [--once]
+可同时运行多个实例，任务通过 FOR UPDATE SKIP LOCKED 分配，互不重复。
+"""
+import argparse
+import logging
+import signal
+import time
+
+from prometheus_client import start_http_server
+
+from .db import SessionLocal
+from .config import get_settings
+from . import provisioning, outbox
+from .emailer import close_sender
+
+settings = get_settings()
+logger = logging.getLogger("app.worker")
+
+_stopping = False
+
+def _request_stop(signum, frame):
+    global _stopping
+    logger.info("Received signal %s, finishing current batch...", signum)
+    _stopping = True
+
+def run(once: bool = False):
+    while not _stopping:
+        processed = 0
+        try:
+            with SessionLocal() as db:
+                processed += provisioning.process_batch(db)
+        except Exception:
+            logger.exception("Provisioning batch failed")
+        try:
+            with SessionLocal() as db:
+                processed += outbox.process_batch(db)
+        except Exception:
+            logger.exception("Mail batch failed")
+        if once:
+            break
+        if processed == 0:
+            time.sleep(settings.PROVISION_POLL_INTERVAL)
+
+def main():
+    parser = argparse.ArgumentParser(description="DNS provisioning worker")
+    parser.add_argument("--once", action="store_true", help="处理一批任务后退出")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s [%(name)s] %(message)s")
+    signal.signal(signal.SIGTERM, _request_stop)
+    signal.signal(signal.SIGINT, _request_stop)
+    if settings.WORKER_METRICS_PORT:
+        start_http_server(settings.WORKER_METRICS_PORT)
+    logger.info("Provisioning worker started (batch=%s, concurrency=%s)",
+                settings.PROVISION_BATCH_SIZE, settings.DNSPOD_MAX_WORKERS)
+    try:
+        run(once=args.once)
+    finally:
+        close_sender()
+
+if __name__ == "__main__":
+    main()
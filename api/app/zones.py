@@ -0,0 +1,110 @@
+"""根域名缓存：进程内保存 name→Domain 映射，启动时预热，域名变更后通过 NOTIFY 通知各副本重载"""
+import asyncio
+import logging
+from typing import NamedTuple
+
+from fastapi import HTTPException
+from sqlalchemy import select
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+
+from .models import Domain
+from .config import get_settings
+from .notify import listener, publish_async
+from .providers import provider_name_for
+
+settings = get_settings()
+logger = logging.getLogger(__name__)
+
+CHANNEL = "domains"
+
+class CachedDomain(NamedTuple):
+    id: int
+    name: str
+    provider: str
+
+def _ensure_stmt():
+    # 配置只决定新根域名的初始服务商，已有行以 domains 表为准，修改后调用 reload 生效
+    return pg_insert(Domain).values(
+        [{"name": name, "provider": provider_name_for(name)} for name in settings.DNS_ROOT_DOMAINS]
+    ).on_conflict_do_nothing(index_elements=["name"])
+
+class DomainCache:
+    def __init__(self):
+        self._by_name: dict[str, CachedDomain] = {}
+        self._by_id: dict[int, CachedDomain] = {}
+        self._loaded = False
+        self._lock = asyncio.Lock()
+
+    def _fill(self, rows) -> None:
+        by_name = {r.name: CachedDomain(r.id, r.name, r.provider) for r in rows}
+        self._by_name = by_name
+        self._by_id = {d.id: d for d in by_name.values()}
+        self._loaded = True
+        logger.info("Domain cache loaded: %s", ", ".join(sorted(by_name)))
+
+    def warm(self, db: Session) -> None:
+        """同步预热（worker / CLI 使用），确保配置的根域名都已存在"""
+        db.execute(_ensure_stmt())
+        db.commit()
+        self.load(db)
+
+    def load(self, db: Session) -> None:
+        """只从 domains 表重新加载"""
+        self._fill(db.execute(select(Domain.id, Domain.name, Domain.provider)).all())
+
+    async def warm_async(self, db: AsyncSession) -> None:
+        await db.execute(_ensure_stmt())
+        await db.commit()
+        self._fill((await db.execute(select(Domain.id, Domain.name, Domain.provider))).all())
+
+    def invalidate(self) -> None:
+        self._loaded = False
+
+    async def resolve(self, db: AsyncSession, name: str | None = None) -> CachedDomain:
+        """解析请求中的根域名（默认 DNS_ROOT_DOMAIN），未托管的域名返回 400"""
+        name = (name or settings.DNS_ROOT_DOMAIN).lower()
+        if name not in settings.DNS_ROOT_DOMAINS:
+            raise HTTPException(400, f"Unsupported domain: {name}")
+        if not self._loaded or name not in self._by_name:
+            async with self._lock:
+                if not self._loaded or name not in self._by_name:
+                    await self.warm_async(db)
+        return self._by_name[name]
+
+    def lookup(self, name: str | None = None) -> CachedDomain:
+        """仅查缓存、不访问数据库的解析，供无会话的轻量接口使用"""
+        name = (name or settings.DNS_ROOT_DOMAIN).lower()
+        if name not in settings.DNS_ROOT_DOMAINS:
+            raise HTTPException(400, f"Unsupported domain: {name}")
+        domain = self._by_name.get(name)
+        if domain is None:
+            raise HTTPException(503, "Domain cache not ready")
+        return domain
+
+    def find(self, name: str) -> CachedDomain | None:
+        """按名称查缓存，不校验配置"""
+        return self._by_name.get(name.lower())
+
+    def get(self, domain_id: int) -> CachedDomain | None:
+        return self._by_id.get(domain_id)
+
+    def all(self) -> list[CachedDomain]:
+        return list(self._by_name.values())
+
+domain_cache = DomainCache()
+
+async def broadcast_reload(db: AsyncSession) -> None:
+    """通知所有副本重新加载根域名缓存"""
+    await publish_async(db, CHANNEL, "reload")
+    await db.commit()
+
+def _reload(payload: str | None = None) -> None:
+    from .db import SessionLocal
+
+    with SessionLocal() as db:
+        domain_cache.load(db)
+
+listener.subscribe(CHANNEL, _reload)
+listener.on_reconnect(_reload)
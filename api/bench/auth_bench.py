@@ -0,0 +1,57 @@
+"""require_user 微基准：对比令牌缓存开启/关闭时的单次认证开销
+
+用法（在 api 目录下）:
+    python -m bench.auth_bench --iterations 20000 [--log-level INFO]
+"""
+import argparse
+import asyncio
+import logging
+import time
+from types import SimpleNamespace
+
+from fastapi.security import HTTPAuthorizationCredentials
+from starlette.requests import Request
+
+from app import auth
+from app.models import Role
+
+def _request(token: str) -> Request:
+    scope = {
+        "type": "http",
+        "method": "GET",
+        "path": "/users/me",
+        "headers": [(b"cookie", f"access_token={token}; theme=dark".encode())],
+    }
+    return Request(scope)
+
+async def _measure(token: str, iterations: int) -> float:
+    request = _request(token)
+    creds = HTTPAuthorizationCredentials(scheme="Bearer", credentials=token)
+    started = time.perf_counter()
+    for _ in range(iterations):
+        await auth.require_user(request, creds)
+    return (time.perf_counter() - started) / iterations * 1e6
+
+def main():
+    parser = argparse.ArgumentParser(description="Microbenchmark auth.require_user")
+    parser.add_argument("--iterations", type=int, default=20000)
+    parser.add_argument("--log-level", default="WARNING", help="设为 INFO/DEBUG 可观察日志本身的开销")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=args.log_level, filename="/dev/null")
+    user = SimpleNamespace(id=1, role=Role.user)
+    token, _ = auth.create_tokens(user)
+
+    original = auth.token_cache
+    auth.token_cache = auth.TokenCache(maxsize=0, ttl=0)
+    uncached = asyncio.run(_measure(token, args.iterations))
+    auth.token_cache = original
+    auth.token_cache.clear()
+    cached = asyncio.run(_measure(token, args.iterations))
+
+    print(f"{'uncached':>10}: {uncached:8.2f} µs/call")
+    print(f"{'cached':>10}: {cached:8.2f} µs/call")
+    print(f"{'speedup':>10}: {uncached / cached:8.1f}x")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,214 @@
+"""本地 DNSPod 桩服务：模拟 CreateRecord / ModifyRecord / DeleteRecord / DescribeRecordList，
+以及批量接口 CreateRecordBatch / DeleteRecordBatch / ModifyRecordBatch / DescribeBatchTask（任务同步完成）
+
+不校验签名，记录保存在内存中。API 或 worker 设置
+DNSPOD_ENDPOINT=http://127.0.0.1:9010 即可接入。
+
+用法（在 api 目录下）:
+    python -m bench.fake_dnspod --port 9010 --latency-ms 30 --jitter-ms 20 --error-rate 0.01
+"""
+import argparse
+import itertools
+import json
+import random
+import threading
+import time
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+class FakeZoneStore:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._ids = itertools.count(100000)
+        self._job_ids = itertools.count(1)
+        self.records: dict[str, dict[int, dict]] = {}
+        self.domain_ids: dict[str, int] = {}
+        self.jobs: dict[int, dict] = {}
+
+    def create(self, req: dict) -> dict:
+        with self._lock:
+            zone = self.records.setdefault(req["Domain"], {})
+            for rec in zone.values():
+                if (rec["Name"], rec["Type"], rec["Value"]) == (req["SubDomain"], req["RecordType"], req["Value"]):
+                    raise FakeError("InvalidParameter.DomainRecordExist", "记录已经存在")
+            record_id = next(self._ids)
+            zone[record_id] = {
+                "RecordId": record_id, "Name": req["SubDomain"], "Type": req["RecordType"],
+                "Value": req["Value"], "TTL": req.get("TTL", 600), "Line": req.get("RecordLine", "默认"),
+                "Status": "ENABLE",
+            }
+            return {"RecordId": record_id}
+
+    def modify(self, req: dict) -> dict:
+        with self._lock:
+            rec = self.records.get(req["Domain"], {}).get(req["RecordId"])
+            if rec is None:
+                raise FakeError("ResourceNotFound.NoDataOfRecord", "记录不存在")
+            rec.update(Name=req["SubDomain"], Type=req["RecordType"], Value=req["Value"], TTL=req.get("TTL", rec["TTL"]))
+            return {"RecordId": rec["RecordId"]}
+
+    def delete(self, req: dict) -> dict:
+        with self._lock:
+            if self.records.get(req["Domain"], {}).pop(req["RecordId"], None) is None:
+                raise FakeError("ResourceNotFound.NoDataOfRecord", "记录不存在")
+            return {}
+
+    def describe(self, req: dict) -> dict:
+        offset, limit = int(req.get("Offset", 0)), int(req.get("Limit", 100))
+        with self._lock:
+            records = sorted(self.records.get(req["Domain"], {}).values(), key=lambda r: r["RecordId"])
+        if req.get("Subdomain"):
+            records = [r for r in records if r["Name"].lower() == req["Subdomain"].lower()]
+        if req.get("RecordType"):
+            records = [r for r in records if r["Type"] == req["RecordType"]]
+        page = records[offset:offset + limit]
+        if not page and req.get("ErrorOnEmpty", "yes") != "no":
+            raise FakeError("ResourceNotFound.NoDataOfRecord", "记录列表为空")
+        return {
+            "RecordCountInfo": {"SubdomainCount": len(records), "ListCount": len(page), "TotalCount": len(records)},
+            "RecordList": page,
+        }
+
+    def describe_domain(self, req: dict) -> dict:
+        with self._lock:
+            domain_id = self.domain_ids.setdefault(req["Domain"], len(self.domain_ids) + 1)
+        return {"DomainInfo": {"DomainId": domain_id, "Domain": req["Domain"]}}
+
+    def _job(self, operation: str, details: list[dict]) -> dict:
+        with self._lock:
+            job_id = next(self._job_ids)
+            self.jobs[job_id] = {"JobType": operation, "DetailList": details}
+        return {"JobId": job_id, "DetailList": details}
+
+    @staticmethod
+    def _outcome(fn, req: dict, record: dict) -> dict:
+        try:
+            result = fn(req)
+            return {**record, "RecordId": result.get("RecordId", record.get("RecordId")), "Status": "success"}
+        except FakeError as e:
+            return {**record, "Status": "failed", "ErrMsg": str(e)}
+
+    def create_batch(self, req: dict) -> dict:
+        names = {v: k for k, v in self.domain_ids.items()}
+        details = []
+        for domain_id in req["DomainIdList"]:
+            domain = names[int(domain_id)]
+            records = [
+                self._outcome(self.create, {**r, "Domain": domain},
+                              {"SubDomain": r["SubDomain"], "RecordType": r["RecordType"], "Value": r["Value"],
+                               "TTL": r.get("TTL", 600)})
+                for r in req["RecordList"]
+            ]
+            details.append({"Id": len(details) + 1, "Domain": domain, "DomainId": int(domain_id),
+                            "Status": "success", "Operation": "add", "RecordList": records})
+        return self._job("add", details)
+
+    def delete_batch(self, req: dict) -> dict:
+        with self._lock:
+            zones = {rid: domain for domain, zone in self.records.items() for rid in zone}
+        records = [
+            self._outcome(self.delete, {"Domain": zones.get(rid, ""), "RecordId": rid}, {"RecordId": rid})
+            for rid in req["RecordIdList"]
+        ]
+        return self._job("delete", [{"Id": 1, "Status": "success", "Operation": "delete", "RecordList": records}])
+
+    def modify_batch(self, req: dict) -> dict:
+        field = {"value": "Value", "ttl": "TTL"}.get(req["Change"])
+        if field is None:
+            raise FakeError("InvalidParameter", f"不支持修改 {req['Change']}")
+        change_to = int(req["ChangeTo"]) if field == "TTL" else req["ChangeTo"]
+
+        def modify(r):
+            with self._lock:
+                rec = next((z[r["RecordId"]] for z in self.records.values() if r["RecordId"] in z), None)
+                if rec is None:
+                    raise FakeError("ResourceNotFound.NoDataOfRecord", "记录不存在")
+                rec[field] = change_to
+                return {"RecordId": rec["RecordId"]}
+
+        records = [self._outcome(modify, {"RecordId": rid}, {"RecordId": rid}) for rid in req["RecordIdList"]]
+        return self._job("modify", [{"Id": 1, "Status": "success", "Operation": "modify", "RecordList": records}])
+
+    def describe_batch_task(self, req: dict) -> dict:
+        with self._lock:
+            job = self.jobs.get(req["JobId"])
+        if job is None:
+            raise FakeError("InvalidParameter.JobNotFound", "任务不存在")
+        return job
+
+class FakeError(Exception):
+    def __init__(self, code: str, message: str):
+        super().__init__(message)
+        self.code = code
+
+def make_handler(store: FakeZoneStore, latency_ms: float, jitter_ms: float, error_rate: float):
+    actions = {
+        "CreateRecord": store.create,
+        "ModifyRecord": store.modify,
+        "DeleteRecord": store.delete,
+        "DescribeRecordList": store.describe,
+        "DescribeDomain": store.describe_domain,
+        "CreateRecordBatch": store.create_batch,
+        "DeleteRecordBatch": store.delete_batch,
+        "ModifyRecordBatch": store.modify_batch,
+        "DescribeBatchTask": store.describe_batch_task,
+    }
+
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"  # 支持 keep-alive，与 SDK 的长连接行为一致
+
+        def do_POST(self):
+            body = self.rfile.read(int(self.headers.get("Content-Length") or 0))
+            action = self.headers.get("X-TC-Action", "")
+            delay = latency_ms + random.uniform(-jitter_ms, jitter_ms)
+            if delay > 0:
+                time.sleep(delay / 1000)
+
+            request_id = str(uuid.uuid4())
+            try:
+                if random.random() < error_rate:
+                    raise FakeError("RequestLimitExceeded", "请求频率超过限制")
+                if action not in actions:
+                    raise FakeError("InvalidAction", f"未知接口 {action}")
+                result = actions[action](json.loads(body or b"{}"))
+                payload = {"Response": {**result, "RequestId": request_id}}
+            except FakeError as e:
+                payload = {"Response": {"Error": {"Code": e.code, "Message": str(e)}, "RequestId": request_id}}
+
+            data = json.dumps(payload, ensure_ascii=False).encode()
+            self.send_response(200)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(data)))
+            self.end_headers()
+            self.wfile.write(data)
+
+        def log_message(self, format, *args):
+            pass
+
+    return Handler
+
+def serve(host: str, port: int, latency_ms: float = 0, jitter_ms: float = 0, error_rate: float = 0) -> ThreadingHTTPServer:
+    """在后台线程启动桩服务，返回 server（调用 shutdown() 停止）"""
+    server = ThreadingHTTPServer((host, port), make_handler(FakeZoneStore(), latency_ms, jitter_ms, error_rate))
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, name="fake-dnspod", daemon=True).start()
+    return server
+
+def main():
+    parser = argparse.ArgumentParser(description="Local DNSPod stand-in for benchmarks")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=9010)
+    parser.add_argument("--latency-ms", type=float, default=30, help="每次调用的平均延迟")
+    parser.add_argument("--jitter-ms", type=float, default=10, help="延迟的随机抖动范围")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="返回 RequestLimitExceeded 的比例")
+    args = parser.parse_args()
+
+    server = serve(args.host, args.port, args.latency_ms, args.jitter_ms, args.error_rate)
+    print(f"Fake DNSPod listening on http://{args.host}:{args.port}")
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        server.shutdown()
+
+if __name__ == "__main__":
+    main()
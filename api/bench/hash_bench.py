@@ -0,0 +1,89 @@
+"""argon2 参数基准：测量单次哈希耗时及并发下经有界执行器的延迟分布
+
+用法（在 api 目录下）:
+    python -m bench.hash_bench --time-cost 3 --memory-cost 65536 --parallelism 4 \\
+        --workers 4 --concurrency 16 --requests 200
+"""
+import argparse
+import asyncio
+import statistics
+import time
+
+from fastapi import HTTPException
+
+from app.config import get_settings
+from app.hashing import PasswordHasher
+
+settings = get_settings()
+
+def percentile(samples: list[float], pct: float) -> float:
+    if not samples:
+        return 0.0
+    ordered = sorted(samples)
+    k = max(0, min(len(ordered) - 1, round(pct / 100 * len(ordered)) - 1))
+    return ordered[k]
+
+async def run(args) -> dict:
+    hasher = PasswordHasher(
+        params=(args.time_cost, args.memory_cost, args.parallelism),
+        executor=args.executor,
+        workers=args.workers,
+        max_queue=args.max_queue,
+    )
+    # 单次耗时（无竞争）
+    single = []
+    for _ in range(5):
+        t = time.perf_counter()
+        hasher.hash("correct horse battery staple")
+        single.append((time.perf_counter() - t) * 1000)
+
+    hashed = hasher.hash("correct horse battery staple")
+    latencies: list[float] = []
+    rejected = 0
+    sem = asyncio.Semaphore(args.concurrency)
+
+    async def one():
+        nonlocal rejected
+        async with sem:
+            t = time.perf_counter()
+            try:
+                await hasher.verify_async(hashed, "correct horse battery staple")
+            except HTTPException:
+                rejected += 1
+                return
+            latencies.append((time.perf_counter() - t) * 1000)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(one() for _ in range(args.requests)))
+    elapsed = time.perf_counter() - started
+    hasher.shutdown()
+
+    return {
+        "params": {"time_cost": args.time_cost, "memory_cost": args.memory_cost, "parallelism": args.parallelism},
+        "executor": f"{args.executor}x{args.workers}",
+        "single_ms": round(statistics.median(single), 1),
+        "throughput_rps": round(len(latencies) / elapsed, 1) if elapsed else 0.0,
+        "p50_ms": round(percentile(latencies, 50), 1),
+        "p95_ms": round(percentile(latencies, 95), 1),
+        "p99_ms": round(percentile(latencies, 99), 1),
+        "rejected": rejected,
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark argon2 parameters through the hashing executor")
+    parser.add_argument("--time-cost", type=int, default=settings.ARGON2_TIME_COST)
+    parser.add_argument("--memory-cost", type=int, default=settings.ARGON2_MEMORY_COST)
+    parser.add_argument("--parallelism", type=int, default=settings.ARGON2_PARALLELISM)
+    parser.add_argument("--executor", choices=["thread", "process"], default=settings.HASH_EXECUTOR)
+    parser.add_argument("--workers", type=int, default=settings.HASH_WORKERS)
+    parser.add_argument("--max-queue", type=int, default=settings.HASH_MAX_QUEUE)
+    parser.add_argument("--concurrency", type=int, default=16, help="同时发起的校验请求数")
+    parser.add_argument("--requests", type=int, default=200)
+    args = parser.parse_args()
+
+    result = asyncio.run(run(args))
+    for key, value in result.items():
+        print(f"{key:>15}: {value}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,194 @@
+"""HTTP 压测场景：登录风暴、申请突发、管理后台分页、批量审批
+
+针对已启动的 API（数据由 bench.seed 写入，建议关闭限流 RATE_LIMIT_ENABLED=false），
+输出每个场景的吞吐与 p50/p95/p99。可保存结果作为基线，之后与基线对比，
+回归超过容差时以非零状态码退出。
+
+用法（在 api 目录下）:
+    python -m bench.load --base-url http://127.0.0.1:8000 --concurrency 32 --save bench/baseline.json
+    python -m bench.load --compare bench/baseline.json --tolerance 0.25
+"""
+import argparse
+import asyncio
+import json
+import math
+import random
+import sys
+import time
+import uuid
+from dataclasses import dataclass, field
+
+import httpx
+
+from .seed import ADMIN_EMAIL, BENCH_PASSWORD, user_email
+
+SCENARIOS = ("login_storm", "allocation_burst", "admin_listing", "bulk_approve")
+
+def percentile(sorted_values: list[float], p: float) -> float:
+    if not sorted_values:
+        return 0.0
+    return sorted_values[max(0, math.ceil(p / 100 * len(sorted_values)) - 1)]
+
+@dataclass
+class Result:
+    name: str
+    latencies: list[float] = field(default_factory=list)
+    errors: int = 0
+    elapsed: float = 0.0
+    count: int | None = None  # 一次调用处理多项时（如批量任务）按项计吞吐
+
+    def summary(self) -> dict:
+        values = sorted(self.latencies)
+        count = len(values) if self.count is None else self.count
+        return {
+            "requests": count,
+            "errors": self.errors,
+            "rps": round(count / self.elapsed, 1) if self.elapsed else 0.0,
+            "p50_ms": round(percentile(values, 50) * 1000, 2),
+            "p95_ms": round(percentile(values, 95) * 1000, 2),
+            "p99_ms": round(percentile(values, 99) * 1000, 2),
+        }
+
+async def run_closed_loop(name: str, total: int, concurrency: int, call) -> Result:
+    """固定并发的闭环压测：每个 worker 完成一个请求后立刻发起下一个"""
+    result = Result(name)
+    counter = iter(range(total))
+
+    async def worker():
+        for i in counter:
+            start = time.perf_counter()
+            try:
+                ok = await call(i)
+            except httpx.HTTPError:
+                ok = False
+            result.latencies.append(time.perf_counter() - start)
+            if not ok:
+                result.errors += 1
+
+    start = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    result.elapsed = time.perf_counter() - start
+    return result
+
+async def login(client: httpx.AsyncClient, email: str) -> str:
+    r = await client.post("/auth/login", json={"email": email, "password": BENCH_PASSWORD})
+    r.raise_for_status()
+    return r.json()["access_token"]
+
+async def login_storm(client, args) -> Result:
+    async def call(i):
+        email = user_email(random.randrange(args.users))
+        r = await client.post("/auth/login", json={"email": email, "password": BENCH_PASSWORD})
+        return r.status_code == 200
+    return await run_closed_loop("login_storm", args.requests, args.concurrency, call)
+
+async def allocation_burst(client, args) -> Result:
+    tokens = [await login(client, user_email(i)) for i in range(min(args.users, args.concurrency))]
+    run_id = uuid.uuid4().hex[:6]
+
+    async def call(i):
+        r = await client.post(
+            "/allocations/",
+            json={"subdomain": f"b{run_id}{i}", "type": "A", "value": "192.0.2.1"},
+            headers={"Authorization": f"Bearer {tokens[i % len(tokens)]}"},
+        )
+        return r.status_code == 200
+    return await run_closed_loop("allocation_burst", args.requests, args.concurrency, call)
+
+async def admin_listing(client, args) -> Result:
+    headers = {"Authorization": f"Bearer {await login(client, ADMIN_EMAIL)}"}
+    filters = ({}, {"status": "pending"}, {"status": "active"}, {"subdomain_prefix": "seed1"})
+
+    async def call(i):
+        params = {"limit": 100, "cursor": random.randrange(args.allocations or 1), **filters[i % len(filters)]}
+        r = await client.get("/admin/allocations", params=params, headers=headers)
+        return r.status_code == 200
+    return await run_closed_loop("admin_listing", args.requests, args.concurrency, call)
+
+async def bulk_approve(client, args) -> Result:
+    """每个请求审批 --approve-size 个不同的待审批申请"""
+    headers = {"Authorization": f"Bearer {await login(client, ADMIN_EMAIL)}"}
+    pending, cursor = [], None
+    while True:
+        params = {"status": "pending", "limit": 500}
+        if cursor:
+            params["cursor"] = cursor
+        page = (await client.get("/admin/allocations", params=params, headers=headers)).json()
+        pending.extend(item["id"] for item in page["items"])
+        cursor = page["next_cursor"]
+        if not cursor:
+            break
+    batches = [pending[i:i + args.approve_size] for i in range(0, len(pending), args.approve_size)]
+
+    async def call(i):
+        r = await client.post("/admin/allocations/approve", json={"ids": batches[i]}, headers=headers)
+        return r.status_code == 200
+    return await run_closed_loop("bulk_approve", min(len(batches), args.requests), min(args.concurrency, 4), call)
+
+async def run(args) -> dict:
+    limits = httpx.Limits(max_connections=args.concurrency, max_keepalive_connections=args.concurrency)
+    report = {}
+    async with httpx.AsyncClient(base_url=args.base_url, limits=limits, timeout=60) as client:
+        for name in args.scenario or SCENARIOS:
+            result = await globals()[name](client, args)
+            report[name] = result.summary()
+    return report
+
+def print_report(report: dict, baseline: dict | None = None):
+    print(f"{'scenario':<18}{'requests':>9}{'errors':>8}{'rps':>9}{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}")
+    for name, s in report.items():
+        line = (f"{name:<18}{s['requests']:>9}{s['errors']:>8}{s['rps']:>9}"
+                f"{s['p50_ms']:>9}{s['p95_ms']:>9}{s['p99_ms']:>9}")
+        if baseline and name in baseline:
+            line += f"   (baseline rps {baseline[name]['rps']}, p95 {baseline[name]['p95_ms']})"
+        print(line)
+
+def regressions(report: dict, baseline: dict, tolerance: float) -> list[str]:
+    """吞吐下降或 p95 上升超过容差的场景"""
+    found = []
+    for name, s in report.items():
+        base = baseline.get(name)
+        if not base:
+            continue
+        if base["rps"] and s["rps"] < base["rps"] * (1 - tolerance):
+            found.append(f"{name}: rps {s['rps']} < baseline {base['rps']}")
+        if base["p95_ms"] and s["p95_ms"] > base["p95_ms"] * (1 + tolerance):
+            found.append(f"{name}: p95 {s['p95_ms']}ms > baseline {base['p95_ms']}ms")
+    return found
+
+def add_arguments(parser: argparse.ArgumentParser):
+    parser.add_argument("--base-url", default="http://127.0.0.1:8000")
+    parser.add_argument("--scenario", action="append", choices=SCENARIOS, help="只运行指定场景，可重复")
+    parser.add_argument("--requests", type=int, default=2000, help="每个场景的请求数")
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--users", type=int, default=2000, help="与 bench.seed 的 --users 一致")
+    parser.add_argument("--allocations", type=int, default=50000, help="与 bench.seed 的 --allocations 一致")
+    parser.add_argument("--approve-size", type=int, default=100, help="bulk_approve 每个请求的 id 数")
+    parser.add_argument("--save", help="把结果写入 JSON 文件作为基线")
+    parser.add_argument("--compare", help="与基线 JSON 对比")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="允许的回归比例")
+
+def report_and_check(report: dict, args) -> int:
+    baseline = None
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+    print_report(report, baseline)
+    if args.save:
+        with open(args.save, "w") as f:
+            json.dump(report, f, indent=2)
+    if baseline:
+        found = regressions(report, baseline, args.tolerance)
+        for line in found:
+            print(f"REGRESSION {line}", file=sys.stderr)
+        return 1 if found else 0
+    return 0
+
+def main():
+    parser = argparse.ArgumentParser(description="HTTP load scenarios for the API")
+    add_arguments(parser)
+    args = parser.parse_args()
+    sys.exit(report_and_check(asyncio.run(run(args)), args))
+
+if __name__ == "__main__":
+    main()
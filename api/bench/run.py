@@ -0,0 +1,94 @@
+"""一键压测：启动 DNSPod 桩、播种数据、启动 API，依次运行全部场景并统计 worker 吞吐
+
+DATABASE_URL 必须指向可清空的本地 Postgres（会执行 bench.seed --reset）。
+
+用法（在 api 目录下，或在仓库根目录执行 make bench）:
+    DATABASE_URL=postgresql://... python -m bench.run [--compare bench/baseline.json] [bench.load 的其他参数]
+"""
+import os
+
+# 在导入 app 之前设置，API 子进程与本进程内的 worker 都连接桩服务
+FAKE_DNSPOD_PORT = int(os.getenv("BENCH_DNSPOD_PORT", "9010"))
+os.environ.setdefault("DNSPOD_ENDPOINT", f"http://127.0.0.1:{FAKE_DNSPOD_PORT}")
+os.environ.setdefault("DNSPOD_SECRET_ID", "bench")
+os.environ.setdefault("DNSPOD_SECRET_KEY", "bench")
+os.environ.setdefault("DNS_ROOT_DOMAIN", "bench.test")
+os.environ["RATE_LIMIT_ENABLED"] = "false"
+os.environ.setdefault("ALLOCATION_QUOTA_USER", "0")  # 播种用户的申请数远超默认配额
+
+import argparse
+import asyncio
+import subprocess
+import sys
+import time
+
+import httpx
+
+from . import load
+from .fake_dnspod import serve
+from .seed import seed
+
+def _wait_ready(base_url: str, proc: subprocess.Popen, timeout: float = 60):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if proc.poll() is not None:
+            raise SystemExit(f"API exited with code {proc.returncode}")
+        try:
+            if httpx.get(f"{base_url}/healthz", timeout=1).status_code == 200:
+                return
+        except httpx.HTTPError:
+            pass
+        time.sleep(0.3)
+    raise SystemExit("API did not become ready in time")
+
+def provision(args) -> load.Result:
+    """在本进程内按 worker 的方式消费 bulk_approve 产生的任务，统计每秒完成的任务数"""
+    from app import provisioning
+    from app.db import SessionLocal
+
+    result = load.Result("provision", count=0)
+    start = time.perf_counter()
+    while True:
+        batch_start = time.perf_counter()
+        with SessionLocal() as db:
+            processed = provisioning.process_batch(db)
+        if processed == 0:
+            break
+        result.latencies.append(time.perf_counter() - batch_start)
+        result.count += processed
+    result.elapsed = time.perf_counter() - start
+    return result
+
+def main():
+    parser = argparse.ArgumentParser(description="Seed, start the API against a fake DNSPod and run all scenarios")
+    load.add_arguments(parser)
+    parser.add_argument("--port", type=int, default=8077, help="API 监听端口")
+    parser.add_argument("--dnspod-latency-ms", type=float, default=30)
+    parser.add_argument("--dnspod-error-rate", type=float, default=0.01)
+    parser.add_argument("--skip-seed", action="store_true")
+    args = parser.parse_args()
+    args.base_url = f"http://127.0.0.1:{args.port}"
+
+    fake = serve("127.0.0.1", FAKE_DNSPOD_PORT, args.dnspod_latency_ms, args.dnspod_latency_ms / 3,
+                 args.dnspod_error_rate)
+    if not args.skip_seed:
+        print("seed:", seed(args.users, args.allocations, reset=True))
+
+    api = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "app.main:app", "--port", str(args.port), "--log-level", "warning"],
+        env=os.environ.copy(),
+    )
+    try:
+        _wait_ready(args.base_url, api)
+        report = asyncio.run(load.run(args))
+    finally:
+        api.terminate()
+        api.wait(timeout=30)
+
+    if not args.scenario or "bulk_approve" in args.scenario:
+        report["provision"] = provision(args).summary()
+    fake.shutdown()
+    sys.exit(load.report_and_check(report, args))
+
+if __name__ == "__main__":
+    main()
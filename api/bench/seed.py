@@ -0,0 +1,95 @@
+"""压测数据：批量写入用户与分发申请（使用 DATABASE_URL 指向的本地 Postgres）
+
+所有用户密码均为 BENCH_PASSWORD，邮箱为 bench{i}@example.com，管理员为 ADMIN_EMAIL。
+表中已有数据时需要 --reset（会清空全部业务表），避免误操作真实数据库。
+
+用法（在 api 目录下）:
+    DATABASE_URL=postgresql://... python -m bench.seed --users 2000 --allocations 50000 --reset
+"""
+import argparse
+import datetime as dt
+import random
+import time
+
+from sqlalchemy import insert, select, text
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+
+from app.db import SessionLocal, engine
+from app.config import get_settings
+from app.hashing import pwd_hasher
+from app.quota import recount
+from app.models import Allocation, AllocationStatus, Base, Domain, Role, User
+
+settings = get_settings()
+
+BENCH_PASSWORD = "benchpass"
+ADMIN_EMAIL = "bench-admin@example.com"
+CHUNK = 5000
+# 状态分布：大部分已生效，保留一部分待审批给 bulk_approve 场景
+STATUS_WEIGHTS = ((AllocationStatus.active, 0.7), (AllocationStatus.pending, 0.2), (AllocationStatus.disabled, 0.1))
+
+def user_email(i: int) -> str:
+    return f"bench{i}@example.com"
+
+def _chunks(rows, size=CHUNK):
+    for i in range(0, len(rows), size):
+        yield rows[i:i + size]
+
+def seed(users: int, allocations: int, reset: bool = False) -> dict:
+    Base.metadata.create_all(bind=engine)
+    started = time.perf_counter()
+    with SessionLocal() as db:
+        if reset:
+            db.execute(text(
+                "TRUNCATE mail_outbox, provisioning_jobs, allocations, email_tokens, domains, users RESTART IDENTITY CASCADE"
+            ))
+        elif db.scalar(select(User.id).limit(1)) is not None:
+            raise SystemExit("Database is not empty, pass --reset to wipe it first")
+
+        # 所有用户共用一个哈希，避免播种时间被 argon2 主导
+        password_hash = pwd_hasher.hash(BENCH_PASSWORD)
+        now = dt.datetime.utcnow()
+        admin_id = db.scalar(insert(User).values(
+            email=ADMIN_EMAIL, password_hash=password_hash, role=Role.admin,
+            is_active=True, email_verified_at=now, created_at=now,
+        ).returning(User.id))
+        user_rows = [dict(email=user_email(i), password_hash=password_hash, role=Role.user,
+                          is_active=True, email_verified_at=now, created_at=now) for i in range(users)]
+        for chunk in _chunks(user_rows):
+            db.execute(insert(User), chunk)
+
+        db.execute(pg_insert(Domain).values(name=settings.DNS_ROOT_DOMAIN, provider="DNSPod")
+                   .on_conflict_do_nothing(index_elements=["name"]))
+        domain_id = db.scalar(select(Domain.id).where(Domain.name == settings.DNS_ROOT_DOMAIN))
+        user_ids = db.scalars(select(User.id).where(User.id != admin_id)).all() or [admin_id]
+
+        statuses, weights = zip(*STATUS_WEIGHTS)
+        alloc_rows = []
+        for i in range(allocations):
+            status = random.choices(statuses, weights)[0]
+            alloc_rows.append(dict(
+                user_id=random.choice(user_ids), domain_id=domain_id, subdomain=f"seed{i}",
+                type="A", value=f"10.{i >> 16 & 255}.{i >> 8 & 255}.{i & 255}", ttl=600, status=status,
+                provider_record_id=1_000_000 + i if status == AllocationStatus.active else None,
+                created_at=now,
+            ))
+        for chunk in _chunks(alloc_rows):
+            db.execute(insert(Allocation), chunk)
+        recount(db)
+        db.commit()
+        db.execute(text("ANALYZE users; ANALYZE allocations"))
+        db.commit()
+
+    return {"users": users + 1, "allocations": allocations,
+            "elapsed_s": round(time.perf_counter() - started, 2)}
+
+def main():
+    parser = argparse.ArgumentParser(description="Seed users and allocations for benchmarks")
+    parser.add_argument("--users", type=int, default=2000)
+    parser.add_argument("--allocations", type=int, default=50000)
+    parser.add_argument("--reset", action="store_true", help="清空全部业务表后再写入")
+    args = parser.parse_args()
+    print(seed(args.users, args.allocations, args.reset))
+
+if __name__ == "__main__":
+    main()
@@ -27,6 +27,11 @@ export PYTHONPATH=/app:$PYTHONPATH
 cd /app/app/migrations
 alembic upgrade head
 
-echo "Starting API server..."
+echo "Creating missing tables..."
 cd /app
+# 全新数据库由 create_all 建表（迁移只处理已有库），只在这里执行一次，各 worker 启动时跳过
+python -c "from app.db import engine; from app.models import Base; Base.metadata.create_all(bind=engine)"
+export DB_AUTO_CREATE=false
+
+echo "Starting API server..."
 uvicorn app.main:app --host 0.0.0.0 --port 8000
\ No newline at end of file
@@ -0,0 +1,26 @@
+from types import SimpleNamespace
+
+from app.models import AllocationStatus
+from app.providers import Record
+from app.reconcile import build_index, diff, normalize_value
+
+def _alloc(subdomain, rtype, value, ttl=600, record_id=1):
+    return SimpleNamespace(id=1, subdomain=subdomain, type=rtype, value=value, ttl=ttl,
+                           status=AllocationStatus.active, provider_record_id=record_id)
+
+def test_cname_trailing_dot_is_not_drift():
+    index, _ = build_index([Record(1, "www", "CNAME", "Target.Example.com.", 600)])
+    assert diff(index, [_alloc("www", "CNAME", "target.example.com")]) == []
+
+def test_txt_quotes_are_not_drift():
+    index, _ = build_index([Record(1, "_acme", "TXT", '"token-value"', 600)])
+    assert diff(index, [_alloc("_acme", "TXT", "token-value")]) == []
+
+def test_changed_cname_is_drift():
+    index, _ = build_index([Record(1, "www", "CNAME", "old.example.com.", 600)])
+    items = diff(index, [_alloc("www", "CNAME", "new.example.com")])
+    assert [(i.op, i.record_id, i.value) for i in items] == [("update", 1, "new.example.com")]
+
+def test_normalize_keeps_other_types():
+    assert normalize_value("A", "1.2.3.4") == "1.2.3.4"
+    assert normalize_value("MX", "MX.Example.com.") == "mx.example.com"
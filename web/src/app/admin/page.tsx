@@ -22,9 +22,16 @@ interface Allocation {
     created_at: string;
 }
 
+interface Page<T> {
+    items: T[];
+    next_cursor: number | null;
+}
+
 export default function AdminPage() {
     const [users, setUsers] = useState<User[]>([]);
+    const [usersCursor, setUsersCursor] = useState<number | null>(null);
     const [allocations, setAllocations] = useState<Allocation[]>([]);
+    const [allocationsCursor, setAllocationsCursor] = useState<number | null>(null);
     const [loading, setLoading] = useState(true);
     const [activeTab, setActiveTab] = useState("allocations");
     const router = useRouter();
@@ -49,31 +56,35 @@ export default function AdminPage() {
         }
     }, [router]);
 
-    const fetchUsers = useCallback(async () => {
+    const fetchUsers = useCallback(async (cursor?: number) => {
         try {
-            const response = await fetch("/api/admin/users", { cache: "no-store" });
+            const query = cursor ? `?cursor=${cursor}` : "";
+            const response = await fetch(`/api/admin/users${query}`, { cache: "no-store" });
             if (!response.ok) {
                 const text = await response.text();
                 console.error("Failed to fetch users:", text);
                 return;
             }
-            const data: User[] = await response.json();
-            setUsers(data);
+            const data: Page<User> = await response.json();
+            setUsers(prev => (cursor ? [...prev, ...data.items] : data.items));
+            setUsersCursor(data.next_cursor);
         } catch (error) {
             console.error("Failed to fetch users:", error);
         }
     }, []);
 
-    const fetchPendingAllocations = useCallback(async () => {
+    const fetchPendingAllocations = useCallback(async (cursor?: number) => {
         try {
-            const response = await fetch("/api/admin/allocations?status=pending", { cache: "no-store" });
+            const query = cursor ? `&cursor=${cursor}` : "";
+            const response = await fetch(`/api/admin/allocations?status=pending${query}`, { cache: "no-store" });
             if (!response.ok) {
                 const text = await response.text();
                 console.error("Failed to fetch allocations:", text);
                 return;
             }
-            const data: Allocation[] = await response.json();
-            setAllocations(data);
+            const data: Page<Allocation> = await response.json();
+            setAllocations(prev => (cursor ? [...prev, ...data.items] : data.items));
+            setAllocationsCursor(data.next_cursor);
         } catch (error) {
             console.error("Failed to fetch allocations:", error);
         }
@@ -230,6 +241,16 @@ export default function AdminPage() {
                                         ))}
                                     </tbody>
                                 </table>
+                                {allocationsCursor !== null && (
+                                    <button
+                                        onClick={() => {
+                                            void fetchPendingAllocations(allocationsCursor);
+                                        }}
+                                        className="mt-4 text-blue-600 hover:underline text-sm"
+                                    >
+                                        加载更多
+                                    </button>
+                                )}
                             </div>
                         )}
                     </div>
@@ -292,6 +313,16 @@ export default function AdminPage() {
                                         ))}
                                     </tbody>
                                 </table>
+                                {usersCursor !== null && (
+                                    <button
+                                        onClick={() => {
+                                            void fetchUsers(usersCursor);
+                                        }}
+                                        className="mt-4 text-blue-600 hover:underline text-sm"
+                                    >
+                                        加载更多
+                                    </button>
+                                )}
                             </div>
                         )}
                     </div>
@@ -65,6 +65,12 @@ export function buildBackendAuthHeaders(req: NextRequest): Record<string, string
     return headers;
 }
 
+// 把客户端地址透传给后端，用于按 IP 限流（后端需将本服务配置为可信代理）
+export function buildForwardedHeaders(req: NextRequest): Record<string, string> {
+    const forwardedFor = req.headers.get("x-forwarded-for") ?? req.headers.get("x-real-ip");
+    return forwardedFor ? { "x-forwarded-for": forwardedFor } : {};
+}
+
 export function shouldUseSecureCookie(req: NextRequest): boolean {
     const override = process.env.COOKIE_SECURE?.toLowerCase();
     if (override === "true") return true;
@@ -13,9 +13,11 @@ export async function GET(req: NextRequest) {
         return unauthorizedResponse();
     }
 
+    const search = req.nextUrl.searchParams.toString();
+
     let targetUrl: string;
     try {
-        targetUrl = resolveApiUrl("/admin/users");
+        targetUrl = resolveApiUrl(`/admin/users${search ? `?${search}` : ""}`);
     } catch (error) {
         return invalidApiUrlResponse(error);
     }
@@ -0,0 +1,53 @@
+import { NextRequest, NextResponse } from "next/server";
+import {
+    buildForwardedHeaders,
+    extractAccessToken,
+    invalidApiUrlResponse,
+    resolveApiUrl,
+    unauthorizedResponse,
+    upstreamUnavailableResponse,
+} from "../../_helpers";
+
+interface UpdateAllocationPayload {
+    value?: string;
+    ttl?: number;
+}
+
+export async function PATCH(req: NextRequest, { params }: { params: { allocationId: string } }) {
+    const token = extractAccessToken(req);
+    if (!token) {
+        return unauthorizedResponse();
+    }
+
+    const payload: UpdateAllocationPayload = await req.json();
+
+    let targetUrl: string;
+    try {
+        targetUrl = resolveApiUrl(`/allocations/${params.allocationId}`);
+    } catch (error) {
+        return invalidApiUrlResponse(error);
+    }
+
+    let backendResponse: Response;
+    try {
+        backendResponse = await fetch(targetUrl, {
+            method: "PATCH",
+            headers: {
+                Authorization: `Bearer ${token}`,
+                "content-type": "application/json",
+                ...buildForwardedHeaders(req),
+            },
+            body: JSON.stringify(payload),
+        });
+    } catch (error) {
+        return upstreamUnavailableResponse(error);
+    }
+
+    const text = await backendResponse.text();
+    return new NextResponse(text, {
+        status: backendResponse.status,
+        headers: {
+            "content-type": backendResponse.headers.get("content-type") ?? "application/json",
+        },
+    });
+}
@@ -0,0 +1,32 @@
+import { NextRequest, NextResponse } from "next/server";
+import {
+    invalidApiUrlResponse,
+    resolveApiUrl,
+    upstreamUnavailableResponse,
+} from "../../_helpers";
+
+export async function GET(req: NextRequest) {
+    const search = req.nextUrl.searchParams.toString();
+
+    let targetUrl: string;
+    try {
+        targetUrl = resolveApiUrl(`/allocations/available${search ? `?${search}` : ""}`);
+    } catch (error) {
+        return invalidApiUrlResponse(error);
+    }
+
+    let backendResponse: Response;
+    try {
+        backendResponse = await fetch(targetUrl, { cache: "no-store" });
+    } catch (error) {
+        return upstreamUnavailableResponse(error);
+    }
+
+    const text = await backendResponse.text();
+    return new NextResponse(text, {
+        status: backendResponse.status,
+        headers: {
+            "content-type": backendResponse.headers.get("content-type") ?? "application/json",
+        },
+    });
+}
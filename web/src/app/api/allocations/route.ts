@@ -1,5 +1,6 @@
 import { NextRequest, NextResponse } from "next/server";
 import {
+    buildForwardedHeaders,
     extractAccessToken,
     invalidApiUrlResponse,
     resolveApiUrl,
@@ -36,6 +37,7 @@ export async function POST(req: NextRequest) {
             headers: {
                 Authorization: `Bearer ${token}`,
                 "content-type": "application/json",
+                ...buildForwardedHeaders(req),
             },
             body: JSON.stringify(payload),
         });
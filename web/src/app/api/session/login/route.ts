@@ -1,5 +1,5 @@
 import { NextRequest, NextResponse } from "next/server";
-import { forwardSetCookies, resolveCookieDomain, shouldUseSecureCookie } from "../../_helpers";
+import { buildForwardedHeaders, forwardSetCookies, resolveCookieDomain, shouldUseSecureCookie } from "../../_helpers";
 
 const DEFAULT_API_BASE = "http://localhost:8000";
 
@@ -22,7 +22,7 @@ export async function POST(req: NextRequest) {
     try {
         backendResponse = await fetch(targetUrl, {
             method: "POST",
-            headers: { "content-type": "application/json" },
+            headers: { "content-type": "application/json", ...buildForwardedHeaders(req) },
             body: JSON.stringify(body),
         });
     } catch (error) {
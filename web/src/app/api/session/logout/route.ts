@@ -1,7 +1,21 @@
 import { NextRequest, NextResponse } from "next/server";
-import { resolveCookieDomain, shouldUseSecureCookie } from "../../_helpers";
+import { resolveApiUrl, resolveCookieDomain, shouldUseSecureCookie } from "../../_helpers";
 
 export async function POST(req: NextRequest) {
+    // 通知后端吊销当前会话；失败不影响本地清除 cookie
+    const refreshToken = req.cookies.get("refresh_token")?.value;
+    if (refreshToken) {
+        try {
+            await fetch(resolveApiUrl("/auth/logout"), {
+                method: "POST",
+                headers: { "content-type": "application/json" },
+                body: JSON.stringify({ refresh_token: refreshToken }),
+            });
+        } catch (error) {
+            console.error("Logout request failed", error);
+        }
+    }
+
     const res = NextResponse.json({ ok: true });
 
     const secure = shouldUseSecureCookie(req);
@@ -9,6 +9,9 @@ interface User {
     role: string;
     is_active: boolean;
     email_verified_at: string | null;
+    allocation_count: number;
+    quota_limit: number | null;
+    quota_remaining: number | null;
 }
 
 interface Allocation {
@@ -33,6 +36,7 @@ export default function DashboardPage() {
         ttl: 600,
     });
     const [formError, setFormError] = useState<string | null>(null);
+    const [available, setAvailable] = useState<boolean | null>(null);
     const [formSubmitting, setFormSubmitting] = useState(false);
     const router = useRouter();
 
@@ -95,6 +99,35 @@ export default function DashboardPage() {
         };
     }, [fetchAllocations, fetchUserData]);
 
+    // 输入子域名时查询是否可用（后端只读内存索引，不访问数据库）
+    useEffect(() => {
+        setAvailable(null);
+        const subdomain = formData.subdomain.trim();
+        if (!/^[a-zA-Z0-9][a-zA-Z0-9-]*[a-zA-Z0-9]$/.test(subdomain)) {
+            return;
+        }
+        const controller = new AbortController();
+        const timer = setTimeout(async () => {
+            try {
+                const params = new URLSearchParams({ subdomain, type: formData.type });
+                const response = await fetch(`/api/allocations/available?${params}`, {
+                    cache: "no-store",
+                    signal: controller.signal,
+                });
+                if (response.ok) {
+                    const data: { available: boolean } = await response.json();
+                    setAvailable(data.available);
+                }
+            } catch {
+                // 查询失败不影响提交
+            }
+        }, 250);
+        return () => {
+            clearTimeout(timer);
+            controller.abort();
+        };
+    }, [formData.subdomain, formData.type]);
+
     const handleSubmit = useCallback(async (e: React.FormEvent) => {
         e.preventDefault();
         setFormError(null);
@@ -115,14 +148,32 @@ export default function DashboardPage() {
 
             setShowForm(false);
             setFormData({ subdomain: "", type: "A", value: "", ttl: 600 });
-            await fetchAllocations();
+            await Promise.all([fetchAllocations(), fetchUserData()]);
         } catch (error) {
             console.error("Submit allocation failed", error);
             setFormError("网络错误，请重试");
         } finally {
             setFormSubmitting(false);
         }
-    }, [fetchAllocations, formData]);
+    }, [fetchAllocations, fetchUserData, formData]);
+
+    async function editValue(alloc: Allocation) {
+        const value = window.prompt(`修改 ${alloc.subdomain} 的指向值`, alloc.value)?.trim();
+        if (!value || value === alloc.value) {
+            return;
+        }
+        const response = await fetch(`/api/allocations/${alloc.id}`, {
+            method: "PATCH",
+            headers: { "content-type": "application/json" },
+            body: JSON.stringify({ value }),
+        });
+        if (!response.ok) {
+            const data = await response.json().catch(() => null);
+            alert(data?.detail ?? "修改失败");
+            return;
+        }
+        await fetchAllocations();
+    }
 
     async function logout() {
         await fetch("/api/session/logout", { method: "POST" });
@@ -154,7 +205,15 @@ export default function DashboardPage() {
 
             <main className="container mx-auto px-4 py-8">
                 <div className="flex justify-between items-center mb-6">
-                    <h2 className="text-2xl font-bold">我的域名分发</h2>
+                    <div>
+                        <h2 className="text-2xl font-bold">我的域名分发</h2>
+                        {user && (
+                            <p className="text-sm text-gray-500 mt-1">
+                                已使用 {user.allocation_count}
+                                {user.quota_limit !== null ? ` / ${user.quota_limit}` : "（不限）"}
+                            </p>
+                        )}
+                    </div>
                     <button
                         onClick={() => setShowForm(!showForm)}
                         className="btn"
@@ -178,6 +237,11 @@ export default function DashboardPage() {
                                     onChange={e => setFormData({ ...formData, subdomain: e.target.value })}
                                     required
                                 />
+                                {available !== null && (
+                                    <p className={`text-xs mt-1 ${available ? "text-green-600" : "text-red-600"}`}>
+                                        {available ? "可以申请" : "已被占用"}
+                                    </p>
+                                )}
                             </div>
 
                             <div>
@@ -246,6 +310,7 @@ export default function DashboardPage() {
                                         <th className="text-left p-2">指向值</th>
                                         <th className="text-left p-2">状态</th>
                                         <th className="text-left p-2">创建时间</th>
+                                        <th className="text-left p-2">操作</th>
                                     </tr>
                                 </thead>
                                 <tbody>
@@ -257,13 +322,22 @@ export default function DashboardPage() {
                                             <td className="p-2">
                                                 <span className={`px-2 py-1 rounded text-xs ${alloc.status === "active" ? "bg-green-100 text-green-800" :
                                                     alloc.status === "pending" ? "bg-yellow-100 text-yellow-800" :
-                                                        "bg-red-100 text-red-800"
+                                                        alloc.status === "provisioning" ? "bg-blue-100 text-blue-800" :
+                                                            "bg-red-100 text-red-800"
                                                     }`}>
                                                     {alloc.status === "active" ? "已激活" :
-                                                        alloc.status === "pending" ? "待审核" : "已禁用"}
+                                                        alloc.status === "pending" ? "待审核" :
+                                                            alloc.status === "provisioning" ? "解析中" : "已禁用"}
                                                 </span>
                                             </td>
                                             <td className="p-2">{new Date(alloc.created_at).toLocaleDateString()}</td>
+                                            <td className="p-2">
+                                                {(alloc.status === "active" || alloc.status === "pending") && (
+                                                    <button className="text-blue-600 hover:underline" onClick={() => editValue(alloc)}>
+                                                        修改
+                                                    </button>
+                                                )}
+                                            </td>
                                         </tr>
                                     ))}
                                 </tbody>